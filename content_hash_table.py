@@ -0,0 +1,83 @@
+import hashlib
+import os
+import sqlite3
+import sys
+
+try:
+	from urllib.request import pathname2url
+except ImportError: # Python 2
+	from urllib import pathname2url
+
+from _version import __version__
+
+
+# Remembers the content hash of every source file that has been indexed into a database, together with the indexer version
+# and the indexing mode that have been used. The table is stored in a sidecar file next to the database, because the
+# database itself is owned by SourcetrailDB. A file is only skipped if its row still exists in the database as well: Sourcetrail
+# indexes into temporary databases that are merged into the project database afterwards, and a file that is missing from
+# the database has to be indexed again no matter what the sidecar says.
+
+_sidecarFileExtension = '.hashes'
+
+
+class ContentHashTable:
+
+	def __init__(self, databaseFilePath):
+		self.databaseFilePath = databaseFilePath
+		self.filePath = databaseFilePath + _sidecarFileExtension
+		self.connection = sqlite3.connect(self.filePath)
+		self.connection.execute(
+			'CREATE TABLE IF NOT EXISTS content_hash(path TEXT NOT NULL, hash TEXT NOT NULL, indexer_version TEXT NOT NULL, mode TEXT NOT NULL, PRIMARY KEY(path))'
+		)
+		self.connection.commit()
+		self.skippedFileCount = 0
+
+
+	def isFileUnchanged(self, sourceFilePath, contentHash, mode):
+		row = self.connection.execute('SELECT hash, indexer_version, mode FROM content_hash WHERE path = ?', (sourceFilePath,)).fetchone()
+		if row is None or row[0] != contentHash or row[1] != __version__ or row[2] != mode:
+			return False
+		return isFileRecorded(self.databaseFilePath, sourceFilePath)
+
+
+	def storeContentHashes(self, entries):
+		# entries are (path, hash, mode) tuples of files whose data has been committed to the database
+		self.connection.executemany(
+			'INSERT OR REPLACE INTO content_hash(path, hash, indexer_version, mode) VALUES (?, ?, ?, ?)',
+			[(path, contentHash, __version__, mode) for path, contentHash, mode in entries]
+		)
+		self.connection.commit()
+
+
+	def clear(self):
+		self.connection.execute('DELETE FROM content_hash')
+		self.connection.commit()
+
+
+	def close(self):
+		self.connection.close()
+
+
+def getContentHash(sourceBytes):
+	return hashlib.sha1(sourceBytes).hexdigest()
+
+
+def isFileRecorded(databaseFilePath, sourceFilePath):
+	# the database is opened read-only, so it can be checked while SourcetrailDB holds it open. sqlite3 only accepts URIs since
+	# Python 3.4, before that the database is opened normally but only read from, which must not create a missing file either.
+	try:
+		if sys.version_info >= (3, 4):
+			connection = sqlite3.connect('file:' + pathname2url(databaseFilePath) + '?mode=ro', uri=True)
+		elif os.path.isfile(databaseFilePath):
+			connection = sqlite3.connect(databaseFilePath)
+		else:
+			return False
+	except sqlite3.Error:
+		return False
+	try:
+		row = connection.execute('SELECT COUNT(*) FROM file WHERE path = ?', (sourceFilePath.replace('\\', '/'),)).fetchone()
+		return row[0] > 0
+	except sqlite3.Error: # e.g. the database has not been written yet
+		return False
+	finally:
+		connection.close()
@@ -0,0 +1,183 @@
+import ast
+import codecs
+import json
+import os
+
+import shallow_indexer
+from indexer_common import _astParseErrorTypes
+from indexer_log import logger
+from module_locator import getModuleLocator
+
+
+_dependencyGraphFormatVersion = 2
+
+
+class DependencyGraph:
+
+	# Holds the project files that each indexed file imports with "import" and "from ... import ..." statements, including the
+	# packages that are imported implicitly along the way. When files change, only the changed files and the files that depend
+	# on them directly or transitively need to be indexed again, because the references recorded for all other files stay the
+	# same. Imports of files that are not known to the graph are followed as well, so files that have never been added count as
+	# changed. Imports that cannot be resolved are kept as the paths (without extension) at which the module would be found, so
+	# adding a file that makes such an import resolvable requires indexing the importing files again.
+	def __init__(self):
+		self.dependencies = {}
+		self.unresolvedImports = {}
+
+
+	def addSourceFile(self, sourceFilePath):
+		sourceFilePath = os.path.abspath(sourceFilePath)
+		with codecs.open(sourceFilePath, 'r', encoding='utf-8') as input:
+			sourceCode = input.read()
+
+		moduleLocator = getModuleLocator([shallow_indexer.getPackageRootPath(sourceFilePath)])
+		dependencies = set()
+		unresolvedImports = set()
+		for level, names in getImportPaths(sourceCode, sourceFilePath):
+			modulePaths = locateImportedModules(moduleLocator, sourceFilePath, level, names)
+			for modulePath in modulePaths:
+				if os.path.isfile(modulePath) and modulePath != sourceFilePath:
+					dependencies.add(modulePath)
+			unresolvedImports.update(getUnresolvedModulePaths(moduleLocator, sourceFilePath, level, names, len(modulePaths)))
+		self.dependencies[sourceFilePath] = sorted(dependencies)
+		self.unresolvedImports[sourceFilePath] = sorted(unresolvedImports)
+
+
+	def removeSourceFile(self, sourceFilePath):
+		self.dependencies.pop(os.path.abspath(sourceFilePath), None)
+		self.unresolvedImports.pop(os.path.abspath(sourceFilePath), None)
+
+
+	def getDependentFilePaths(self, changedFilePaths):
+		# returns the changed files and all files that import any of them, directly or via other files
+		dependents = {}
+		for sourceFilePath, dependencies in self.dependencies.items():
+			for dependency in dependencies:
+				dependents.setdefault(dependency, []).append(sourceFilePath)
+		for sourceFilePath, unresolvedModulePaths in self.unresolvedImports.items():
+			for unresolvedModulePath in unresolvedModulePaths:
+				dependents.setdefault(unresolvedModulePath, []).append(sourceFilePath)
+
+		filePaths = set()
+		pendingFilePaths = [os.path.abspath(p) for p in changedFilePaths]
+		while pendingFilePaths:
+			filePath = pendingFilePaths.pop()
+			if filePath in filePaths:
+				continue
+			filePaths.add(filePath)
+			pendingFilePaths.extend(dependents.get(filePath, []))
+			for modulePath in getModulePathsOfFile(filePath):
+				pendingFilePaths.extend(dependents.get(modulePath, []))
+		return filePaths
+
+
+	def getFilePathsToIndex(self, sourceFilePaths, changedFilePaths):
+		# keeps the order of the source files, files that are not part of the graph yet are always indexed and count as changed
+		newFilePaths = [os.path.abspath(p) for p in sourceFilePaths if os.path.abspath(p) not in self.dependencies]
+		dependentFilePaths = self.getDependentFilePaths(list(changedFilePaths) + newFilePaths)
+		return [p for p in sourceFilePaths if os.path.abspath(p) in dependentFilePaths]
+
+
+	def save(self, filePath):
+		with open(filePath, 'w') as output:
+			json.dump(
+				{
+					'version': _dependencyGraphFormatVersion,
+					'dependencies': self.dependencies,
+					'unresolvedImports': self.unresolvedImports
+				},
+				output,
+				sort_keys=True
+			)
+
+
+def loadDependencyGraph(filePath):
+	with open(filePath, 'r') as input:
+		data = json.load(input)
+	if data.get('version') != _dependencyGraphFormatVersion:
+		logger.error('Dependency graph "' + filePath + '" has been written by an incompatible version of the indexer.')
+		return None
+
+	dependencyGraph = DependencyGraph()
+	dependencyGraph.dependencies = data['dependencies']
+	dependencyGraph.unresolvedImports = data['unresolvedImports']
+	return dependencyGraph
+
+
+def getImportPaths(sourceCode, sourceFilePath):
+	# returns the level and the names of every module or symbol that is imported anywhere in the source code
+	try:
+		moduleNode = ast.parse(sourceCode, sourceFilePath)
+	except _astParseErrorTypes:
+		return getImportPathsOfParsoNode(shallow_indexer.parseSourceCode(sourceCode, sourceFilePath))
+
+	importPaths = []
+	for node in ast.walk(moduleNode):
+		if isinstance(node, ast.Import):
+			for alias in node.names:
+				importPaths.append((0, alias.name.split('.')))
+		elif isinstance(node, ast.ImportFrom):
+			moduleNames = node.module.split('.') if node.module else []
+			for alias in node.names:
+				importPaths.append((node.level, moduleNames + ([alias.name] if alias.name != '*' else [])))
+	return importPaths
+
+
+def getImportPathsOfParsoNode(node):
+	# parso recovers from syntax errors, so the imports of files that cannot be compiled are found as well
+	importPaths = []
+	if node.type in ['import_name', 'import_from']:
+		level = node.level if node.type == 'import_from' else 0
+		for path in node.get_paths():
+			importPaths.append((level, [name.value for name in path]))
+	elif hasattr(node, 'children'):
+		for c in node.children:
+			importPaths.extend(getImportPathsOfParsoNode(c))
+	return importPaths
+
+
+def locateImportedModules(moduleLocator, sourceFilePath, level, names):
+	# "import foo.bar" executes "foo/__init__.py" as well as "foo/bar.py", and "from foo import bar" may import a submodule
+	modulePaths = []
+	if level > 0:
+		packagePath = moduleLocator.locateRelativeModule(sourceFilePath, level, [])
+		if packagePath is not None:
+			modulePaths.append(os.path.join(packagePath, '__init__.py'))
+	for i in range(1, len(names) + 1):
+		if level > 0:
+			modulePath = moduleLocator.locateRelativeModule(sourceFilePath, level, names[:i])
+		else:
+			modulePath = moduleLocator.locateModule('.'.join(names[:i]))
+		if modulePath is None:
+			break
+		modulePaths.append(modulePath)
+	return modulePaths
+
+
+def getUnresolvedModulePaths(moduleLocator, sourceFilePath, level, names, resolvedNameCount):
+	# returns the paths without extension at which the modules that could not be located would be found, e.g. "<root>/pkg/new"
+	# for "from pkg.new import Foo" if "pkg" is a package without a "new" module, and "<root>/pkg/new/Foo" in case "Foo" is a
+	# submodule
+	if level > 0:
+		# the package of the importing file is located before the imported names
+		resolvedNameCount = max(resolvedNameCount - 1, 0)
+		directoryPath = os.path.dirname(os.path.abspath(sourceFilePath))
+		for i in range(level - 1):
+			directoryPath = os.path.dirname(directoryPath)
+		directoryPaths = [directoryPath]
+	else:
+		directoryPaths = moduleLocator.sysPath
+
+	unresolvedModulePaths = []
+	for i in range(resolvedNameCount + 1, len(names) + 1):
+		for directoryPath in directoryPaths:
+			unresolvedModulePaths.append(os.path.join(directoryPath, *names[:i]))
+	return unresolvedModulePaths
+
+
+def getModulePathsOfFile(filePath):
+	# returns the paths without extension under which a file defines a module, matching the keys of unresolved imports
+	modulePath, extension = os.path.splitext(filePath)
+	if os.path.basename(modulePath) == '__init__':
+		return [os.path.dirname(modulePath)]
+	return [modulePath]
@@ -0,0 +1,42 @@
+import os
+
+
+_sourceFileExtensions = ['.py']
+_ignoredDirectoryNames = ['__pycache__', '.git', '.hg', '.svn', '.tox', '.venv']
+
+
+class SourceFileWatcher:
+
+	def __init__(self, sourceDirectoryPaths):
+		self.sourceDirectoryPaths = [os.path.abspath(p) for p in sourceDirectoryPaths]
+		self.modificationTimes = {}
+
+
+	def pollChangedFilePaths(self):
+		changedFilePaths = []
+		currentModificationTimes = {}
+
+		for sourceFilePath in self.getSourceFilePaths():
+			try:
+				modificationTime = os.path.getmtime(sourceFilePath)
+			except OSError: # the file has been removed while scanning
+				continue
+			currentModificationTimes[sourceFilePath] = modificationTime
+			if self.modificationTimes.get(sourceFilePath) != modificationTime:
+				changedFilePaths.append(sourceFilePath)
+
+		self.modificationTimes = currentModificationTimes
+		return changedFilePaths
+
+
+	def getSourceFilePaths(self):
+		for sourceDirectoryPath in self.sourceDirectoryPaths:
+			if os.path.isfile(sourceDirectoryPath):
+				yield sourceDirectoryPath
+				continue
+
+			for directoryPath, directoryNames, fileNames in os.walk(sourceDirectoryPath):
+				directoryNames[:] = sorted(d for d in directoryNames if d not in _ignoredDirectoryNames)
+				for fileName in sorted(fileNames):
+					if os.path.splitext(fileName)[1] in _sourceFileExtensions:
+						yield os.path.join(directoryPath, fileName)
@@ -0,0 +1,120 @@
+import json
+import os
+import socket
+import sys
+import time
+
+import indexing_session
+from indexer_log import logger
+
+
+_shutdownCommandName = 'shutdown'
+
+
+class IndexServer:
+
+	def __init__(self, workingDirectory, isVerbose = False, parseCache = None):
+		self.workingDirectory = workingDirectory
+		self.session = indexing_session.IndexingSession(workingDirectory, None, isVerbose, False, parseCache)
+		self.isShutdownRequested = False
+
+
+	def handleRequestLine(self, line):
+		try:
+			request = json.loads(line)
+		except ValueError as e:
+			return {'status': 'error', 'message': 'Unable to parse request: ' + str(e)}
+
+		if not isinstance(request, dict):
+			return {'status': 'error', 'message': 'A request needs to be a JSON object.'}
+
+		if request.get('command') == _shutdownCommandName:
+			self.isShutdownRequested = True
+			return {'status': 'ok'}
+
+		sourceFilePath = request.get('source_file_path')
+		databaseFilePath = request.get('database_file_path')
+		if sourceFilePath is None or databaseFilePath is None:
+			return {'status': 'error', 'message': 'A request needs to provide "source_file_path" and "database_file_path".'}
+
+		sourceFilePath = self.getAbsolutePath(sourceFilePath)
+		databaseFilePath = self.getAbsolutePath(databaseFilePath)
+
+		environmentPath = request.get('environment_path')
+		if environmentPath is not None:
+			environmentPath = self.getAbsolutePath(environmentPath)
+
+		startTime = time.time()
+
+		clear = bool(request.get('clear', False))
+		if clear or databaseFilePath != self.session.databaseFilePath:
+			if not self.session.openDatabase(databaseFilePath, clear):
+				return {'status': 'error', 'source_file_path': sourceFilePath, 'message': 'Unable to open database "' + databaseFilePath + '".'}
+
+		isShallow = bool(request.get('shallow', False))
+		try:
+			self.session.indexFile(sourceFilePath, environmentPath, isShallow)
+		except Exception as e:
+			return {'status': 'error', 'source_file_path': sourceFilePath, 'message': e.__repr__()}
+		finally:
+			if not isShallow:
+				import indexer # jedi is only imported when deep indexing is actually needed
+				indexer.getResolutionFailureStatistics().logSummary()
+				indexer.resetResolutionFailureStatistics()
+
+		return {'status': 'ok', 'source_file_path': sourceFilePath, 'duration': time.time() - startTime}
+
+
+	def serveStream(self, input, output):
+		for line in iter(input.readline, ''):
+			if not line.strip():
+				continue
+			output.write(json.dumps(self.handleRequestLine(line)) + '\n')
+			output.flush()
+			if self.isShutdownRequested:
+				break
+
+
+	def serveUnixSocket(self, socketPath):
+		if not hasattr(socket, 'AF_UNIX'):
+			logger.error('Unix domain sockets are not supported on this platform.')
+			return
+
+		if os.path.exists(socketPath):
+			os.remove(socketPath)
+
+		serverSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			serverSocket.bind(socketPath)
+			serverSocket.listen(1)
+			while not self.isShutdownRequested:
+				connection, address = serverSocket.accept()
+				connectionFile = connection.makefile('rw')
+				try:
+					self.serveStream(connectionFile, connectionFile)
+				finally:
+					connectionFile.close()
+					connection.close()
+		finally:
+			serverSocket.close()
+			os.remove(socketPath)
+
+
+	def shutdown(self):
+		self.session.closeDatabase()
+
+
+	def getAbsolutePath(self, path):
+		if not os.path.isabs(path):
+			path = os.path.join(self.workingDirectory, path)
+		return path
+
+
+def serveStandardStreams(server):
+	# everything the indexers print is redirected to stderr, so stdout only carries responses
+	responseOutput = sys.stdout
+	sys.stdout = sys.stderr
+	try:
+		server.serveStream(sys.stdin, responseOutput)
+	finally:
+		sys.stdout = responseOutput
@@ -1,41 +1,110 @@
 import codecs
 import jedi
-import json
+import logging
 import os
 import sys
+import time
 
 import sourcetraildb as srctrl
 from jedi._compatibility import all_suffixes
 from _version import __version__
-from _version import _sourcetrail_db_version
 
+from indexer_common import _virtualFilePath
+from indexer_common import isSourcetrailDBVersionCompatible
+from indexer_common import AstVisitorClient
+from indexer_common import SourceRange
+from indexer_common import NameHierarchy
+from indexer_common import NameElement
+from indexer_common import NameHierarchyEncoder
+from indexer_common import getNameHierarchyForUnsolvedSymbol
+from indexer_common import getAstDumpWriter
+from indexer_log import logger
+from module_locator import getImportPathOfNameNode
+from module_locator import getModuleLocator
 
-_virtualFilePath = 'virtual_file.py'
+
+_defaultMaxConsecutiveResolutionFailureCount = 50
+_invalidEnvironmentRetryInterval = 10.0
+
+
+class EnvironmentRegistry:
+
+	# Keeps one environment per requested environment path for the lifetime of the process. Jedi runs a subprocess for every
+	# environment that evaluates compiled modules, and starting it is much more expensive than indexing a small file, so every
+	# indexing call and the environment check share the same environment. Before an environment is handed out, the registry
+	# checks whether its subprocess is still running and restarts it if it has died. Paths that do not specify a functional
+	# environment are remembered for a few seconds, so indexing many files does not try them for every file, but an environment
+	# that has been fixed in the meantime is picked up by later files or requests.
+	def __init__(self):
+		self.environments = {}
+		self.errorMessages = {}
+		self.restartCount = 0
+
+
+	def getEnvironment(self, environmentPath = None):
+		# raises an exception if the path does not specify a functional environment
+		if environmentPath in self.errorMessages:
+			errorMessage, errorTime = self.errorMessages[environmentPath]
+			if time.time() - errorTime < _invalidEnvironmentRetryInterval:
+				raise jedi.InvalidPythonEnvironment(errorMessage)
+			del self.errorMessages[environmentPath]
+
+		environment = self.environments.get(environmentPath)
+		if environment is not None:
+			isRestarted = restartSubprocessIfNotRunning(environment)
+			if isRestarted is not None:
+				if isRestarted:
+					self.restartCount += 1
+					logger.info('Restarted the subprocess of the Python environment at "%s".', environment.path)
+				return environment
+			del self.environments[environmentPath]
+
+		try:
+			environment = createEnvironment(environmentPath)
+		except Exception as e:
+			if environmentPath is not None:
+				self.errorMessages[environmentPath] = (str(e), time.time())
+			raise
+		self.environments[environmentPath] = environment
+		return environment
+
+
+_environmentRegistry = EnvironmentRegistry()
+
+
+def getEnvironmentRegistry():
+	return _environmentRegistry
 
 
 def isValidEnvironment(environmentPath):
 	try:
-		environment = jedi.create_environment(environmentPath, False)
-		environment._get_subprocess() # check if this environment is really functional
+		_environmentRegistry.getEnvironment(environmentPath)
 	except Exception as e:
-		if os.name == 'nt' and os.path.isdir(environmentPath):
-			try:
-				environment = jedi.create_environment(os.path.join(environmentPath, "python.exe"), False)
-				environment._get_subprocess() # check if this environment is really functional
-				return ''
-			except Exception:
-				pass
 		return str(e)
 	return ''
 
 
 def getEnvironment(environmentPath = None):
+	if environmentPath is not None:
+		# the fallback is reported every time, since e.g. every request of the server may provide another environment path
+		try:
+			return _environmentRegistry.getEnvironment(environmentPath)
+		except Exception as e:
+			logger.warning(
+				'The provided environment path "%s" does not specify a functional Python environment (details: "%s"). Using '
+				'fallback environment instead.', environmentPath, str(e)
+			)
+
+	return _environmentRegistry.getEnvironment(None)
+
+
+def createEnvironment(environmentPath = None):
 	if environmentPath is not None:
 		try:
 			environment = jedi.create_environment(environmentPath, False)
 			environment._get_subprocess() # check if this environment is really functional
 			return environment
-		except Exception as e:
+		except Exception:
 			if os.name == 'nt' and os.path.isdir(environmentPath):
 				try:
 					environment = jedi.create_environment(os.path.join(environmentPath, "python.exe"), False)
@@ -43,8 +112,7 @@ def getEnvironment(environmentPath = None):
 					return environment
 				except Exception:
 					pass
-			print('WARNING: The provided environment path "' + environmentPath + '" does not specify a functional Python '
-				'environment (details: "' + str(e) + '"). Using fallback environment instead.')
+			raise
 
 	try:
 		environment = jedi.get_default_environment()
@@ -70,24 +138,34 @@ def getEnvironment(environmentPath = None):
 	raise jedi.InvalidPythonEnvironment("Unable to find an executable Python environment.")
 
 
-def isSourcetrailDBVersionCompatible(allowLogging = False):
-	requiredVersion = _sourcetrail_db_version
+def restartSubprocessIfNotRunning(environment):
+	# Returns True if the subprocess had to be restarted, polling the process is much cheaper than sending it a request. This
+	# relies on private attributes of jedi, so None is returned if any of them is missing or restarting fails for another
+	# reason, and a fresh environment needs to be created instead.
+	if not hasattr(environment, '_get_subprocess'): # the environment evaluates compiled modules in this process
+		return False
 
 	try:
-		usedVersion = srctrl.getVersionString()
-	except AttributeError:
-		if allowLogging:
-			print('ERROR: Used version of SourcetrailDB is incompatible to what is required by this version of SourcetrailPythonIndexer (' + requiredVersion + ').')
-		return False
+		subprocess = environment._subprocess
+		if subprocess is None:
+			environment._get_subprocess()
+			return False
+		if not subprocess.is_crashed and subprocess._get_process().poll() is None:
+			return False
 
-	if usedVersion != requiredVersion:
-		if allowLogging:
-			print('ERROR: Used version of SourcetrailDB (' + usedVersion + ') is incompatible to what is required by this version of SourcetrailPythonIndexer (' + requiredVersion + ').')
-		return False
-	return True
+		if not subprocess.is_crashed:
+			subprocess._kill()
+		environment._get_subprocess() # jedi starts a new subprocess for environments whose subprocess has crashed
+		return True
+	except Exception as e:
+		logger.warning(
+			'Failed to restart the subprocess of the Python environment at "%s" (details: "%s"), creating a new environment instead.',
+			getattr(environment, 'path', None), e.__repr__()
+		)
+		return None
 
 
-def indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, environmentPath = None, sysPath = None):
+def indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, environmentPath = None, sysPath = None, parseCache = None):
 	sourceFilePath = _virtualFilePath
 
 	environment = getEnvironment(environmentPath)
@@ -100,12 +178,7 @@ def indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, e
 		script_path=workingDirectory
 	)
 
-	module_node = evaluator.parse(
-		code=sourceCode,
-		path=workingDirectory,
-		cache=False,
-		diff_cache=False
-	)
+	module_node = parseSourceCode(evaluator, sourceCode, sourceFilePath, workingDirectory, parseCache)
 
 	if (isVerbose):
 		astVisitor = VerboseAstVisitor(astVisitorClient, evaluator, sourceFilePath, sourceCode, sysPath)
@@ -115,19 +188,20 @@ def indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, e
 	astVisitor.traverseNode(module_node)
 
 
-def indexSourceFile(sourceFilePath, environmentPath, workingDirectory, astVisitorClient, isVerbose):
+def indexSourceFile(sourceFilePath, environmentPath, workingDirectory, astVisitorClient, isVerbose, parseCache = None, environment = None, sourceCode = None):
 
 	if isVerbose:
-		print('INFO: Indexing source file "' + sourceFilePath + '".')
+		logger.info('Indexing source file "%s".', sourceFilePath)
 
-	sourceCode = ''
-	with codecs.open(sourceFilePath, 'r', encoding='utf-8') as input:
-		sourceCode=input.read()
+	if sourceCode is None:
+		with codecs.open(sourceFilePath, 'r', encoding='utf-8') as input:
+			sourceCode=input.read()
 
-	environment = getEnvironment(environmentPath)
+	if environment is None:
+		environment = getEnvironment(environmentPath)
 
 	if isVerbose:
-		print('INFO: Using Python environment at "' + environment.path + '" for indexing.')
+		logger.info('Using Python environment at "%s" for indexing.', environment.path)
 
 	project = jedi.api.project.Project(workingDirectory, environment = environment)
 
@@ -137,12 +211,7 @@ def indexSourceFile(sourceFilePath, environmentPath, workingDirectory, astVisito
 		script_path=workingDirectory
 	)
 
-	module_node = evaluator.parse(
-		code=sourceCode,
-		path=workingDirectory,
-		cache=False,
-		diff_cache=False
-	)
+	module_node = parseSourceCode(evaluator, sourceCode, sourceFilePath, workingDirectory, parseCache)
 
 	if (isVerbose):
 		astVisitor = VerboseAstVisitor(astVisitorClient, evaluator, sourceFilePath)
@@ -152,6 +221,92 @@ def indexSourceFile(sourceFilePath, environmentPath, workingDirectory, astVisito
 	astVisitor.traverseNode(module_node)
 
 
+def parseSourceCode(evaluator, sourceCode, sourceFilePath, workingDirectory, parseCache = None):
+	parseFunction = lambda: evaluator.parse(
+		code=sourceCode,
+		path=workingDirectory,
+		cache=False,
+		diff_cache=False
+	)
+
+	if parseCache is None:
+		return parseFunction()
+	return parseCache.getModuleNode(sourceCode, sourceFilePath, evaluator.grammar, parseFunction)
+
+
+class ResolutionFailureStatistics:
+
+	# Counts the exceptions that jedi raises while resolving names, classified by their type and grouped by the module that the
+	# name is resolved into: the module of an imported name or, for all other names, the module that contains the name. Jedi
+	# tends to fail on every name of a module it cannot handle (e.g. a broken stub of a C extension), so after a number of
+	# consecutive failures for the same module the names of that module are recorded as unsolved without asking jedi again.
+	def __init__(self, maxConsecutiveFailureCount = _defaultMaxConsecutiveResolutionFailureCount):
+		self.maxConsecutiveFailureCount = maxConsecutiveFailureCount
+		self.failureCounts = {}
+		self.consecutiveFailureCounts = {}
+		self.skippedResolutionCounts = {}
+		self.trippedModuleNames = []
+
+
+	def isTripped(self, moduleName):
+		if moduleName not in self.skippedResolutionCounts:
+			return False
+		self.skippedResolutionCounts[moduleName] += 1
+		return True
+
+
+	def recordSuccess(self, moduleName):
+		if moduleName in self.consecutiveFailureCounts:
+			del self.consecutiveFailureCounts[moduleName]
+
+
+	def recordFailure(self, moduleName, exception):
+		# returns True if this failure trips the circuit breaker of the module
+		failureCounts = self.failureCounts.setdefault(moduleName, {})
+		exceptionTypeName = type(exception).__name__
+		failureCounts[exceptionTypeName] = failureCounts.get(exceptionTypeName, 0) + 1
+
+		consecutiveFailureCount = self.consecutiveFailureCounts.get(moduleName, 0) + 1
+		self.consecutiveFailureCounts[moduleName] = consecutiveFailureCount
+		if self.maxConsecutiveFailureCount <= 0 or consecutiveFailureCount < self.maxConsecutiveFailureCount:
+			return False
+		self.skippedResolutionCounts[moduleName] = 0
+		self.trippedModuleNames.append(moduleName)
+		return True
+
+
+	def logSummary(self):
+		for moduleName in sorted(self.failureCounts):
+			failureCounts = self.failureCounts[moduleName]
+			logger.info(
+				'Failed to resolve %d names into module "%s" (%s).', sum(failureCounts.values()), moduleName,
+				', '.join(exceptionTypeName + ': ' + str(count) for exceptionTypeName, count in sorted(failureCounts.items()))
+			)
+		for moduleName in self.trippedModuleNames:
+			logger.warning(
+				'Stopped resolving names into module "%s" after %d consecutive failures, %d names have been recorded as unsolved instead.',
+				moduleName, self.maxConsecutiveFailureCount, self.skippedResolutionCounts[moduleName]
+			)
+
+
+_resolutionFailureStatistics = ResolutionFailureStatistics()
+
+
+def getResolutionFailureStatistics():
+	return _resolutionFailureStatistics
+
+
+def setMaxConsecutiveResolutionFailureCount(maxConsecutiveFailureCount):
+	# 0 disables the circuit breaker, failures are still counted
+	_resolutionFailureStatistics.maxConsecutiveFailureCount = maxConsecutiveFailureCount
+
+
+def resetResolutionFailureStatistics():
+	# long running commands start over for every batch of files or request, so tripped modules are tried again later on
+	global _resolutionFailureStatistics
+	_resolutionFailureStatistics = ResolutionFailureStatistics(_resolutionFailureStatistics.maxConsecutiveFailureCount)
+
+
 class ContextInfo:
 
 	def __init__(self, id, name, node):
@@ -186,12 +341,16 @@ class AstVisitor:
 			baseSysPath.sort(reverse=True)
 			self.sysPath.extend(baseSysPath)
 		self.sysPath = list(filter(None, self.sysPath))
+		self.moduleLocator = getModuleLocator(self.sysPath)
+
+		self.importedModuleNames = {}
+		self.moduleNamesOfFiles = {}
 
 		self.contextStack = []
 
 		fileId = self.client.recordFile(self.sourceFilePath)
 		if fileId == 0:
-			print('ERROR: ' + srctrl.getLastError())
+			logger.error(srctrl.getLastError())
 		self.client.recordFileLanguage(fileId, 'python')
 		self.contextStack.append(ContextInfo(fileId, self.sourceFilePath, None))
 
@@ -360,7 +519,11 @@ class AstVisitor:
 					if self.recordStatementReference(node, definition):
 						referenceIsUnsolved = False
 			except Exception as e:
-				print('ERROR: Encountered exception "' + e.__repr__() + '" while trying to solve the definition of node "' + node.value + '" at ' + getSourceRangeOfNode(node).toString() + '.')
+				if logger.isEnabledFor(logging.ERROR): # raised for every name of some files, so repetitions are grouped by the format string
+					logger.error(
+						'Encountered exception "%s" while trying to solve the definition of node "%s" at %s.',
+						e.__repr__(), node.value, getSourceRangeOfNode(node).toString()
+					)
 
 		if referenceIsUnsolved:
 			self.client.recordReferenceToUnsolvedSymhol(self.contextStack[-1].id, srctrl.REFERENCE_USAGE, getSourceRangeOfNode(node))
@@ -426,12 +589,25 @@ class AstVisitor:
 				if self.recordErrorsForUnsolvedImports(c) is False:
 					return False
 		elif node.type == 'name':
+			if self.isImportedModuleLocated(node):
+				return True # no need to ask jedi, the module exists on the sys path
 			if len(self.getDefinitionsOfNode(node, self.sourceFilePath)) == 0:
 				self.client.recordError('Imported symbol named "' + node.value + '" has not been found.', False, getSourceRangeOfNode(node))
 				return False
 		return True
 
 
+	def isImportedModuleLocated(self, node):
+		importNode = getParentWithTypeInList(node, ['import_name', 'import_from'])
+		if importNode is None:
+			return False
+
+		level, names, isImportedName = getImportPathOfNameNode(importNode, node)
+		if level == 0:
+			return self.moduleLocator.locateModule('.'.join(names)) is not None
+		return self.moduleLocator.locateRelativeModule(self.sourceFilePath, level, names) is not None
+
+
 	def recordInstanceReference(self, node, definition):
 		nameHierarchy = self.getNameHierarchyFromFullNameOfDefinition(definition)
 		if nameHierarchy is not None:
@@ -788,6 +964,10 @@ class AstVisitor:
 
 
 	def getDefinitionsOfNode(self, node, nodeSourceFilePath):
+		moduleName = self.getResolvedModuleNameOfNode(node, nodeSourceFilePath)
+		if _resolutionFailureStatistics.isTripped(moduleName):
+			return []
+
 		try:
 			(startLine, startColumn) = node.start_pos
 			if nodeSourceFilePath == _virtualFilePath: # we are indexing a provided code snippet
@@ -807,11 +987,56 @@ class AstVisitor:
 					environment = self.environment,
 					sys_path = self.sysPath
 				)
-			return script.goto_assignments(follow_imports=True)
+			definitions = script.goto_assignments(follow_imports=True)
 
-		except Exception:
+		except Exception as e:
+			if _resolutionFailureStatistics.recordFailure(moduleName, e):
+				logger.warning('Resolving names into module "%s" failed %d times in a row, its remaining names are recorded as unsolved.',
+					moduleName, _resolutionFailureStatistics.maxConsecutiveFailureCount)
 			return []
 
+		_resolutionFailureStatistics.recordSuccess(moduleName)
+		return definitions
+
+
+	def getResolvedModuleNameOfNode(self, node, nodeSourceFilePath):
+		# names of import statements and names that are qualified by an imported name are resolved into the imported module,
+		# all other names are resolved within the module that contains them
+		importNode = getParentWithTypeInList(node, ['import_name', 'import_from'])
+		if importNode is not None:
+			return getImportedModuleName(importNode, node, self.getPackageNameOfFile(nodeSourceFilePath))
+
+		rootNameNode = getRootNameNodeOfQualifiedName(node)
+		if rootNameNode is not None:
+			moduleNode = rootNameNode.get_root_node()
+			importedModuleNames = self.importedModuleNames.get(moduleNode)
+			if importedModuleNames is None:
+				importedModuleNames = getImportedModuleNames(moduleNode, self.getPackageNameOfFile(nodeSourceFilePath))
+				self.importedModuleNames[moduleNode] = importedModuleNames
+			if rootNameNode.value in importedModuleNames:
+				return importedModuleNames[rootNameNode.value]
+
+		return self.getModuleNameOfFile(nodeSourceFilePath)
+
+
+	def getModuleNameOfFile(self, sourceFilePath):
+		# returns the path of the file if it is not located on the sys path
+		if sourceFilePath not in self.moduleNamesOfFiles:
+			moduleNameHierarchy = self.getNameHierarchyFromModuleFilePath(sourceFilePath)
+			self.moduleNamesOfFiles[sourceFilePath] = moduleNameHierarchy.getDisplayString() if moduleNameHierarchy is not None else None
+		moduleName = self.moduleNamesOfFiles[sourceFilePath]
+		return moduleName if moduleName is not None else sourceFilePath
+
+
+	def getPackageNameOfFile(self, sourceFilePath):
+		# returns the package that relative imports of the file are resolved against, None if the file is not located on the sys
+		# path
+		self.getModuleNameOfFile(sourceFilePath)
+		moduleName = self.moduleNamesOfFiles[sourceFilePath]
+		if moduleName is None or os.path.splitext(os.path.basename(sourceFilePath))[0] == '__init__':
+			return moduleName
+		return moduleName.rpartition('.')[0]
+
 
 	def getNameHierarchyOfNode(self, node, nodeSourceFilePath):
 		if node is None:
@@ -890,254 +1115,24 @@ class VerboseAstVisitor(AstVisitor):
 	def __init__(self, client, evaluator, sourceFilePath, sourceFileContent = None, sysPath = None):
 		AstVisitor.__init__(self, client, evaluator, sourceFilePath, sourceFileContent, sysPath)
 		self.indentationLevel = 0
-		self.indentationToken = '| '
+		self.astDumpWriter = getAstDumpWriter()
 
 
 	def traverseNode(self, node):
-		currentString = ''
-		for i in range(0, self.indentationLevel):
-			currentString += self.indentationToken
-
-		currentString += node.type
+		currentString = node.type
 
 		if hasattr(node, 'value'):
 			currentString += ' (' + repr(node.value) + ')'
 
 		currentString += ' ' + getSourceRangeOfNode(node).toString()
 
-		print('AST: ' + currentString)
+		self.astDumpWriter.writeNode(self.indentationLevel, currentString)
 
 		self.indentationLevel += 1
 		AstVisitor.traverseNode(self, node)
 		self.indentationLevel -= 1
 
 
-class AstVisitorClient:
-
-	def __init__(self):
-		self.indexedFileId = 0
-		if srctrl.isCompatible():
-			print('INFO: Loaded database is compatible.')
-		else:
-			print('WARNING: Loaded database is not compatible.')
-			print('INFO: Supported DB Version: ' + str(srctrl.getSupportedDatabaseVersion()))
-			print('INFO: Loaded DB Version: ' + str(srctrl.getLoadedDatabaseVersion()))
-
-
-	def recordSymbol(self, nameHierarchy):
-		if nameHierarchy is not None:
-			symbolId = srctrl.recordSymbol(nameHierarchy.serialize())
-			return symbolId
-		return 0
-
-
-	def recordSymbolDefinitionKind(self, symbolId, symbolDefinitionKind):
-		srctrl.recordSymbolDefinitionKind(symbolId, symbolDefinitionKind)
-
-
-	def recordSymbolKind(self, symbolId, symbolKind):
-		srctrl.recordSymbolKind(symbolId, symbolKind)
-
-
-	def recordSymbolLocation(self, symbolId, sourceRange):
-		srctrl.recordSymbolLocation(
-			symbolId,
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-	def recordSymbolScopeLocation(self, symbolId, sourceRange):
-		srctrl.recordSymbolScopeLocation(
-			symbolId,
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-	def recordSymbolSignatureLocation(self, symbolId, sourceRange):
-		srctrl.recordSymbolSignatureLocation(
-			symbolId,
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-	def recordReference(self, contextSymbolId, referencedSymbolId, referenceKind):
-		return srctrl.recordReference(
-			contextSymbolId,
-			referencedSymbolId,
-			referenceKind
-		)
-
-
-	def recordReferenceLocation(self, referenceId, sourceRange):
-		srctrl.recordReferenceLocation(
-			referenceId,
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-	def recordReferenceIsAmbiuous(self, referenceId):
-		return srctrl.recordReferenceIsAmbiuous(referenceId)
-
-
-	def recordReferenceToUnsolvedSymhol(self, contextSymbolId, referenceKind, sourceRange):
-		return srctrl.recordReferenceToUnsolvedSymhol(
-			contextSymbolId,
-			referenceKind,
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-	def recordQualifierLocation(self, referencedSymbolId, sourceRange):
-		return srctrl.recordQualifierLocation(
-			referencedSymbolId,
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-	def recordFile(self, filePath):
-		self.indexedFileId = srctrl.recordFile(filePath.replace('\\', '/'))
-		srctrl.recordFileLanguage(self.indexedFileId, 'python')
-		return self.indexedFileId
-
-
-	def recordFileLanguage(self, fileId, languageIdentifier):
-		srctrl.recordFileLanguage(fileId, languageIdentifier)
-
-
-	def recordLocalSymbol(self, name):
-		return srctrl.recordLocalSymbol(name)
-
-
-	def recordLocalSymbolLocation(self, localSymbolId, sourceRange):
-		srctrl.recordLocalSymbolLocation(
-			localSymbolId,
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-	def recordAtomicSourceRange(self, sourceRange):
-		srctrl.recordAtomicSourceRange(
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-	def recordError(self, message, fatal, sourceRange):
-		srctrl.recordError(
-			message,
-			fatal,
-			self.indexedFileId,
-			sourceRange.startLine,
-			sourceRange.startColumn,
-			sourceRange.endLine,
-			sourceRange.endColumn
-		)
-
-
-class SourceRange:
-
-	def __init__(self, startLine, startColumn, endLine, endColumn):
-		self.startLine = startLine
-		self.startColumn = startColumn
-		self.endLine = endLine
-		self.endColumn = endColumn
-
-
-	def toString(self):
-		return '[' + str(self.startLine) + ':' + str(self.startColumn) + '|' + str(self.endLine) + ':' + str(self.endColumn) + ']'
-
-
-class NameHierarchy():
-
-	unsolvedSymbolName = 'unsolved symbol' # this name should not collide with normal symbol name, because they cannot contain space characters
-
-	def __init__(self, nameElement, delimiter):
-		self.nameElements = []
-		if nameElement is not None:
-			self.nameElements.append(nameElement)
-		self.delimiter = delimiter
-
-	def copy(self):
-		ret = NameHierarchy(None, self.delimiter)
-		for nameElement in self.nameElements:
-			ret.nameElements.append(NameElement(nameElement.name, nameElement.prefix, nameElement.postfix))
-		return ret
-
-
-	def serialize(self):
-		return json.dumps(self, cls=NameHierarchyEncoder)
-
-
-	def getDisplayString(self):
-		displayString = ''
-		isFirst = True
-		for nameElement in self.nameElements:
-			if not isFirst:
-				displayString += self.delimiter
-			isFirst = False
-			if len(nameElement.prefix) > 0:
-				displayString += nameElement.prefix + ' '
-			displayString += nameElement.name
-			if len(nameElement.postfix) > 0:
-				displayString += nameElement.postfix
-		return displayString
-
-
-class NameElement:
-
-	def __init__(self, name, prefix = '', postfix = ''):
-		self.name = name
-		self.prefix = prefix
-		self.postfix = postfix
-
-
-class NameHierarchyEncoder(json.JSONEncoder):
-
-	def default(self, obj):
-		if isinstance(obj, NameHierarchy):
-			return {
-				'name_delimiter': obj.delimiter,
-				'name_elements': [nameElement.__dict__ for nameElement in obj.nameElements]
-			}
-		# Let the base class default method raise the TypeError
-		return json.JSONEncoder.default(self, obj)
-
-
-def getNameHierarchyForUnsolvedSymbol():
-	return NameHierarchy(NameElement(NameHierarchy.unsolvedSymbolName), '')
-
-
 def isQualifierNode(node):
 	nextNode = getNext(node)
 	if nextNode is not None and nextNode.type == 'trailer':
@@ -1178,6 +1173,66 @@ def getNamedParentNode(node):
 	return None
 
 
+def getRootNameNodeOfQualifiedName(node):
+	# returns "foo" for each name of "foo.bar.baz", and None if the qualified name does not start with a name
+	if node.type != 'name':
+		return None
+	if node.parent is None or node.parent.type != 'trailer' or node.parent.children[0].type != 'operator' or node.parent.children[0].value != '.':
+		return node
+	atomNode = node.parent.parent
+	if atomNode is None or atomNode.type not in ['power', 'atom_expr']:
+		return None
+	for c in atomNode.children:
+		if c.type == 'name':
+			return c
+		if c.type != 'keyword': # skips "await"
+			return None
+	return None
+
+
+def getImportedModuleNames(moduleNode, packageName = None):
+	# maps the names that are bound by any import statement of the module to the modules that they are imported from
+	importedModuleNames = {}
+	pendingNodes = [moduleNode]
+	while pendingNodes:
+		node = pendingNodes.pop()
+		if node.type in ['import_name', 'import_from']:
+			for nameNode in node.get_defined_names():
+				importedModuleNames[nameNode.value] = getImportedModuleName(node, nameNode, packageName)
+		elif hasattr(node, 'children'):
+			pendingNodes.extend(node.children)
+	return importedModuleNames
+
+
+def getImportedModuleName(importNode, nameNode, packageName = None):
+	if importNode.type == 'import_from':
+		fromNames = [n.value for n in importNode.get_from_names()]
+		if importNode.level > 0:
+			moduleName = getAbsoluteModuleName(packageName, importNode.level, fromNames)
+			if moduleName is not None:
+				return moduleName
+		return '.' * importNode.level + '.'.join(fromNames)
+	if nameNode.parent.type == 'dotted_as_name' and nameNode == nameNode.parent.children[-1]:
+		# "import foo.bar as baz" binds "baz" to "foo.bar"
+		return nameNode.parent.children[0].get_code(include_prefix=False)
+	if nameNode.parent.type == 'dotted_name':
+		# "import foo.bar" binds "foo", but the names of the statement itself are resolved into the modules up to them
+		dottedNameNode = nameNode.parent
+		return ''.join(c.get_code(include_prefix=False) for c in dottedNameNode.children[:dottedNameNode.children.index(nameNode) + 1])
+	return nameNode.value
+
+
+def getAbsoluteModuleName(packageName, level, names):
+	# "from ..foo import bar" in package "pkg.sub" imports from "pkg.foo", None if the package is unknown or the import goes
+	# beyond its top level package
+	if not packageName:
+		return None
+	packageNames = packageName.split('.')
+	if level > len(packageNames):
+		return None
+	return '.'.join(packageNames[:len(packageNames) - level + 1] + names)
+
+
 def getParentWithType(node, type):
 	if node == None:
 		return None
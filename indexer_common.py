@@ -0,0 +1,371 @@
+import codecs
+import json
+import sys
+
+import sourcetraildb as srctrl
+from _version import _sourcetrail_db_version
+from indexer_log import logger
+
+
+_virtualFilePath = 'virtual_file.py'
+# errors of ast.parse for source code it cannot handle, deeply nested code raises a RuntimeError before Python 3.5
+_astParseErrorTypes = (SyntaxError, ValueError, RecursionError if sys.version_info >= (3, 5) else RuntimeError, MemoryError)
+_astDumpIndentationToken = '| '
+
+_astDumpWriter = None
+
+
+def isAstBackendSupported():
+	return sys.version_info >= (3, 8) # the nodes of the stdlib ast module only carry their end positions since Python 3.8
+
+
+def isSourcetrailDBVersionCompatible(allowLogging = False):
+	requiredVersion = _sourcetrail_db_version
+
+	try:
+		usedVersion = srctrl.getVersionString()
+	except AttributeError:
+		if allowLogging:
+			logger.error('Used version of SourcetrailDB is incompatible to what is required by this version of SourcetrailPythonIndexer (' + requiredVersion + ').')
+		return False
+
+	if usedVersion != requiredVersion:
+		if allowLogging:
+			logger.error('Used version of SourcetrailDB (' + usedVersion + ') is incompatible to what is required by this version of SourcetrailPythonIndexer (' + requiredVersion + ').')
+		return False
+	return True
+
+
+class AstVisitorClient:
+
+	def __init__(self):
+		self.indexedFileId = 0
+		self.recordCount = 0 # number of calls that wrote to the database, used to size transactions
+		if srctrl.isCompatible():
+			logger.info('Loaded database is compatible.')
+		else:
+			logger.warning('Loaded database is not compatible.')
+			logger.info('Supported DB Version: ' + str(srctrl.getSupportedDatabaseVersion()))
+			logger.info('Loaded DB Version: ' + str(srctrl.getLoadedDatabaseVersion()))
+
+
+	def beginTransaction(self):
+		srctrl.beginTransaction()
+
+
+	def commitTransaction(self):
+		srctrl.commitTransaction()
+
+
+	def rollbackTransaction(self):
+		srctrl.rollbackTransaction()
+
+
+	def recordSymbol(self, nameHierarchy):
+		if nameHierarchy is not None:
+			self.recordCount += 1
+			symbolId = srctrl.recordSymbol(nameHierarchy.serialize())
+			return symbolId
+		return 0
+
+
+	def recordSymbolDefinitionKind(self, symbolId, symbolDefinitionKind):
+		self.recordCount += 1
+		srctrl.recordSymbolDefinitionKind(symbolId, symbolDefinitionKind)
+
+
+	def recordSymbolKind(self, symbolId, symbolKind):
+		self.recordCount += 1
+		srctrl.recordSymbolKind(symbolId, symbolKind)
+
+
+	def recordSymbolLocation(self, symbolId, sourceRange):
+		self.recordCount += 1
+		srctrl.recordSymbolLocation(
+			symbolId,
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+	def recordSymbolScopeLocation(self, symbolId, sourceRange):
+		self.recordCount += 1
+		srctrl.recordSymbolScopeLocation(
+			symbolId,
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+	def recordSymbolSignatureLocation(self, symbolId, sourceRange):
+		self.recordCount += 1
+		srctrl.recordSymbolSignatureLocation(
+			symbolId,
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+	def recordReference(self, contextSymbolId, referencedSymbolId, referenceKind):
+		self.recordCount += 1
+		return srctrl.recordReference(
+			contextSymbolId,
+			referencedSymbolId,
+			referenceKind
+		)
+
+
+	def recordReferenceLocation(self, referenceId, sourceRange):
+		self.recordCount += 1
+		srctrl.recordReferenceLocation(
+			referenceId,
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+	def recordReferenceIsAmbiuous(self, referenceId):
+		self.recordCount += 1
+		return srctrl.recordReferenceIsAmbiuous(referenceId)
+
+
+	def recordReferenceToUnsolvedSymhol(self, contextSymbolId, referenceKind, sourceRange):
+		self.recordCount += 1
+		return srctrl.recordReferenceToUnsolvedSymhol(
+			contextSymbolId,
+			referenceKind,
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+	def recordQualifierLocation(self, referencedSymbolId, sourceRange):
+		self.recordCount += 1
+		return srctrl.recordQualifierLocation(
+			referencedSymbolId,
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+	def recordFile(self, filePath):
+		self.recordCount += 1
+		self.indexedFileId = srctrl.recordFile(filePath.replace('\\', '/'))
+		srctrl.recordFileLanguage(self.indexedFileId, 'python')
+		return self.indexedFileId
+
+
+	def recordFileLanguage(self, fileId, languageIdentifier):
+		self.recordCount += 1
+		srctrl.recordFileLanguage(fileId, languageIdentifier)
+
+
+	def recordLocalSymbol(self, name):
+		self.recordCount += 1
+		return srctrl.recordLocalSymbol(name)
+
+
+	def recordLocalSymbolLocation(self, localSymbolId, sourceRange):
+		self.recordCount += 1
+		srctrl.recordLocalSymbolLocation(
+			localSymbolId,
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+	def recordAtomicSourceRange(self, sourceRange):
+		self.recordCount += 1
+		srctrl.recordAtomicSourceRange(
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+	def recordError(self, message, fatal, sourceRange):
+		self.recordCount += 1
+		srctrl.recordError(
+			message,
+			fatal,
+			self.indexedFileId,
+			sourceRange.startLine,
+			sourceRange.startColumn,
+			sourceRange.endLine,
+			sourceRange.endColumn
+		)
+
+
+class AstDumpWriter:
+
+	# Writes the AST dumps of verbose indexing runs. The indentation string of every depth is only built once, and lines that go
+	# to a file are collected and written in batches. Lines that go to the console are written right away, so they stay in
+	# order with all other console output.
+	def __init__(self, output = None, bufferLineCount = 4096):
+		self.output = output
+		self.bufferLineCount = bufferLineCount
+		self.indentations = ['']
+		self.lines = []
+
+
+	def writeNode(self, depth, description):
+		indentations = self.indentations
+		while len(indentations) <= depth:
+			indentations.append(indentations[-1] + _astDumpIndentationToken)
+
+		line = 'AST: ' + indentations[depth] + description + '\n'
+		if self.output is None:
+			sys.stdout.write(line)
+			return
+
+		self.lines.append(line)
+		if len(self.lines) >= self.bufferLineCount:
+			self.flush()
+
+
+	def flush(self):
+		if self.output is not None and self.lines:
+			self.output.writelines(self.lines)
+			self.lines = []
+
+
+	def close(self):
+		self.flush()
+		if self.output is not None:
+			self.output.close()
+			self.output = None
+
+
+def openAstDumpWriter(filePath):
+	# the dump is gzip compressed if the path ends with ".gz"
+	if filePath.endswith('.gz'):
+		import gzip
+		return AstDumpWriter(codecs.getwriter('utf-8')(gzip.open(filePath, 'wb')))
+	return AstDumpWriter(codecs.open(filePath, 'w', encoding='utf-8'))
+
+
+def getAstDumpWriter():
+	# the writer is shared by all verbose visitors of the process and writes to the console unless another writer has been set
+	global _astDumpWriter
+	if _astDumpWriter is None:
+		_astDumpWriter = AstDumpWriter()
+	return _astDumpWriter
+
+
+def setAstDumpWriter(astDumpWriter):
+	global _astDumpWriter
+	_astDumpWriter = astDumpWriter
+
+
+class SourceRange:
+
+	def __init__(self, startLine, startColumn, endLine, endColumn):
+		self.startLine = startLine
+		self.startColumn = startColumn
+		self.endLine = endLine
+		self.endColumn = endColumn
+
+
+	def toString(self):
+		return '[' + str(self.startLine) + ':' + str(self.startColumn) + '|' + str(self.endLine) + ':' + str(self.endColumn) + ']'
+
+
+class NameHierarchy():
+
+	unsolvedSymbolName = 'unsolved symbol' # this name should not collide with normal symbol name, because they cannot contain space characters
+
+	def __init__(self, nameElement, delimiter):
+		self.nameElements = []
+		if nameElement is not None:
+			self.nameElements.append(nameElement)
+		self.delimiter = delimiter
+
+	def copy(self):
+		ret = NameHierarchy(None, self.delimiter)
+		for nameElement in self.nameElements:
+			ret.nameElements.append(NameElement(nameElement.name, nameElement.prefix, nameElement.postfix))
+		return ret
+
+
+	def serialize(self):
+		return json.dumps(self, cls=NameHierarchyEncoder)
+
+
+	def getDisplayString(self):
+		displayString = ''
+		isFirst = True
+		for nameElement in self.nameElements:
+			if not isFirst:
+				displayString += self.delimiter
+			isFirst = False
+			if len(nameElement.prefix) > 0:
+				displayString += nameElement.prefix + ' '
+			displayString += nameElement.name
+			if len(nameElement.postfix) > 0:
+				displayString += nameElement.postfix
+		return displayString
+
+
+class NameElement:
+
+	def __init__(self, name, prefix = '', postfix = ''):
+		self.name = name
+		self.prefix = prefix
+		self.postfix = postfix
+
+
+class NameHierarchyEncoder(json.JSONEncoder):
+
+	def default(self, obj):
+		if isinstance(obj, NameHierarchy):
+			return {
+				'name_delimiter': obj.delimiter,
+				'name_elements': [nameElement.__dict__ for nameElement in obj.nameElements]
+			}
+		# Let the base class default method raise the TypeError
+		return json.JSONEncoder.default(self, obj)
+
+
+def getNameHierarchyForUnsolvedSymbol():
+	return NameHierarchy(NameElement(NameHierarchy.unsolvedSymbolName), '')
+
+
+def getNameHierarchyFromDottedName(dottedName):
+	nameHierarchy = None
+	for name in dottedName.split('.'):
+		if nameHierarchy is None:
+			nameHierarchy = NameHierarchy(NameElement(name), '.')
+		else:
+			nameHierarchy.nameElements.append(NameElement(name))
+	return nameHierarchy
+
+
+def getNameHierarchyFromSerializedName(serializedName):
+	data = json.loads(serializedName)
+	nameHierarchy = NameHierarchy(None, data['name_delimiter'])
+	for nameElement in data['name_elements']:
+		nameHierarchy.nameElements.append(NameElement(nameElement['name'], nameElement['prefix'], nameElement['postfix']))
+	return nameHierarchy
@@ -0,0 +1,122 @@
+import logging
+import sys
+
+
+# All messages of the indexer go through one logger that writes them as "LEVEL: message" lines, which is the format that the
+# indexer has always used for its console output. A filter counts the messages of every level and suppresses repetitions of
+# the same message beyond a limit, so e.g. an exception that is raised for every name of a file does not flood the console.
+# Messages with arguments are grouped by their format string, which is only applied to messages that are actually written.
+# Messages that differ for every file pass their file path as an argument, so they form one group as well. At most a fixed
+# number of groups is counted, further messages are written without counting their repetitions.
+# Checking "isEnabledFor" before preparing the arguments of a message keeps hot paths free of any cost if the level is disabled.
+
+_loggerName = 'SourcetrailPythonIndexer'
+_defaultMaxRepetitionCount = 100
+_maxCountedMessageCount = 10000
+
+logger = logging.getLogger(_loggerName)
+
+_levelNames = {
+	'info': logging.INFO,
+	'warning': logging.WARNING,
+	'error': logging.ERROR,
+}
+
+
+class ConsoleHandler(logging.StreamHandler):
+
+	# Looks up sys.stdout for every message instead of keeping the stream that was current when the handler was created, so
+	# redirecting stdout redirects the log as well.
+	def __init__(self):
+		logging.StreamHandler.__init__(self)
+
+
+	@property
+	def stream(self):
+		return sys.stdout
+
+
+	@stream.setter
+	def stream(self, stream):
+		pass
+
+
+class RepetitionFilter(logging.Filter):
+
+	def __init__(self, maxRepetitionCount = _defaultMaxRepetitionCount, maxMessageCount = _maxCountedMessageCount):
+		logging.Filter.__init__(self)
+		self.maxRepetitionCount = maxRepetitionCount
+		self.maxMessageCount = maxMessageCount
+		self.levelCounts = {}
+		self.messageCounts = {}
+
+
+	def filter(self, record):
+		self.levelCounts[record.levelname] = self.levelCounts.get(record.levelname, 0) + 1
+
+		key = (record.levelname, record.msg)
+		count = self.messageCounts.get(key, 0) + 1
+		if count == 1 and len(self.messageCounts) >= self.maxMessageCount:
+			return True
+		self.messageCounts[key] = count
+		return self.maxRepetitionCount <= 0 or count <= self.maxRepetitionCount
+
+
+	def getSuppressedMessageCounts(self):
+		# returns (level name, message, number of suppressed repetitions) tuples
+		if self.maxRepetitionCount <= 0:
+			return []
+		return [
+			(levelName, message, count - self.maxRepetitionCount) for (levelName, message), count in sorted(self.messageCounts.items())
+			if count > self.maxRepetitionCount
+		]
+
+
+def configureLogging(level = logging.WARNING, sinkPath = None, maxRepetitionCount = _defaultMaxRepetitionCount):
+	# messages are written to stdout unless the path of a sink file is specified, "-" writes them to stderr
+	if sinkPath is None:
+		handler = ConsoleHandler()
+	elif sinkPath == '-':
+		handler = logging.StreamHandler(sys.stderr)
+	else:
+		handler = logging.FileHandler(sinkPath, 'w', encoding='utf-8')
+	handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+
+	for oldHandler in list(logger.handlers):
+		logger.removeHandler(oldHandler)
+		oldHandler.close()
+	for oldFilter in list(logger.filters):
+		logger.removeFilter(oldFilter)
+
+	logger.addHandler(handler)
+	logger.addFilter(RepetitionFilter(maxRepetitionCount))
+	logger.setLevel(level)
+	logger.propagate = False
+
+
+def getLevel(levelName):
+	return _levelNames[levelName]
+
+
+def getRepetitionFilter():
+	for loggerFilter in logger.filters:
+		if isinstance(loggerFilter, RepetitionFilter):
+			return loggerFilter
+	return None
+
+
+def logSummary():
+	# reports the repetitions that have been suppressed and the number of warnings and errors, if there have been any
+	repetitionFilter = getRepetitionFilter()
+	if repetitionFilter is None:
+		return
+
+	suppressedMessageCounts = repetitionFilter.getSuppressedMessageCounts()
+	levelCounts = dict(repetitionFilter.levelCounts)
+	for levelName, message, count in suppressedMessageCounts:
+		logger.info('Suppressed %d repetitions of %s message "%s".', count, levelName, message)
+	if levelCounts.get('WARNING', 0) > 0 or levelCounts.get('ERROR', 0) > 0:
+		logger.info('Logged %d warnings and %d errors.', levelCounts.get('WARNING', 0), levelCounts.get('ERROR', 0))
+
+
+configureLogging()
@@ -0,0 +1,510 @@
+import os
+import time
+
+import memory_policy
+import shallow_indexer
+import sourcetraildb as srctrl
+from indexer_common import AstVisitorClient
+from indexer_log import logger
+
+
+class CommitPolicy:
+
+	# A transaction is committed as soon as any of the limits is reached after a file has been indexed. A limit of 0 is
+	# disabled, so a policy without any limits keeps one transaction open until the database is closed.
+	def __init__(self, fileCount = 1, recordCount = 0, duration = 0.0):
+		self.fileCount = fileCount
+		self.recordCount = recordCount
+		self.duration = duration
+
+
+	def isCommitRequired(self, fileCount, recordCount, duration):
+		if self.fileCount > 0 and fileCount >= self.fileCount:
+			return True
+		if self.recordCount > 0 and recordCount >= self.recordCount:
+			return True
+		if self.duration > 0 and duration >= self.duration:
+			return True
+		return False
+
+
+class LargeFilePolicy:
+
+	# Generated modules and vendored single-file libraries with tens of thousands of lines hold up deep indexing for a very long
+	# time, so files that exceed any of the limits are indexed with the faster fallback mode ("shallow" or "outline") instead.
+	# A limit of 0 is disabled. The leaf count requires parsing the file, so it is only checked if the file is within the other
+	# limits.
+	def __init__(self, maxByteCount = 0, maxLineCount = 0, maxLeafCount = 0, fallbackMode = 'shallow'):
+		self.maxByteCount = maxByteCount
+		self.maxLineCount = maxLineCount
+		self.maxLeafCount = maxLeafCount
+		self.fallbackMode = fallbackMode
+
+
+	def getExceededLimit(self, sourceFilePath, parseCache = None, sourceCode = None):
+		# returns a description of the first limit that the file exceeds, None if the file is within all limits
+		exceededLimit = self.getExceededByteLimit(sourceFilePath)
+		if exceededLimit is not None or (self.maxLineCount <= 0 and self.maxLeafCount <= 0):
+			return exceededLimit
+		if sourceCode is None:
+			sourceCode = readSourceFile(sourceFilePath, False)
+
+		exceededLimit = self.getExceededLineLimit(sourceCode)
+		if exceededLimit is not None:
+			return exceededLimit
+		return self.getExceededLeafLimit(sourceCode, sourceFilePath, parseCache)
+
+
+	def getExceededByteLimit(self, sourceFilePath):
+		if self.maxByteCount > 0:
+			byteCount = os.path.getsize(sourceFilePath)
+			if byteCount > self.maxByteCount:
+				return str(byteCount) + ' bytes (limit: ' + str(self.maxByteCount) + ')'
+		return None
+
+
+	def getExceededLineLimit(self, sourceCode):
+		if self.maxLineCount > 0:
+			lineCount = len(sourceCode.splitlines())
+			if lineCount > self.maxLineCount:
+				return str(lineCount) + ' lines (limit: ' + str(self.maxLineCount) + ')'
+		return None
+
+
+	def getExceededLeafLimit(self, sourceCode, sourceFilePath, parseCache = None):
+		if self.maxLeafCount > 0:
+			leafCount = getLeafCount(shallow_indexer.parseSourceCode(sourceCode, sourceFilePath, parseCache))
+			if leafCount > self.maxLeafCount:
+				return str(leafCount) + ' leaves (limit: ' + str(self.maxLeafCount) + ')'
+		return None
+
+
+	def getFallbackMode(self, isShallow):
+		# returns whether a file that exceeds a limit is indexed shallow and whether it is indexed in outline mode
+		if self.fallbackMode == 'outline':
+			return isShallow, True
+		return True, False
+
+
+class IndexingSession:
+
+	def __init__(self, workingDirectory, environmentPath = None, isVerbose = False, isShallow = False, parseCache = None, commitPolicy = None, memoryPolicy = None, memoryReport = None, projectSymbolTable = None, shallowBackend = 'parso', isOutline = False, largeFilePolicy = None):
+		self.workingDirectory = workingDirectory
+		self.environmentPath = environmentPath
+		self.isVerbose = isVerbose
+		self.isShallow = isShallow
+		self.parseCache = parseCache
+		self.commitPolicy = commitPolicy if commitPolicy is not None else CommitPolicy()
+		self.memoryPolicy = memoryPolicy
+		self.memoryReport = memoryReport
+		self.projectSymbolTable = projectSymbolTable
+		self.shallowBackend = shallowBackend
+		self.isOutline = isOutline
+		self.largeFilePolicy = largeFilePolicy
+
+		self.databaseFilePath = None
+		self.recordStreamOutput = None
+		self.callRecordingOutput = None
+		self.contentHashTable = None
+		self.uncommittedContentHashes = {}
+		self.progressReport = None
+		self.astVisitorClient = None
+		self.isTransactionOpen = False
+		self.transactionStartTime = 0.0
+		self.uncommittedFiles = []
+
+		self.commitCount = 0
+		self.commitDuration = 0.0
+		self.committedFileCount = 0
+		self.committedRecordCount = 0
+
+
+	def openDatabase(self, databaseFilePath, clear = False):
+		if self.databaseFilePath is not None or self.recordStreamOutput is not None:
+			self.closeDatabase()
+
+		if not srctrl.open(databaseFilePath):
+			logger.error(srctrl.getLastError())
+			return False
+		self.databaseFilePath = databaseFilePath
+
+		if clear:
+			if self.isVerbose:
+				logger.info('Clearing database...')
+			if not srctrl.clear():
+				logger.error(srctrl.getLastError())
+			else:
+				if self.isVerbose:
+					logger.info('Clearing done.')
+
+		if self.isVerbose:
+			if srctrl.isEmpty():
+				logger.info('Loaded database is empty.')
+			else:
+				logger.info('Loaded database contains data.')
+
+		self.astVisitorClient = AstVisitorClient()
+		return True
+
+
+	def openRecordStream(self, recordStreamFilePath):
+		# the recorded data is appended to a record stream that can be loaded into a database later on
+		import record_stream
+
+		if self.databaseFilePath is not None or self.recordStreamOutput is not None:
+			self.closeDatabase()
+
+		self.recordStreamOutput = record_stream.openRecordStream(recordStreamFilePath, 'w')
+		self.astVisitorClient = record_stream.RecordStreamClient(self.recordStreamOutput)
+		return True
+
+
+	def startRecordingCalls(self, recordStreamFilePath):
+		# all calls written to the open database are recorded to a record stream as well, so they can be replayed later on
+		import record_stream
+
+		self.callRecordingOutput = record_stream.openRecordStream(recordStreamFilePath, 'w')
+		self.astVisitorClient = record_stream.RecordingAstVisitorClient(self.astVisitorClient, self.callRecordingOutput)
+
+
+	def startReportingProgress(self, progressReport):
+		# the names and references recorded for each file are counted by a client that wraps the current one
+		import progress_report
+
+		self.astVisitorClient = progress_report.CountingAstVisitorClient(self.astVisitorClient)
+		self.progressReport = progressReport
+		self.progressReport.client = self.astVisitorClient
+
+
+	def startSkippingUnchangedFiles(self, clear = False):
+		# files whose content, indexer version and indexing mode match the last indexing run are skipped if the database still
+		# contains them
+		import content_hash_table
+
+		self.contentHashTable = content_hash_table.ContentHashTable(self.databaseFilePath)
+		if clear:
+			self.contentHashTable.clear()
+
+
+	def closeDatabase(self):
+		if self.recordStreamOutput is not None:
+			self.commitTransaction()
+			self.recordStreamOutput.close()
+			self.recordStreamOutput = None
+			self.astVisitorClient = None
+			return
+
+		if self.databaseFilePath is None:
+			return
+		self.commitTransaction()
+		if self.contentHashTable is not None:
+			self.contentHashTable.close()
+			self.contentHashTable = None
+		if self.callRecordingOutput is not None:
+			self.callRecordingOutput.close()
+			self.callRecordingOutput = None
+		self.databaseFilePath = None
+		self.astVisitorClient = None
+		if not srctrl.close():
+			logger.error(srctrl.getLastError())
+
+
+	def getEnvironment(self, environmentPath):
+		import indexer # jedi is only imported when deep indexing is actually needed
+
+		# the environment is shared with all other sessions of this process, and its subprocess is restarted if it has died
+		return indexer.getEnvironment(environmentPath)
+
+
+	def getShallowIndexer(self):
+		if self.shallowBackend == 'ast':
+			import shallow_ast_indexer
+			return shallow_ast_indexer
+		return shallow_indexer
+
+
+	def getIndexingMode(self, environmentPath, isShallow, isOutline):
+		if isOutline:
+			return 'outline'
+		if isShallow:
+			return 'shallow:' + self.shallowBackend
+		return 'deep:' + (environmentPath or '')
+
+
+	def indexFile(self, sourceFilePath, environmentPath = None, isShallow = None, skipIfUnchanged = True):
+		# every file is finished in the progress report, even if it fails before its indexing has started
+		sourceFilePath = os.path.abspath(sourceFilePath)
+		finishedFileCount = self.progressReport.finishedFileCount if self.progressReport is not None else 0
+		try:
+			self.indexOrSkipFile(sourceFilePath, environmentPath, isShallow, skipIfUnchanged)
+		finally:
+			if self.progressReport is not None and self.progressReport.finishedFileCount == finishedFileCount:
+				self.progressReport.failFile(sourceFilePath)
+
+
+	def indexOrSkipFile(self, sourceFilePath, environmentPath, isShallow, skipIfUnchanged):
+		if environmentPath is None:
+			environmentPath = self.environmentPath
+		if isShallow is None:
+			isShallow = self.isShallow
+		isOutline = self.isOutline
+
+		largeFilePolicy = None
+		if self.largeFilePolicy is not None and not isOutline and (not isShallow or self.largeFilePolicy.fallbackMode == 'outline'):
+			largeFilePolicy = self.largeFilePolicy
+
+		# The byte limit is checked first, because it does not require reading the file. The file is read only once and decoded
+		# before anything is recorded, so a file that cannot be read does not roll back the others.
+		exceededLimit = None
+		if largeFilePolicy is not None:
+			exceededLimit = largeFilePolicy.getExceededByteLimit(sourceFilePath)
+		with open(sourceFilePath, 'rb') as input:
+			sourceBytes = input.read()
+		sourceCode = decodeSourceCode(sourceBytes, False)
+		if largeFilePolicy is not None and exceededLimit is None:
+			exceededLimit = largeFilePolicy.getExceededLineLimit(sourceCode)
+		isLeafLimitPending = largeFilePolicy is not None and exceededLimit is None and largeFilePolicy.maxLeafCount > 0
+		if exceededLimit is not None:
+			isShallow, isOutline = self.fallBackForLargeFile(sourceFilePath, exceededLimit, isShallow)
+
+		if self.contentHashTable is not None:
+			import content_hash_table
+			contentHash = content_hash_table.getContentHash(sourceBytes)
+			if skipIfUnchanged and self.isFileUnchanged(sourceFilePath, contentHash, environmentPath, isShallow, isOutline, isLeafLimitPending):
+				self.contentHashTable.skippedFileCount += 1
+				if self.isVerbose:
+					logger.info('Skipping unchanged source file "%s".', sourceFilePath)
+				if self.progressReport is not None:
+					self.progressReport.skipFile(sourceFilePath)
+				return
+
+		if isLeafLimitPending:
+			exceededLimit = largeFilePolicy.getExceededLeafLimit(sourceCode, sourceFilePath, self.parseCache)
+			if exceededLimit is not None:
+				isShallow, isOutline = self.fallBackForLargeFile(sourceFilePath, exceededLimit, isShallow)
+
+		progressCallback = None
+		if exceededLimit is not None:
+			progressCallback = createProgressCallback(sourceCode)
+		if not isShallow and not isOutline:
+			sourceCode = decodeSourceCode(sourceBytes, True)
+		if self.contentHashTable is not None:
+			self.uncommittedContentHashes[sourceFilePath] = (contentHash, self.getIndexingMode(environmentPath, isShallow, isOutline))
+
+		if not self.isTransactionOpen:
+			self.beginTransaction()
+
+		if self.memoryReport is not None:
+			self.memoryReport.startFile(sourceFilePath)
+		if self.progressReport is not None:
+			self.progressReport.startFile(sourceFilePath)
+
+		isPeakReset = False
+		if self.isVerbose or self.memoryPolicy is not None:
+			isPeakReset = memory_policy.resetPeakResidentSetSize()
+
+		recordCount = self.astVisitorClient.recordCount
+		counts = self.progressReport.client.getCounts() if self.progressReport is not None else None
+		try:
+			self.indexFileInTransaction(sourceFilePath, environmentPath, isShallow, isOutline, progressCallback, sourceCode)
+		except Exception:
+			if self.memoryReport is not None:
+				self.memoryReport.finishFile(False)
+			if self.progressReport is not None:
+				self.progressReport.finishFile(False)
+			self.uncommittedContentHashes.pop(sourceFilePath, None)
+			if self.astVisitorClient.recordCount != recordCount:
+				# only needed if the failed file has recorded anything, the counts of the progress report are restored because the
+				# files that are indexed again have been counted already and the data of the failed file is discarded
+				self.rollbackTransaction()
+				if counts is not None:
+					self.progressReport.client.setCounts(counts)
+			raise
+
+		if self.memoryReport is not None:
+			self.memoryReport.finishFile()
+		if self.progressReport is not None:
+			self.progressReport.finishFile()
+
+		self.uncommittedFiles.append((sourceFilePath, environmentPath, isShallow, isOutline))
+		if self.commitPolicy.isCommitRequired(
+			len(self.uncommittedFiles),
+			self.astVisitorClient.recordCount,
+			time.time() - self.transactionStartTime
+		):
+			self.commitTransaction()
+
+		self.manageMemory(sourceFilePath, isPeakReset)
+
+
+	def fallBackForLargeFile(self, sourceFilePath, exceededLimit, isShallow):
+		logger.info('Source file "%s" has %s, indexing it in %s mode.', sourceFilePath, exceededLimit, self.largeFilePolicy.fallbackMode)
+		return self.largeFilePolicy.getFallbackMode(isShallow)
+
+
+	def isFileUnchanged(self, sourceFilePath, contentHash, environmentPath, isShallow, isOutline, isLeafLimitPending):
+		if self.contentHashTable.isFileUnchanged(sourceFilePath, contentHash, self.getIndexingMode(environmentPath, isShallow, isOutline)):
+			return True
+		if not isLeafLimitPending:
+			return False
+		# the leaf limit requires parsing the file, so an unchanged file that has exceeded it before is recognized by the mode
+		# it has been indexed in
+		fallbackIsShallow, fallbackIsOutline = self.largeFilePolicy.getFallbackMode(isShallow)
+		return self.contentHashTable.isFileUnchanged(
+			sourceFilePath, contentHash, self.getIndexingMode(environmentPath, fallbackIsShallow, fallbackIsOutline)
+		)
+
+
+	def indexFileInTransaction(self, sourceFilePath, environmentPath, isShallow, isOutline, progressCallback = None, sourceCode = None):
+		if isOutline:
+			import outline_indexer
+			outline_indexer.indexSourceFile(
+				sourceFilePath,
+				environmentPath,
+				self.workingDirectory,
+				self.astVisitorClient,
+				self.isVerbose,
+				self.parseCache,
+				progressCallback,
+				sourceCode
+			)
+		elif isShallow:
+			self.getShallowIndexer().indexSourceFile(
+				sourceFilePath,
+				environmentPath,
+				self.workingDirectory,
+				self.astVisitorClient,
+				self.isVerbose,
+				self.parseCache,
+				self.projectSymbolTable,
+				progressCallback,
+				sourceCode
+			)
+		else:
+			import indexer
+			indexer.indexSourceFile(
+				sourceFilePath,
+				environmentPath,
+				self.workingDirectory,
+				self.astVisitorClient,
+				self.isVerbose,
+				self.parseCache,
+				self.getEnvironment(environmentPath),
+				sourceCode
+			)
+
+
+	def beginTransaction(self):
+		self.astVisitorClient.beginTransaction()
+		self.isTransactionOpen = True
+		self.transactionStartTime = time.time()
+		self.astVisitorClient.recordCount = 0
+
+
+	def commitTransaction(self):
+		if not self.isTransactionOpen:
+			return
+
+		fileCount = len(self.uncommittedFiles)
+		recordCount = self.astVisitorClient.recordCount
+
+		startTime = time.time()
+		self.astVisitorClient.commitTransaction()
+		duration = time.time() - startTime
+
+		self.isTransactionOpen = False
+		if self.contentHashTable is not None:
+			self.contentHashTable.storeContentHashes([
+				(path, ) + self.uncommittedContentHashes[path] for path, environmentPath, isShallow, isOutline in self.uncommittedFiles
+				if path in self.uncommittedContentHashes
+			])
+		self.uncommittedContentHashes = {}
+		self.uncommittedFiles = []
+
+		self.commitCount += 1
+		self.commitDuration += duration
+		self.committedFileCount += fileCount
+		self.committedRecordCount += recordCount
+
+		if self.isVerbose:
+			logger.info(
+				'Committed %d files with %d records in %.3f seconds (transaction was open for %.3f seconds).',
+				fileCount, recordCount, duration, startTime - self.transactionStartTime
+			)
+
+
+	def manageMemory(self, sourceFilePath, isPeakReset = False):
+		# the peak is only reported if it has been reset before indexing the file, otherwise it is the peak of the whole process
+		if self.isVerbose or self.memoryPolicy is not None:
+			if isPeakReset:
+				logger.info(
+					'Memory after indexing "%s": %s resident, %s peak while indexing the file.', sourceFilePath,
+					memory_policy.formatMegabytes(memory_policy.getResidentSetSize()), memory_policy.formatMegabytes(memory_policy.getPeakResidentSetSize())
+				)
+			else:
+				logger.info('Memory after indexing "%s": %s resident.', sourceFilePath, memory_policy.formatMegabytes(memory_policy.getResidentSetSize()))
+
+		if self.memoryPolicy is not None and self.memoryPolicy.isEvictionRequired():
+			evicted = self.memoryPolicy.evictCaches(self.parseCache)
+			logger.info(
+				'Memory limit exceeded, evicted %s. Now at %s resident.', ', '.join(evicted), memory_policy.formatMegabytes(memory_policy.getResidentSetSize())
+			)
+
+
+	def getCommitStatisticsString(self):
+		return (
+			'Commits: ' + str(self.commitCount) + ' transactions with ' + str(self.committedFileCount) + ' files and ' +
+			str(self.committedRecordCount) + ' records, ' + '{:.3f}'.format(self.commitDuration) + ' seconds spent committing.'
+		)
+
+
+	def rollbackTransaction(self):
+		# Rolling back discards the partially recorded data of the failed file, but also everything that has been recorded for the
+		# other files of the current transaction. Those files have been indexed successfully before, so they are indexed again.
+		self.astVisitorClient.rollbackTransaction()
+		self.isTransactionOpen = False
+
+		uncommittedFiles = self.uncommittedFiles
+		self.uncommittedFiles = []
+		self.uncommittedContentHashes = dict(
+			(path, self.uncommittedContentHashes[path]) for path, environmentPath, isShallow, isOutline in uncommittedFiles
+			if path in self.uncommittedContentHashes
+		)
+		if uncommittedFiles:
+			self.beginTransaction()
+			for sourceFilePath, environmentPath, isShallow, isOutline in uncommittedFiles:
+				self.indexFileInTransaction(sourceFilePath, environmentPath, isShallow, isOutline)
+			self.uncommittedFiles = uncommittedFiles
+
+
+def readSourceFile(sourceFilePath, isDeep):
+	with open(sourceFilePath, 'rb') as input:
+		return decodeSourceCode(input.read(), isDeep)
+
+
+def decodeSourceCode(sourceBytes, isDeep):
+	# the deep indexer has always read files without translating line endings, the other modes use universal newlines
+	sourceCode = sourceBytes.decode('utf-8')
+	if isDeep:
+		return sourceCode
+	return sourceCode.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def createProgressCallback(sourceCode):
+	lineCount = max(len(sourceCode.splitlines()), 1)
+
+	def reportProgress(name, lastLine):
+		logger.info('Indexed "%s" up to line %d of %d (%.0f%%).', name, lastLine, lineCount, 100.0 * lastLine / lineCount)
+	return reportProgress
+
+
+def getLeafCount(node):
+	leafCount = 0
+	pendingNodes = [node]
+	while pendingNodes:
+		node = pendingNodes.pop()
+		if hasattr(node, 'children'):
+			pendingNodes.extend(node.children)
+		else:
+			leafCount += 1
+	return leafCount
@@ -0,0 +1,107 @@
+import gc
+import os
+import sys
+
+from parso.cache import parser_cache
+
+try:
+	import resource
+except ImportError: # not available on Windows
+	resource = None
+
+
+class MemoryPolicy:
+
+	# Caches are evicted between two files as soon as any of the limits is exceeded. A limit of 0 is disabled.
+	def __init__(self, maxResidentSetSize = 0, maxCachedModuleCount = 0):
+		self.maxResidentSetSize = maxResidentSetSize
+		self.maxCachedModuleCount = maxCachedModuleCount
+		self.evictionCount = 0
+
+
+	def isEvictionRequired(self):
+		if self.maxCachedModuleCount > 0 and getCachedModuleCount() > self.maxCachedModuleCount:
+			return True
+		if self.maxResidentSetSize > 0:
+			residentSetSize = getResidentSetSize()
+			if residentSetSize is not None and residentSetSize > self.maxResidentSetSize:
+				return True
+		return False
+
+
+	def evictCaches(self, parseCache = None):
+		# Returns a description of everything that has been evicted. The parser cache holds the trees of all indexed
+		# files and of every module jedi had to load for resolving them, which makes up most of the memory of a long run.
+		# A parse cache that tracks the trees of parso's cache, like the DiffParseCache, is cleared along with it.
+		evicted = []
+
+		cachedModuleCount = getCachedModuleCount()
+		parser_cache.clear()
+		if parseCache is not None and hasattr(parseCache, 'clear'):
+			parseCache.clear()
+		evicted.append(str(cachedModuleCount) + ' parsed module trees')
+
+		if 'jedi' in sys.modules: # jedi caches only exist if deep indexing has been used
+			import jedi.cache
+			timeCacheCount = sum(len(c) for c in jedi.cache._time_caches.values())
+			jedi.cache.clear_time_caches(delete_all=True)
+			evicted.append(str(timeCacheCount) + ' jedi time cache entries')
+
+		if 'module_locator' in sys.modules:
+			import module_locator
+			module_locator.clearModuleLocatorCaches()
+			evicted.append('module locations')
+
+		evicted.append(str(gc.collect()) + ' unreachable objects')
+
+		self.evictionCount += 1
+		return evicted
+
+
+def getCachedModuleCount():
+	return sum(len(modules) for modules in parser_cache.values())
+
+
+def getResidentSetSize():
+	# returns the current resident set size of this process in bytes, where /proc is not available this falls back to the peak
+	try:
+		with open('/proc/self/statm', 'r') as input:
+			return int(input.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+	except (IOError, OSError, ValueError, AttributeError):
+		pass
+	return getPeakResidentSetSize()
+
+
+def resetPeakResidentSetSize():
+	# Linux resets the highest resident set size of the process to the current one when "5" is written to clear_refs, so the
+	# peak read afterwards only covers what has happened since. Returns False where the peak cannot be reset.
+	try:
+		with open('/proc/self/clear_refs', 'w') as output:
+			output.write('5')
+		return True
+	except (IOError, OSError):
+		return False
+
+
+def getPeakResidentSetSize():
+	# returns the highest resident set size this process has had so far in bytes or None if it cannot be determined on this platform
+	try:
+		with open('/proc/self/status', 'r') as input:
+			for line in input:
+				if line.startswith('VmHWM:'): # more accurate than getrusage, which is only updated lazily
+					return int(line.split()[1]) * 1024
+	except (IOError, OSError, ValueError):
+		pass
+
+	if resource is None:
+		return None
+	peakResidentSetSize = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform != 'darwin': # Linux reports kilobytes, macOS bytes
+		peakResidentSetSize *= 1024
+	return peakResidentSetSize
+
+
+def formatMegabytes(byteCount):
+	if byteCount is None:
+		return 'unknown'
+	return '{:.1f}'.format(byteCount / (1024.0 * 1024.0)) + ' MB'
@@ -0,0 +1,87 @@
+import json
+import os
+
+try:
+	import tracemalloc
+except ImportError: # not available before Python 3.4
+	tracemalloc = None
+
+
+# allocations of the modules of the indexer are attributed to the module itself, so modules added later on show up as well
+_indexerDirectoryPath = os.path.dirname(os.path.abspath(__file__))
+_componentPackageNames = ['jedi', 'parso']
+_otherComponentName = 'other'
+
+
+class MemoryReport:
+
+	# Writes one JSON object per indexed file to the output file, containing the peak of the memory traced while
+	# indexing the file, the traced memory that was still allocated afterwards grouped by component and the top
+	# allocation sites.
+	def __init__(self, outputFilePath, topAllocationCount = 10):
+		self.outputFilePath = outputFilePath
+		self.topAllocationCount = topAllocationCount
+		self.sourceFilePath = None
+
+		with open(self.outputFilePath, 'w'):
+			pass # start with an empty report
+
+
+	def startFile(self, sourceFilePath):
+		if tracemalloc.is_tracing():
+			tracemalloc.stop() # resets the traces and the peak
+		self.sourceFilePath = sourceFilePath
+		tracemalloc.start()
+
+
+	def finishFile(self, isSuccessful = True):
+		snapshot = tracemalloc.take_snapshot()
+		currentSize, peakSize = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+
+		snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+		componentSizes = {}
+		for statistic in snapshot.statistics('filename'):
+			componentName = getComponentName(statistic.traceback[0].filename)
+			componentSizes[componentName] = componentSizes.get(componentName, 0) + statistic.size
+
+		topAllocations = []
+		for statistic in snapshot.statistics('lineno')[:self.topAllocationCount]:
+			frame = statistic.traceback[0]
+			topAllocations.append({
+				'component': getComponentName(frame.filename),
+				'file_path': frame.filename,
+				'line': frame.lineno,
+				'size': statistic.size,
+				'count': statistic.count
+			})
+
+		entry = {
+			'source_file_path': self.sourceFilePath,
+			'successful': isSuccessful,
+			'peak_size': peakSize,
+			'current_size': currentSize,
+			'component_sizes': componentSizes,
+			'top_allocations': topAllocations
+		}
+		with open(self.outputFilePath, 'a') as output:
+			output.write(json.dumps(entry, sort_keys=True) + '\n')
+
+		self.sourceFilePath = None
+
+
+def isMemoryReportSupported():
+	return tracemalloc is not None
+
+
+def getComponentName(filePath):
+	directoryPath, fileName = os.path.split(os.path.abspath(filePath))
+	if directoryPath == _indexerDirectoryPath and fileName.endswith('.py'):
+		return fileName[:-len('.py')]
+
+	pathParts = os.path.normpath(filePath).split(os.sep)
+	for packageName in _componentPackageNames:
+		if packageName in pathParts:
+			return packageName
+	return _otherComponentName
@@ -0,0 +1,150 @@
+import os
+
+
+_packageInitFileNames = ['__init__.py', '__init__.pyi']
+_sourceFileExtensions = ['.py', '.pyi']
+_extensionModuleFileExtensions = ['.so', '.pyd']
+
+_directoryEntries = {}
+_moduleLocators = {}
+
+
+class ModuleLocator:
+
+	# Maps dotted module names to the files that define them, following the rules of Python's path based import system.
+	# Every directory is listed at most once and every lookup is cached, so resolving an import is a dictionary lookup
+	# in most cases. Modules that are compiled into the interpreter (like "sys") are not backed by a file and are not found.
+	def __init__(self, sysPath):
+		self.sysPath = [os.path.abspath(p) for p in sysPath if p]
+		self.modulePaths = {}
+
+
+	def locateModule(self, moduleName):
+		# returns the path of the file (or the directory of a namespace package) that defines the module, None if there is none
+		if moduleName in self.modulePaths:
+			return self.modulePaths[moduleName]
+
+		parentModuleName, separator, name = moduleName.rpartition('.')
+		if not name:
+			modulePath = None
+		elif parentModuleName:
+			modulePath = None
+			parentModulePath = self.locateModule(parentModuleName)
+			if parentModulePath is not None:
+				modulePath = locateModuleInDirectories(name, getSearchDirectoryPaths(parentModulePath))
+		else:
+			modulePath = locateModuleInDirectories(name, self.sysPath)
+
+		self.modulePaths[moduleName] = modulePath
+		return modulePath
+
+
+	def locateRelativeModule(self, sourceFilePath, level, names):
+		# resolves imports like "from ..foo import bar" relative to the directory of the importing file
+		directoryPath = os.path.dirname(os.path.abspath(sourceFilePath))
+		for i in range(level - 1):
+			directoryPath = os.path.dirname(directoryPath)
+
+		modulePath = directoryPath
+		for name in names:
+			modulePath = locateModuleInDirectories(name, getSearchDirectoryPaths(modulePath))
+			if modulePath is None:
+				return None
+		return modulePath
+
+
+def getModuleLocator(sysPath):
+	# locators are shared by all files indexed with the same sys path
+	key = tuple(sysPath)
+	if key not in _moduleLocators:
+		_moduleLocators[key] = ModuleLocator(sysPath)
+	return _moduleLocators[key]
+
+
+def clearModuleLocatorCaches():
+	# needs to be called when files have been added or removed since the cached lookups were made
+	_directoryEntries.clear()
+	_moduleLocators.clear()
+
+
+def getImportPathOfNameNode(importNode, nameNode):
+	# Returns the import level and the names of the module or symbol a name of an import statement refers to, e.g. "foo.bar"
+	# for "bar" in "import foo.bar.baz" or in "from foo import bar". An alias refers to what it is bound to, e.g. "foo.bar"
+	# for "baz" in "import foo.bar as baz". The last value tells whether the name is imported or just part of the module
+	# path of a "from ... import ..." statement.
+	if nameNode.parent is not None and nameNode.parent.type in ['dotted_as_name', 'import_as_name'] and nameNode is nameNode.parent.children[-1] \
+			and len(nameNode.parent.children) == 3:
+		aliasedNode = nameNode.parent.children[0]
+		if aliasedNode.type == 'dotted_name':
+			aliasedNode = aliasedNode.children[-1]
+		return getImportPathOfNameNode(importNode, aliasedNode)
+
+	if importNode.type == 'import_name':
+		if nameNode.parent is None or nameNode.parent.type != 'dotted_name':
+			return 0, [nameNode.value], True
+		names = []
+		for c in nameNode.parent.children:
+			if c.type == 'name':
+				names.append(c.value)
+			if c is nameNode:
+				break
+		return 0, names, True
+
+	names = []
+	for fromName in importNode.get_from_names():
+		names.append(fromName.value)
+		if fromName is nameNode:
+			return importNode.level, names, False
+	names.append(nameNode.value)
+	return importNode.level, names, True
+
+
+def locateModuleInDirectories(name, directoryPaths):
+	namespacePackagePath = None
+	for directoryPath in directoryPaths:
+		entries, extensionModuleNames = getDirectoryEntries(directoryPath)
+
+		if name in entries:
+			packagePath = os.path.join(directoryPath, name)
+			packageEntries, packageExtensionModuleNames = getDirectoryEntries(packagePath)
+			for initFileName in _packageInitFileNames:
+				if initFileName in packageEntries:
+					return os.path.join(packagePath, initFileName)
+
+		if name in extensionModuleNames:
+			return extensionModuleNames[name]
+
+		for extension in _sourceFileExtensions:
+			if name + extension in entries:
+				return os.path.join(directoryPath, name + extension)
+
+		if name in entries and namespacePackagePath is None and os.path.isdir(os.path.join(directoryPath, name)):
+			namespacePackagePath = os.path.join(directoryPath, name)
+
+	return namespacePackagePath
+
+
+def getSearchDirectoryPaths(modulePath):
+	# returns the directories that contain the submodules of the module at the given path
+	if os.path.isdir(modulePath):
+		return [modulePath]
+	if os.path.basename(modulePath) in _packageInitFileNames:
+		return [os.path.dirname(modulePath)]
+	return [] # a plain module does not have any submodules
+
+
+def getDirectoryEntries(directoryPath):
+	if directoryPath not in _directoryEntries:
+		try:
+			entries = set(os.listdir(directoryPath))
+		except OSError: # the directory does not exist or is not readable
+			entries = set()
+
+		extensionModuleNames = {}
+		for entry in entries:
+			if os.path.splitext(entry)[1] in _extensionModuleFileExtensions:
+				# the file names of extension modules carry the platform tags, like "foo.cpython-37m-x86_64-linux-gnu.so"
+				extensionModuleNames[entry.split('.')[0]] = os.path.join(directoryPath, entry)
+
+		_directoryEntries[directoryPath] = (entries, extensionModuleNames)
+	return _directoryEntries[directoryPath]
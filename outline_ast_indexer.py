@@ -0,0 +1,57 @@
+import ast
+
+from indexer_common import _astParseErrorTypes
+from outline_indexer import recordNonStaticField
+from outline_indexer import recordStaticField
+from shallow_indexer import ContextType
+from shallow_ast_indexer import StdlibAstVisitor
+from shallow_ast_indexer import _simpleStatementNodeTypes
+
+
+# Records the outline of a file from the ast of the stdlib ast module. This is only imported by outline_indexer if the ast
+# module provides the end positions of its nodes (Python 3.8 and above).
+
+_clauseFieldNames = ['body', 'handlers', 'orelse', 'finalbody'] # statement lists of compound statements in the order of the source code
+
+
+def parseSourceCode(sourceCode, sourceFilePath):
+	# returns None if the source code needs to be parsed with parso, which recovers from syntax errors
+	try:
+		return ast.parse(sourceCode, sourceFilePath)
+	except _astParseErrorTypes:
+		return None
+
+
+class OutlineStdlibAstVisitor(StdlibAstVisitor):
+
+	def traverseNode(self, node):
+		if isinstance(node, ast.ClassDef):
+			self.beginVisitClassdef(node)
+			self.traverseNodes(node.body)
+			self.endVisitClassdef(node)
+		elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+			self.beginVisitFuncdef(node)
+			self.traverseNodes(node.body)
+			self.endVisitFuncdef(node)
+		elif isinstance(node, ast.Assign):
+			for target in node.targets:
+				self.visitTarget(target)
+		elif isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+			self.visitTarget(node.target)
+		elif not isinstance(node, _simpleStatementNodeTypes):
+			for fieldName in _clauseFieldNames:
+				self.traverseNodes(getattr(node, fieldName, []))
+
+
+	def visitTarget(self, node):
+		if isinstance(node, ast.Name):
+			if self.contextStack[-1].contextType == ContextType.CLASS:
+				recordStaticField(self, self.createLeafOfNode(node))
+		elif isinstance(node, (ast.Tuple, ast.List)):
+			for element in node.elts:
+				self.visitTarget(element)
+		elif isinstance(node, ast.Starred):
+			self.visitTarget(node.value)
+		elif isinstance(node, ast.Attribute):
+			if isinstance(node.value, ast.Name) and node.value.id == self.contextStack[-1].selfParamName:
+				recordNonStaticField(self, self.createLeafOfAttributeName(node))
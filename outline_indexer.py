@@ -0,0 +1,135 @@
+import codecs
+
+import sourcetraildb as srctrl
+
+import shallow_indexer
+from indexer_common import _virtualFilePath
+from indexer_common import NameElement
+from indexer_common import isAstBackendSupported
+from indexer_log import logger
+from shallow_indexer import AstVisitor
+from shallow_indexer import ContextType
+from shallow_indexer import getSourceRangeOfNode
+
+
+# Outline indexing only records the definitions of a file: its module, classes, functions, methods and fields with their
+# locations and scopes. Only statements are walked and names are only looked at if they are assigned to by an assignment
+# statement, so no references are resolved at all. The stdlib ast module is used for parsing where it is available,
+# because with the per-name work gone, parsing with parso would take up almost all of the time. The visitor of the ast lives
+# in outline_ast_indexer, which is only imported by versions of Python whose ast module is used.
+
+_compoundStatementNodeTypes = ['if_stmt', 'for_stmt', 'while_stmt', 'try_stmt', 'with_stmt', 'async_stmt', 'async_funcdef', 'decorated', 'suite', 'simple_stmt', 'file_input']
+_targetListNodeTypes = ['testlist_star_expr', 'exprlist', 'testlist_comp', 'atom']
+
+
+def indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, sysPath = None):
+	moduleNode = parseSourceCode(sourceCode, _virtualFilePath)
+	if moduleNode is None:
+		astVisitor = OutlineAstVisitor(astVisitorClient, _virtualFilePath, sourceCode, sysPath)
+		astVisitor.traverseNode(shallow_indexer.parseSourceCode(sourceCode, _virtualFilePath))
+	else:
+		import outline_ast_indexer
+		astVisitor = outline_ast_indexer.OutlineStdlibAstVisitor(astVisitorClient, _virtualFilePath, sourceCode, sysPath)
+		astVisitor.traverseNode(moduleNode)
+
+
+def indexSourceFile(sourceFilePath, environmentDirectoryPath, workingDirectory, astVisitorClient, isVerbose, parseCache = None, progressCallback = None, sourceCode = None):
+
+	if isVerbose:
+		logger.info('Indexing the outline of source file "%s".', sourceFilePath)
+
+	if sourceCode is None:
+		with codecs.open(sourceFilePath, 'r', encoding='utf-8') as input:
+			sourceCode=input.read()
+
+	moduleNode = parseSourceCode(sourceCode, sourceFilePath)
+	if moduleNode is None:
+		if isVerbose and isAstBackendSupported():
+			logger.info('Source file "%s" cannot be parsed with the ast module, falling back to parso.', sourceFilePath)
+		astVisitor = OutlineAstVisitor(astVisitorClient, sourceFilePath)
+		astVisitor.progressCallback = progressCallback
+		astVisitor.traverseNode(shallow_indexer.parseSourceCode(sourceCode, sourceFilePath, parseCache))
+	else:
+		import outline_ast_indexer
+		astVisitor = outline_ast_indexer.OutlineStdlibAstVisitor(astVisitorClient, sourceFilePath, sourceCode)
+		astVisitor.progressCallback = progressCallback
+		astVisitor.traverseNode(moduleNode)
+
+
+def parseSourceCode(sourceCode, sourceFilePath):
+	# returns None if the source code needs to be parsed with parso, which recovers from syntax errors
+	if not isAstBackendSupported():
+		return None
+	import outline_ast_indexer
+	return outline_ast_indexer.parseSourceCode(sourceCode, sourceFilePath)
+
+
+class OutlineAstVisitor(AstVisitor):
+
+	def traverseNode(self, node):
+		if node is None:
+			return
+
+		if node.type == 'classdef':
+			self.beginVisitClassdef(node)
+			self.traverseNode(node.get_suite())
+			self.endVisitClassdef(node)
+		elif node.type == 'funcdef':
+			self.beginVisitFuncdef(node)
+			self.traverseNode(node.get_suite())
+			self.endVisitFuncdef(node)
+		elif node.type == 'expr_stmt':
+			for i in range(len(node.children) - 1):
+				nextNode = node.children[i + 1]
+				if nextNode.type == 'annassign' or (nextNode.type == 'operator' and nextNode.value.endswith('=')):
+					self.visitTarget(node.children[i])
+		elif node.type in _compoundStatementNodeTypes or node.type == 'except_clause':
+			for c in node.children: # expressions like the target of a "for" statement are skipped, only assignments define fields
+				self.traverseNode(c)
+
+
+	def visitTarget(self, node):
+		if node.type == 'name':
+			if self.contextStack[-1].contextType == ContextType.CLASS:
+				recordStaticField(self, node)
+		elif node.type in _targetListNodeTypes:
+			for c in node.children:
+				self.visitTarget(c)
+		elif node.type == 'star_expr':
+			self.visitTarget(node.children[1])
+		elif node.type in ['power', 'atom_expr'] and len(node.children) == 2:
+			# "self.foo" consists of the name of the self parameter and a trailer
+			rootNode, trailerNode = node.children
+			if (
+				rootNode.type == 'name' and rootNode.value == self.contextStack[-1].selfParamName and
+				trailerNode.type == 'trailer' and trailerNode.children[0].value == '.'
+			):
+				recordNonStaticField(self, trailerNode.children[1])
+
+
+def recordStaticField(astVisitor, nameNode):
+	nameHierarchy = astVisitor.contextStack[-1].nameHierarchy
+	if nameHierarchy is None:
+		return
+	recordField(astVisitor, nameNode, nameHierarchy)
+
+
+def recordNonStaticField(astVisitor, nameNode):
+	# the field belongs to the class of the method that assigns it
+	nameHierarchy = astVisitor.contextStack[-2].nameHierarchy
+	if nameHierarchy is None:
+		return
+	symbolId = recordField(astVisitor, nameNode, nameHierarchy)
+	referenceId = astVisitor.client.recordReference(astVisitor.contextStack[-1].id, symbolId, srctrl.REFERENCE_USAGE)
+	astVisitor.client.recordReferenceLocation(referenceId, getSourceRangeOfNode(nameNode))
+
+
+def recordField(astVisitor, nameNode, parentNameHierarchy):
+	nameHierarchy = parentNameHierarchy.copy()
+	nameHierarchy.nameElements.append(NameElement(nameNode.value))
+
+	symbolId = astVisitor.client.recordSymbol(nameHierarchy)
+	astVisitor.client.recordSymbolKind(symbolId, srctrl.SYMBOL_FIELD)
+	astVisitor.client.recordSymbolDefinitionKind(symbolId, srctrl.DEFINITION_EXPLICIT)
+	astVisitor.client.recordSymbolLocation(symbolId, getSourceRangeOfNode(nameNode))
+	return symbolId
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import sys
+
+import parso
+
+try:
+	import cPickle as pickle
+except ImportError:
+	import pickle
+
+
+_cacheFileExtension = '.pickle'
+
+
+class ParseCache:
+
+	def __init__(self, cacheDirectoryPath):
+		self.cacheDirectoryPath = os.path.abspath(cacheDirectoryPath)
+		self.hitCount = 0
+		self.missCount = 0
+		self.errorCount = 0
+
+		if not os.path.isdir(self.cacheDirectoryPath):
+			os.makedirs(self.cacheDirectoryPath)
+
+
+	def getModuleNode(self, sourceCode, sourceFilePath, grammar, parseFunction):
+		cacheFilePath = self.getCacheFilePath(sourceCode, grammar)
+
+		moduleNode = self.loadModuleNode(cacheFilePath)
+		if moduleNode is not None:
+			self.hitCount += 1
+			return moduleNode
+
+		self.missCount += 1
+		moduleNode = parseFunction()
+		self.storeModuleNode(cacheFilePath, moduleNode)
+		return moduleNode
+
+
+	def getCacheFilePath(self, sourceCode, grammar):
+		if not isinstance(sourceCode, bytes):
+			sourceCode = sourceCode.encode('utf-8')
+
+		# the key covers everything that has an influence on the pickled tree: the grammar that was used for parsing,
+		# the parso version that defines the tree classes, the pickling interpreter and the source code itself
+		contentHash = hashlib.sha1()
+		contentHash.update(grammar._hashed.encode('utf-8'))
+		contentHash.update(parso.__version__.encode('utf-8'))
+		contentHash.update(str(sys.version_info[:2]).encode('utf-8'))
+		contentHash.update(sourceCode)
+		return os.path.join(self.cacheDirectoryPath, contentHash.hexdigest() + _cacheFileExtension)
+
+
+	def loadModuleNode(self, cacheFilePath):
+		if not os.path.exists(cacheFilePath):
+			return None
+		try:
+			with open(cacheFilePath, 'rb') as input:
+				return pickle.load(input)
+		except Exception:
+			self.errorCount += 1
+		return None
+
+
+	def storeModuleNode(self, cacheFilePath, moduleNode):
+		temporaryFilePath = cacheFilePath + '.' + str(os.getpid()) + '.tmp'
+		try:
+			with open(temporaryFilePath, 'wb') as output:
+				pickle.dump(moduleNode, output, pickle.HIGHEST_PROTOCOL)
+			replaceFile(temporaryFilePath, cacheFilePath)
+		except Exception: # e.g. the tree is too deeply nested to be pickled or the cache directory is read-only
+			self.errorCount += 1
+			if os.path.exists(temporaryFilePath):
+				os.remove(temporaryFilePath)
+
+
+	def getStatisticsString(self):
+		return 'Parse cache: ' + str(self.hitCount) + ' hits, ' + str(self.missCount) + ' misses, ' + str(self.errorCount) + ' errors.'
+
+
+class DiffParseCache:
+
+	def __init__(self):
+		self.hitCount = 0
+		self.missCount = 0
+		self.moduleNodeIds = {}
+
+
+	def getModuleNode(self, sourceCode, sourceFilePath, grammar, parseFunction):
+		# parso keeps the last tree of each path in memory and only reparses the regions of the code that have changed since.
+		# The tree is updated in place, so callers must not hold on to nodes of a previous version of the same file. Whether
+		# parso has reused the tree is told by the module it returns, because the layout of its cache differs between versions.
+		# Only the ids of the modules are kept, the trees themselves belong to parso's cache and are freed when it is cleared.
+		moduleNode = grammar.parse(sourceCode, path=sourceFilePath, diff_cache=True)
+		if self.moduleNodeIds.get((grammar._hashed, sourceFilePath)) == id(moduleNode):
+			self.hitCount += 1
+		else:
+			self.missCount += 1
+			self.moduleNodeIds[(grammar._hashed, sourceFilePath)] = id(moduleNode)
+		return moduleNode
+
+
+	def clear(self):
+		# must be called whenever parso's cache is cleared, a new tree could otherwise get the id of a freed one
+		self.moduleNodeIds.clear()
+
+
+	def getStatisticsString(self):
+		return 'Diff parse cache: ' + str(self.hitCount) + ' incremental parses, ' + str(self.missCount) + ' full parses.'
+
+
+def replaceFile(sourceFilePath, destinationFilePath):
+	try:
+		os.replace(sourceFilePath, destinationFilePath)
+	except AttributeError: # os.replace is not available in Python 2
+		if os.path.exists(destinationFilePath):
+			os.remove(destinationFilePath)
+		os.rename(sourceFilePath, destinationFilePath)
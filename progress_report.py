@@ -0,0 +1,181 @@
+import json
+import os
+import time
+
+
+class ProgressReport:
+
+	# Writes one JSON object per line for every progress event of an indexing run, so dashboards can follow a run while it is
+	# going on: "run_started", "file_started", "file_finished" (or "file_skipped") and "run_finished". File events carry the
+	# number of names, references and unsolved references recorded for the file, the names per second and the elapsed time
+	# of the run. If more than one file is indexed, the estimated remaining time is added based on the bytes that are left.
+	def __init__(self, output):
+		self.output = output
+		self.startTime = time.time()
+		self.client = None
+
+		self.fileCount = 0
+		self.byteCount = 0
+		self.finishedFileCount = 0
+		self.finishedByteCount = 0
+
+		self.sourceFilePath = None
+		self.fileStartTime = 0.0
+		self.fileCounts = None
+
+
+	def startRun(self, sourceFilePaths):
+		self.startTime = time.time()
+		self.fileCount = len(sourceFilePaths)
+		self.byteCount = sum(getFileSize(p) for p in sourceFilePaths)
+		self.writeEvent('run_started', {'file_count': self.fileCount, 'byte_count': self.byteCount})
+
+
+	def startFile(self, sourceFilePath):
+		self.sourceFilePath = sourceFilePath
+		self.fileStartTime = time.time()
+		self.fileCounts = self.client.getCounts() if self.client is not None else None
+		self.writeEvent('file_started', {'file_path': sourceFilePath, 'file_index': self.finishedFileCount})
+
+
+	def finishFile(self, isSuccessful = True):
+		duration = time.time() - self.fileStartTime
+		data = {'file_path': self.sourceFilePath, 'successful': isSuccessful, 'duration': duration}
+		if self.client is not None:
+			nameCount, referenceCount, unsolvedReferenceCount = [
+				count - startCount for count, startCount in zip(self.client.getCounts(), self.fileCounts)
+			]
+			data['names'] = nameCount
+			data['names_per_second'] = nameCount / duration if duration > 0 else 0.0
+			data['references'] = referenceCount
+			data['unsolved_references'] = unsolvedReferenceCount
+		self.finishSourceFile(self.sourceFilePath)
+		self.writeEvent('file_finished', data)
+		self.sourceFilePath = None
+
+
+	def failFile(self, sourceFilePath):
+		# finishes a file whose indexing has failed, no matter if it has been started or not
+		if self.sourceFilePath == sourceFilePath:
+			self.finishFile(False)
+			return
+		self.finishSourceFile(sourceFilePath)
+		self.writeEvent('file_finished', {'file_path': sourceFilePath, 'successful': False})
+
+
+	def skipFile(self, sourceFilePath):
+		self.finishSourceFile(sourceFilePath)
+		self.writeEvent('file_skipped', {'file_path': sourceFilePath})
+
+
+	def finishRun(self):
+		data = {'file_count': self.finishedFileCount, 'byte_count': self.finishedByteCount}
+		if self.client is not None:
+			data['names'], data['references'], data['unsolved_references'] = self.client.getCounts()
+		self.writeEvent('run_finished', data)
+
+
+	def finishSourceFile(self, sourceFilePath):
+		self.finishedFileCount += 1
+		self.finishedByteCount += getFileSize(sourceFilePath)
+
+
+	def writeEvent(self, eventName, data):
+		elapsed = time.time() - self.startTime
+		data['event'] = eventName
+		data['time'] = time.time()
+		data['elapsed'] = elapsed
+		if self.fileCount > 1:
+			data['finished_file_count'] = self.finishedFileCount
+			data['eta'] = getEstimatedRemainingTime(elapsed, self.finishedByteCount, self.byteCount)
+		self.output.write(json.dumps(data, sort_keys=True) + '\n')
+		self.output.flush()
+
+
+	def close(self):
+		self.output.close()
+
+
+class CountingAstVisitorClient(object):
+
+	# Forwards all calls to the wrapped client and counts the recorded names, references and unsolved references. Names are
+	# counted by the locations that are recorded for them. Python 2 ignores the property setter of classic classes, so this
+	# class derives from object.
+	def __init__(self, client):
+		self.client = client
+		self.nameCount = 0
+		self.referenceCount = 0
+		self.unsolvedReferenceCount = 0
+
+
+	def __getattr__(self, name):
+		return getattr(self.client, name)
+
+
+	@property
+	def recordCount(self):
+		return self.client.recordCount
+
+
+	@recordCount.setter
+	def recordCount(self, recordCount):
+		self.client.recordCount = recordCount
+
+
+	def getCounts(self):
+		return self.nameCount, self.referenceCount, self.unsolvedReferenceCount
+
+
+	def setCounts(self, counts):
+		self.nameCount, self.referenceCount, self.unsolvedReferenceCount = counts
+
+
+	def recordSymbolLocation(self, symbolId, sourceRange):
+		self.nameCount += 1
+		self.client.recordSymbolLocation(symbolId, sourceRange)
+
+
+	def recordReference(self, contextSymbolId, referencedSymbolId, referenceKind):
+		self.referenceCount += 1
+		return self.client.recordReference(contextSymbolId, referencedSymbolId, referenceKind)
+
+
+	def recordReferenceLocation(self, referenceId, sourceRange):
+		self.nameCount += 1
+		self.client.recordReferenceLocation(referenceId, sourceRange)
+
+
+	def recordReferenceToUnsolvedSymhol(self, contextSymbolId, referenceKind, sourceRange):
+		self.nameCount += 1
+		self.unsolvedReferenceCount += 1
+		return self.client.recordReferenceToUnsolvedSymhol(contextSymbolId, referenceKind, sourceRange)
+
+
+	def recordQualifierLocation(self, referencedSymbolId, sourceRange):
+		self.nameCount += 1
+		return self.client.recordQualifierLocation(referencedSymbolId, sourceRange)
+
+
+	def recordLocalSymbolLocation(self, localSymbolId, sourceRange):
+		self.nameCount += 1
+		self.client.recordLocalSymbolLocation(localSymbolId, sourceRange)
+
+
+def openProgressOutput(filePath = None, fileDescriptor = None):
+	# the output is line buffered, so every event is visible to the reader as soon as it has been written
+	if fileDescriptor is not None:
+		return os.fdopen(fileDescriptor, 'w', buffering=1)
+	return open(filePath, 'w', buffering=1)
+
+
+def getEstimatedRemainingTime(elapsed, finishedByteCount, byteCount):
+	if finishedByteCount <= 0:
+		return None
+	return elapsed * max(byteCount - finishedByteCount, 0) / finishedByteCount
+
+
+def getFileSize(filePath):
+	try:
+		return os.path.getsize(filePath)
+	except OSError:
+		return 0
@@ -0,0 +1,116 @@
+import codecs
+import json
+import os
+
+import shallow_indexer
+import sourcetraildb as srctrl
+from indexer_common import getNameHierarchyFromDottedName
+from indexer_log import logger
+
+
+_symbolTableFormatVersion = 1
+_maxImportChainLength = 16 # guards against import cycles when following re-exported names
+
+_symbolKindNames = {
+	'module': srctrl.SYMBOL_MODULE,
+	'class': srctrl.SYMBOL_CLASS,
+	'function': srctrl.SYMBOL_FUNCTION,
+	'variable': srctrl.SYMBOL_GLOBAL_VARIABLE,
+}
+
+
+class ProjectSymbolTable:
+
+	# Holds the module level definitions of all project files, so the shallow indexer is able to resolve imports and
+	# qualified names like "module.attr" to the symbols defined by other files of the project.
+	def __init__(self):
+		self.modules = {}
+
+
+	def addSourceFile(self, sourceFilePath, parseCache = None):
+		sourceFilePath = os.path.abspath(sourceFilePath)
+		nameHierarchy = shallow_indexer.getNameHierarchyFromModuleFilePath(sourceFilePath, [shallow_indexer.getPackageRootPath(sourceFilePath)])
+		if nameHierarchy is None:
+			return False
+
+		with codecs.open(sourceFilePath, 'r', encoding='utf-8') as input:
+			sourceCode = input.read()
+
+		moduleNode = shallow_indexer.parseSourceCode(sourceCode, sourceFilePath, parseCache)
+		isPackage = os.path.basename(sourceFilePath) == '__init__.py'
+		self.addModule(nameHierarchy.getDisplayString(), isPackage, moduleNode, sourceFilePath)
+		return True
+
+
+	def addModule(self, moduleName, isPackage, moduleNode, filePath = None):
+		scopeInfo = shallow_indexer.ScopeInfo(shallow_indexer.ScopeType.MODULE, moduleNode, None, moduleName)
+		shallow_indexer.collectBoundNames(scopeInfo, moduleNode)
+		scopeInfo.removeDeclaredNames()
+
+		imports = {}
+		for name, (level, names) in scopeInfo.importedNames.items():
+			importPath = shallow_indexer.getAbsoluteImportPath(moduleName, isPackage, level, names)
+			if importPath is not None:
+				imports[name] = importPath
+
+		symbols = {}
+		for name in scopeInfo.symbolNames:
+			if name not in imports:
+				symbols[name] = 'variable'
+		for classdef in moduleNode.iter_classdefs():
+			symbols[classdef.name.value] = 'class'
+		for funcdef in moduleNode.iter_funcdefs():
+			symbols[funcdef.name.value] = 'function'
+
+		self.modules[moduleName] = {'file_path': filePath, 'symbols': symbols, 'imports': imports}
+
+		# parent packages exist even if their "__init__.py" files are not part of the project
+		packageNames = moduleName.split('.')[:-1]
+		for i in range(len(packageNames)):
+			packageName = '.'.join(packageNames[:i + 1])
+			if packageName not in self.modules:
+				self.modules[packageName] = {'file_path': None, 'symbols': {}, 'imports': {}}
+
+
+	def resolveName(self, dottedName, importChainLength = 0):
+		# returns the name hierarchy and kind of the module or module level symbol with the dotted name, None if unknown
+		if dottedName in self.modules:
+			return getNameHierarchyFromDottedName(dottedName), srctrl.SYMBOL_MODULE
+
+		moduleName, separator, name = dottedName.rpartition('.')
+		module = self.modules.get(moduleName)
+		if module is None:
+			return None
+
+		if name in module['symbols']:
+			return getNameHierarchyFromDottedName(dottedName), _symbolKindNames[module['symbols'][name]]
+		if name in module['imports'] and importChainLength < _maxImportChainLength:
+			return self.resolveName(module['imports'][name], importChainLength + 1)
+		return None
+
+
+	def save(self, filePath):
+		with open(filePath, 'w') as output:
+			json.dump({'version': _symbolTableFormatVersion, 'modules': self.modules}, output, sort_keys=True)
+
+
+def loadProjectSymbolTable(filePath):
+	with open(filePath, 'r') as input:
+		data = json.load(input)
+	if data.get('version') != _symbolTableFormatVersion:
+		logger.error('Project symbol table "' + filePath + '" has been written by an incompatible version of the indexer.')
+		return None
+
+	projectSymbolTable = ProjectSymbolTable()
+	projectSymbolTable.modules = data['modules']
+	return projectSymbolTable
+
+
+def buildProjectSymbolTable(sourceFilePaths, parseCache = None):
+	projectSymbolTable = ProjectSymbolTable()
+	for sourceFilePath in sourceFilePaths:
+		try:
+			projectSymbolTable.addSourceFile(sourceFilePath, parseCache)
+		except Exception as e:
+			logger.error('Encountered exception "%s" while collecting the symbols of "%s".', e.__repr__(), sourceFilePath)
+	return projectSymbolTable
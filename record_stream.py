@@ -0,0 +1,404 @@
+import codecs
+import gzip
+import json
+import sys
+
+from _version import _sourcetrail_db_version
+from indexer_common import SourceRange
+from indexer_common import getNameHierarchyFromSerializedName
+from indexer_log import logger
+
+
+_recordStreamFormatVersion = 1
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+class RecordStreamClient:
+
+	# Stands in for the AstVisitorClient and appends every call to a record stream instead of writing it to a database, so
+	# indexing does not have to wait for SQLite and the stream can be loaded into a database later on. Each line of the stream
+	# is a JSON array that holds the type of the record and the arguments of the call. Files, symbols, references and local
+	# symbols get ids that are only valid within the stream, the loader maps them to the ids of the database. Just like a
+	# database transaction, the records of a transaction are only written once it is committed.
+	def __init__(self, output):
+		self.output = output
+		self.indexedFileId = 0
+		self.recordCount = 0 # number of calls that wrote a record, used to size transactions
+		self.nextId = 1
+		self.symbolIds = {}
+		self.localSymbolIds = {}
+		self.records = []
+		self.addedNames = [] # names that got an id within the open transaction
+
+		writeRecord(self.output, {'version': _recordStreamFormatVersion, 'sourcetrail_db_version': _sourcetrail_db_version})
+
+
+	def beginTransaction(self):
+		self.records = []
+		self.addedNames = []
+
+
+	def commitTransaction(self):
+		self.output.write(''.join(self.records))
+		self.output.flush()
+		self.records = []
+		self.addedNames = []
+
+
+	def rollbackTransaction(self):
+		for ids, name in self.addedNames:
+			del ids[name]
+		self.records = []
+		self.addedNames = []
+
+
+	def recordSymbol(self, nameHierarchy):
+		if nameHierarchy is not None:
+			self.recordCount += 1
+			serializedName = nameHierarchy.serialize()
+			symbolId = self.symbolIds.get(serializedName)
+			if symbolId is None: # the database returns the same id for every record of a symbol, so the symbol is only written once
+				symbolId = self.createId(self.symbolIds, serializedName)
+				self.addRecord('s', symbolId, serializedName)
+			return symbolId
+		return 0
+
+
+	def recordSymbolDefinitionKind(self, symbolId, symbolDefinitionKind):
+		self.recordCount += 1
+		self.addRecord('sd', symbolId, symbolDefinitionKind)
+
+
+	def recordSymbolKind(self, symbolId, symbolKind):
+		self.recordCount += 1
+		self.addRecord('sk', symbolId, symbolKind)
+
+
+	def recordSymbolLocation(self, symbolId, sourceRange):
+		self.recordCount += 1
+		self.addRecord('sl', symbolId, sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn)
+
+
+	def recordSymbolScopeLocation(self, symbolId, sourceRange):
+		self.recordCount += 1
+		self.addRecord('ss', symbolId, sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn)
+
+
+	def recordSymbolSignatureLocation(self, symbolId, sourceRange):
+		self.recordCount += 1
+		self.addRecord('sg', symbolId, sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn)
+
+
+	def recordReference(self, contextSymbolId, referencedSymbolId, referenceKind):
+		self.recordCount += 1
+		referenceId = self.createId()
+		self.addRecord('r', referenceId, contextSymbolId, referencedSymbolId, referenceKind)
+		return referenceId
+
+
+	def recordReferenceLocation(self, referenceId, sourceRange):
+		self.recordCount += 1
+		self.addRecord('rl', referenceId, sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn)
+
+
+	def recordReferenceIsAmbiuous(self, referenceId):
+		self.recordCount += 1
+		self.addRecord('ra', referenceId)
+		return True
+
+
+	def recordReferenceToUnsolvedSymhol(self, contextSymbolId, referenceKind, sourceRange):
+		self.recordCount += 1
+		referenceId = self.createId()
+		self.addRecord(
+			'u', referenceId, contextSymbolId, referenceKind,
+			sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn
+		)
+		return referenceId
+
+
+	def recordQualifierLocation(self, referencedSymbolId, sourceRange):
+		self.recordCount += 1
+		self.addRecord('q', referencedSymbolId, sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn)
+		return True
+
+
+	def recordFile(self, filePath):
+		self.recordCount += 1
+		self.indexedFileId = self.createId()
+		self.addRecord('f', self.indexedFileId, filePath.replace('\\', '/'))
+		return self.indexedFileId
+
+
+	def recordFileLanguage(self, fileId, languageIdentifier):
+		self.recordCount += 1
+		self.addRecord('fl', fileId, languageIdentifier)
+
+
+	def recordLocalSymbol(self, name):
+		self.recordCount += 1
+		localSymbolId = self.localSymbolIds.get(name)
+		if localSymbolId is None:
+			localSymbolId = self.createId(self.localSymbolIds, name)
+			self.addRecord('l', localSymbolId, name)
+		return localSymbolId
+
+
+	def recordLocalSymbolLocation(self, localSymbolId, sourceRange):
+		self.recordCount += 1
+		self.addRecord('ll', localSymbolId, sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn)
+
+
+	def recordAtomicSourceRange(self, sourceRange):
+		self.recordCount += 1
+		self.addRecord('a', sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn)
+
+
+	def recordError(self, message, fatal, sourceRange):
+		self.recordCount += 1
+		self.addRecord('e', message, fatal, sourceRange.startLine, sourceRange.startColumn, sourceRange.endLine, sourceRange.endColumn)
+
+
+	def createId(self, ids = None, name = None):
+		newId = self.nextId
+		self.nextId += 1
+		if ids is not None:
+			ids[name] = newId
+			self.addedNames.append((ids, name))
+		return newId
+
+
+	def addRecord(self, *values):
+		self.records.append(_encoder.encode(values) + '\n')
+
+
+class RecordStreamReplayer:
+
+	# Replays the records of a stream into an AstVisitorClient. The locations of a stream are recorded for the file that has
+	# been recorded last, which is the same way the AstVisitorClient keeps track of the indexed file.
+	def __init__(self, client):
+		self.client = client
+		self.ids = {0: 0}
+		self.replayers = {
+			's': self.replaySymbol,
+			'sd': lambda symbolId, kind: self.client.recordSymbolDefinitionKind(self.ids[symbolId], kind),
+			'sk': lambda symbolId, kind: self.client.recordSymbolKind(self.ids[symbolId], kind),
+			'sl': lambda symbolId, *r: self.client.recordSymbolLocation(self.ids[symbolId], SourceRange(*r)),
+			'ss': lambda symbolId, *r: self.client.recordSymbolScopeLocation(self.ids[symbolId], SourceRange(*r)),
+			'sg': lambda symbolId, *r: self.client.recordSymbolSignatureLocation(self.ids[symbolId], SourceRange(*r)),
+			'r': self.replayReference,
+			'rl': lambda referenceId, *r: self.client.recordReferenceLocation(self.ids[referenceId], SourceRange(*r)),
+			'ra': lambda referenceId: self.client.recordReferenceIsAmbiuous(self.ids[referenceId]),
+			'u': self.replayReferenceToUnsolvedSymbol,
+			'q': lambda symbolId, *r: self.client.recordQualifierLocation(self.ids[symbolId], SourceRange(*r)),
+			'f': self.replayFile,
+			'fl': lambda fileId, languageIdentifier: self.client.recordFileLanguage(self.ids[fileId], languageIdentifier),
+			'l': self.replayLocalSymbol,
+			'll': lambda localSymbolId, *r: self.client.recordLocalSymbolLocation(self.ids[localSymbolId], SourceRange(*r)),
+			'a': lambda *r: self.client.recordAtomicSourceRange(SourceRange(*r)),
+			'e': lambda message, fatal, *r: self.client.recordError(message, fatal, SourceRange(*r)),
+		}
+
+
+	def replay(self, input):
+		# returns the number of replayed records, None if the stream has been written by an incompatible version
+		if not readHeader(input):
+			return None
+		return self.replayRecords(json.loads(line) for line in input)
+
+
+	def replayRecords(self, records):
+		recordCount = 0
+		for record in records:
+			self.replayers[record[0]](*record[1:])
+			recordCount += 1
+		return recordCount
+
+
+	def replaySymbol(self, symbolId, serializedName):
+		self.ids[symbolId] = self.client.recordSymbol(getNameHierarchyFromSerializedName(serializedName))
+
+
+	def replayReference(self, referenceId, contextSymbolId, referencedSymbolId, referenceKind):
+		self.ids[referenceId] = self.client.recordReference(self.ids[contextSymbolId], self.ids[referencedSymbolId], referenceKind)
+
+
+	def replayReferenceToUnsolvedSymbol(self, referenceId, contextSymbolId, referenceKind, *r):
+		self.ids[referenceId] = self.client.recordReferenceToUnsolvedSymhol(self.ids[contextSymbolId], referenceKind, SourceRange(*r))
+
+
+	def replayFile(self, fileId, filePath):
+		self.ids[fileId] = self.client.recordFile(filePath)
+
+
+	def replayLocalSymbol(self, localSymbolId, name):
+		self.ids[localSymbolId] = self.client.recordLocalSymbol(name)
+
+
+class RecordingAstVisitorClient(object):
+
+	# Forwards all calls to the wrapped client and appends them to a record stream as well, so the exact sequence of database
+	# writes of an indexing run can be replayed without indexing again. The ids returned by the wrapped client are passed on
+	# to the caller and translated to the ids of the stream when a call is recorded. Python 2 ignores the property setter of
+	# classic classes, so this class derives from object.
+	def __init__(self, client, output):
+		self.client = client
+		self.recorder = RecordStreamClient(output)
+		self.streamIds = {0: 0}
+
+
+	@property
+	def recordCount(self):
+		return self.client.recordCount
+
+
+	@recordCount.setter
+	def recordCount(self, recordCount):
+		self.client.recordCount = recordCount
+
+
+	def beginTransaction(self):
+		self.client.beginTransaction()
+		self.recorder.beginTransaction()
+
+
+	def commitTransaction(self):
+		self.client.commitTransaction()
+		self.recorder.commitTransaction()
+
+
+	def rollbackTransaction(self):
+		self.client.rollbackTransaction()
+		self.recorder.rollbackTransaction()
+
+
+	def recordSymbol(self, nameHierarchy):
+		symbolId = self.client.recordSymbol(nameHierarchy)
+		self.streamIds[symbolId] = self.recorder.recordSymbol(nameHierarchy)
+		return symbolId
+
+
+	def recordSymbolDefinitionKind(self, symbolId, symbolDefinitionKind):
+		self.client.recordSymbolDefinitionKind(symbolId, symbolDefinitionKind)
+		self.recorder.recordSymbolDefinitionKind(self.streamIds[symbolId], symbolDefinitionKind)
+
+
+	def recordSymbolKind(self, symbolId, symbolKind):
+		self.client.recordSymbolKind(symbolId, symbolKind)
+		self.recorder.recordSymbolKind(self.streamIds[symbolId], symbolKind)
+
+
+	def recordSymbolLocation(self, symbolId, sourceRange):
+		self.client.recordSymbolLocation(symbolId, sourceRange)
+		self.recorder.recordSymbolLocation(self.streamIds[symbolId], sourceRange)
+
+
+	def recordSymbolScopeLocation(self, symbolId, sourceRange):
+		self.client.recordSymbolScopeLocation(symbolId, sourceRange)
+		self.recorder.recordSymbolScopeLocation(self.streamIds[symbolId], sourceRange)
+
+
+	def recordSymbolSignatureLocation(self, symbolId, sourceRange):
+		self.client.recordSymbolSignatureLocation(symbolId, sourceRange)
+		self.recorder.recordSymbolSignatureLocation(self.streamIds[symbolId], sourceRange)
+
+
+	def recordReference(self, contextSymbolId, referencedSymbolId, referenceKind):
+		referenceId = self.client.recordReference(contextSymbolId, referencedSymbolId, referenceKind)
+		self.streamIds[referenceId] = self.recorder.recordReference(self.streamIds[contextSymbolId], self.streamIds[referencedSymbolId], referenceKind)
+		return referenceId
+
+
+	def recordReferenceLocation(self, referenceId, sourceRange):
+		self.client.recordReferenceLocation(referenceId, sourceRange)
+		self.recorder.recordReferenceLocation(self.streamIds[referenceId], sourceRange)
+
+
+	def recordReferenceIsAmbiuous(self, referenceId):
+		self.recorder.recordReferenceIsAmbiuous(self.streamIds[referenceId])
+		return self.client.recordReferenceIsAmbiuous(referenceId)
+
+
+	def recordReferenceToUnsolvedSymhol(self, contextSymbolId, referenceKind, sourceRange):
+		referenceId = self.client.recordReferenceToUnsolvedSymhol(contextSymbolId, referenceKind, sourceRange)
+		self.streamIds[referenceId] = self.recorder.recordReferenceToUnsolvedSymhol(self.streamIds[contextSymbolId], referenceKind, sourceRange)
+		return referenceId
+
+
+	def recordQualifierLocation(self, referencedSymbolId, sourceRange):
+		self.recorder.recordQualifierLocation(self.streamIds[referencedSymbolId], sourceRange)
+		return self.client.recordQualifierLocation(referencedSymbolId, sourceRange)
+
+
+	def recordFile(self, filePath):
+		fileId = self.client.recordFile(filePath)
+		self.streamIds[fileId] = self.recorder.recordFile(filePath)
+		return fileId
+
+
+	def recordFileLanguage(self, fileId, languageIdentifier):
+		self.client.recordFileLanguage(fileId, languageIdentifier)
+		self.recorder.recordFileLanguage(self.streamIds[fileId], languageIdentifier)
+
+
+	def recordLocalSymbol(self, name):
+		localSymbolId = self.client.recordLocalSymbol(name)
+		self.streamIds[localSymbolId] = self.recorder.recordLocalSymbol(name)
+		return localSymbolId
+
+
+	def recordLocalSymbolLocation(self, localSymbolId, sourceRange):
+		self.client.recordLocalSymbolLocation(localSymbolId, sourceRange)
+		self.recorder.recordLocalSymbolLocation(self.streamIds[localSymbolId], sourceRange)
+
+
+	def recordAtomicSourceRange(self, sourceRange):
+		self.client.recordAtomicSourceRange(sourceRange)
+		self.recorder.recordAtomicSourceRange(sourceRange)
+
+
+	def recordError(self, message, fatal, sourceRange):
+		self.client.recordError(message, fatal, sourceRange)
+		self.recorder.recordError(message, fatal, sourceRange)
+
+
+def openRecordStream(filePath, mode):
+	# Streams with a ".gz" extension are gzip compressed. Python 2 cannot pass an encoding to open and gzip.open, so its streams
+	# are wrapped by the codecs module, which is slower at reading lines than the text files of Python 3.
+	if sys.version_info < (3, 0):
+		if filePath.endswith('.gz'):
+			codec = codecs.getreader('utf-8') if mode == 'r' else codecs.getwriter('utf-8')
+			return codec(gzip.open(filePath, mode + 'b'))
+		return codecs.open(filePath, mode, encoding='utf-8')
+	if filePath.endswith('.gz'):
+		return gzip.open(filePath, mode + 't', encoding='utf-8')
+	return open(filePath, mode, encoding='utf-8')
+
+
+def replayRecordStream(filePath, client):
+	with openRecordStream(filePath, 'r') as input:
+		return RecordStreamReplayer(client).replay(input)
+
+
+def readRecordStream(filePath):
+	# returns all records of the stream, None if the stream has been written by an incompatible version
+	with openRecordStream(filePath, 'r') as input:
+		if not readHeader(input):
+			return None
+		return [json.loads(line) for line in input]
+
+
+def readHeader(input):
+	header = json.loads(input.readline() or 'null')
+	if not isinstance(header, dict) or header.get('version') != _recordStreamFormatVersion:
+		logger.error('Record stream has been written by an incompatible version of the indexer.')
+		return False
+	if header.get('sourcetrail_db_version') != _sourcetrail_db_version:
+		# the kinds of symbols and references are stored as the values of the SourcetrailDB version that wrote them
+		logger.error('Record stream has been written for SourcetrailDB ' + str(header.get('sourcetrail_db_version')) + ', but ' + _sourcetrail_db_version + ' is used.')
+		return False
+	return True
+
+
+def writeRecord(output, value):
+	output.write(_encoder.encode(value) + '\n')
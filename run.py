@@ -1,13 +1,66 @@
 import argparse
-import indexer
-import shallow_indexer
 import os
-import sourcetraildb as srctrl
+import time
+
+import indexer_log
+from _version import __version__
+from indexer_log import logger
+
+# All other modules are imported by the commands that need them, so e.g. shallow indexing does not have to pay for importing jedi.
+# The table below lists what each command imports, whether that pulls in jedi and how many seconds importing it into a fresh
+# interpreter may take at most. These budgets are checked by test_startup.py, every command needs at least one entry.
+_commandImportBudgets = [
+	('index --shallow', ['indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'parse_cache', 'project_symbol_table', 'shallow_indexer'], False, 1.0),
+	('index --shallow --shallow-backend ast', ['indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'parse_cache', 'project_symbol_table', 'shallow_ast_indexer', 'shallow_indexer'], False, 1.0),
+	('index --shallow --skip-unchanged-files', ['content_hash_table', 'indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'parse_cache', 'project_symbol_table', 'shallow_indexer'], False, 1.0),
+	('index --shallow --dependency-graph-path', ['dependency_graph', 'indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'parse_cache', 'project_symbol_table', 'shallow_indexer'], False, 1.0),
+	('index --outline', ['indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'outline_ast_indexer', 'outline_indexer', 'parse_cache', 'shallow_ast_indexer', 'shallow_indexer'], False, 1.0),
+	('index', ['indexer', 'indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'parse_cache'], True, 3.0),
+	('check-environment', ['indexer', 'module_locator'], True, 3.0),
+	('load-records', ['indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'record_stream', 'shallow_indexer'], False, 1.0),
+	('replay', ['indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'record_stream', 'shallow_indexer'], False, 1.0),
+	('merge', ['shard_merge'], False, 1.0),
+	('build-symbol-table', ['module_locator', 'parse_cache', 'project_symbol_table'], False, 1.0),
+	('watch --shallow', ['file_watcher', 'indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'parse_cache', 'shallow_indexer'], False, 1.0),
+	('watch', ['file_watcher', 'indexer', 'indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'parse_cache', 'shallow_indexer'], True, 3.0),
+	('serve', ['index_server', 'indexer', 'indexer_common', 'indexing_session', 'memory_policy', 'module_locator', 'parse_cache', 'shallow_indexer'], True, 3.0),
+	('startup-report', ['indexer', 'indexer_common', 'indexing_session', 'parse_cache', 'shallow_indexer', 'startup_report'], True, 3.0),
+]
 
 
 def main():
+	args = createArgumentParser().parse_args() # code exits here for "--version" and "--help"
+
+	if hasattr(args, 'log_level'):
+		indexer_log.configureLogging(indexer_log.getLevel(getLogLevelName(args)), args.log_path, args.max_repeated_messages)
+
+	if args.command == 'index':
+		processIndexCommand(args)
+	elif args.command == 'check-environment':
+		processCheckEnvironmentCommand(args)
+	elif args.command == 'watch':
+		processWatchCommand(args)
+	elif args.command == 'serve':
+		processServeCommand(args)
+	elif args.command == 'build-symbol-table':
+		processBuildSymbolTableCommand(args)
+	elif args.command == 'load-records':
+		processLoadRecordsCommand(args)
+	elif args.command == 'replay':
+		processReplayCommand(args)
+	elif args.command == 'merge':
+		processMergeCommand(args)
+	elif args.command == 'startup-report':
+		processStartupReportCommand(args)
+	else:
+		os.write(2, b"Error: No command has been specified.") # write to stderr
+		return 1
+	return 0
+
+
+def createArgumentParser():
 	parser = argparse.ArgumentParser(description='Python source code indexer that generates a Sourcetrail compatible database.')
-	parser.add_argument('--version', action='version', version='SourcetrailPythonIndexer {version}'.format(version=indexer.__version__))
+	parser.add_argument('--version', action='version', version='SourcetrailPythonIndexer {version}'.format(version=__version__))
 
 	subparsers = parser.add_subparsers(title='commands', dest='command')
 
@@ -16,8 +69,22 @@ def main():
 		indexCommandName,
 		help='Index a Python source file and store the indexed data to a Sourcetrail database file. Run "' + indexCommandName + ' -h" for more info on available arguments.'
 	)
-	parserIndex.add_argument('--source-file-path', help='path to the source file to index', type=str, required=True)
-	parserIndex.add_argument('--database-file-path', help='path to the generated Sourcetrail database file', type=str, required=True)
+	sourceFileGroup = parserIndex.add_mutually_exclusive_group(required=True)
+	sourceFileGroup.add_argument('--source-file-path', help='path to the source file to index', type=str)
+	sourceFileGroup.add_argument(
+		'--source-file-list',
+		help='path to a text file that lists the paths of all source files to index, one per line ("-" reads the list from stdin). All files are indexed '
+			'sequentially by this process, sharing one Python environment and one open database',
+		type=str
+	)
+	outputGroup = parserIndex.add_mutually_exclusive_group(required=True)
+	outputGroup.add_argument('--database-file-path', help='path to the generated Sourcetrail database file', type=str)
+	outputGroup.add_argument(
+		'--record-stream-path',
+		help='path to a record stream file that receives the recorded data instead of a database (gzip compressed if the path ends with ".gz"). '
+			'Record streams are loaded into a database with the "load-records" command',
+		type=str
+	)
 	parserIndex.add_argument(
 		'--environment-path',
 		help='path to the Python executable or the directory that contains the Python environment that should be used to resolve dependencies within the indexed source '
@@ -27,7 +94,163 @@ def main():
 	)
 	parserIndex.add_argument('--clear', help='clear the database before indexing', action='store_true', required=False)
 	parserIndex.add_argument('--verbose', help='enable verbose console output', action='store_true', required=False)
+	parserIndex.add_argument(
+		'--ast-dump-path',
+		help='path to a file that receives the dump of the syntax tree of every indexed file that is written in verbose mode, instead of the console '
+			'(gzip compressed if the path ends with ".gz")',
+		type=str,
+		required=False
+	)
 	parserIndex.add_argument('--shallow', action='store_true', required=False)
+	parserIndex.add_argument(
+		'--shallow-backend',
+		help='parser used in shallow mode: "parso" or "ast", which uses the much faster ast module of the standard library and falls back to parso for '
+			'files that it cannot parse (requires Python 3.8 or above, default: parso)',
+		type=str,
+		choices=['parso', 'ast'],
+		default='parso',
+		required=False
+	)
+	parserIndex.add_argument(
+		'--outline',
+		help='only record the definitions of modules, classes, functions, methods and fields with their locations and scopes, but no references. '
+			'Much faster than shallow indexing, which makes it a good fit for vendored or generated code',
+		action='store_true',
+		required=False
+	)
+	parserIndex.add_argument(
+		'--max-file-size',
+		help='size in bytes above which a source file is indexed in the mode set by "--large-file-mode" instead, 0 disables this limit (default: 0)',
+		type=int,
+		default=0,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--max-file-lines',
+		help='number of lines above which a source file is indexed in the mode set by "--large-file-mode" instead, 0 disables this limit (default: 0)',
+		type=int,
+		default=0,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--max-file-leaves',
+		help='number of leaves of the parsed syntax tree above which a source file is indexed in the mode set by "--large-file-mode" instead, '
+			'0 disables this limit (default: 0)',
+		type=int,
+		default=0,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--large-file-mode',
+		help='mode used for source files that exceed any of the "--max-file-*" limits: "shallow" or "outline". Progress is reported after every '
+			'top-level definition of these files (default: shallow)',
+		type=str,
+		choices=['shallow', 'outline'],
+		default='shallow',
+		required=False
+	)
+	addMaxResolutionFailuresArgument(parserIndex)
+	parserIndex.add_argument(
+		'--record-calls-path',
+		help='path to a record stream file that receives a copy of every call that writes to the database, so the writes can be replayed and '
+			'benchmarked with the "replay" command without indexing again (gzip compressed if the path ends with ".gz")',
+		type=str,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--skip-unchanged-files',
+		help='skip files that are still contained in the database and have not changed since they have been indexed with the same indexer version '
+			'and mode. The content hashes of the indexed files are stored next to the database file',
+		action='store_true',
+		required=False
+	)
+	parserIndex.add_argument(
+		'--dependency-graph-path',
+		help='path to a file that stores the project files imported by each indexed file. The file is created if it does not exist and updated '
+			'with the imports of all files that are indexed',
+		type=str,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--changed-files',
+		help='path to a text file that lists the paths of all source files that have changed since the last run, one per line ("-" reads the list '
+			'from stdin). Only the changed files and the files that import them directly or transitively are indexed, which requires '
+			'"--dependency-graph-path"',
+		type=str,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--commit-interval',
+		help='number of indexed files after which the recorded data is committed to the database, 0 disables this limit (default: 100). '
+			'A file that fails after recording data causes the other uncommitted files to be indexed again',
+		type=int,
+		default=100,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--commit-record-count',
+		help='number of recorded entries after which the recorded data is committed to the database, 0 disables this limit (default: 0)',
+		type=int,
+		default=0,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--commit-time-interval',
+		help='number of seconds after which the recorded data is committed to the database, 0 disables this limit (default: 0). '
+			'The data is committed once after all files have been indexed if no limit is set',
+		type=float,
+		default=0.0,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--max-memory',
+		help='resident memory in megabytes above which jedi\'s and parso\'s caches are cleared between two files, 0 disables this limit (default: 0)',
+		type=float,
+		default=0.0,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--max-cached-modules',
+		help='number of parsed modules kept in memory above which jedi\'s and parso\'s caches are cleared between two files, 0 disables this limit (default: 0)',
+		type=int,
+		default=0,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--memory-report',
+		help='path to a file that receives one JSON object per indexed file with the peak memory traced by tracemalloc, the memory '
+			'attributed to the indexer, shallow_indexer, jedi and parso and the top allocation sites (slows down indexing considerably)',
+		type=str,
+		required=False
+	)
+	progressGroup = parserIndex.add_mutually_exclusive_group()
+	progressGroup.add_argument(
+		'--progress-path',
+		help='path to a file that receives one JSON object per progress event: files started and finished with the recorded names, names per '
+			'second, references and unsolved references and the elapsed time, plus the estimated remaining time if more than one file is indexed',
+		type=str,
+		required=False
+	)
+	progressGroup.add_argument(
+		'--progress-fd',
+		help='file descriptor that receives the progress events that are described for "--progress-path", e.g. a pipe opened by the calling process',
+		type=int,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--symbol-table-path',
+		help='path to a project symbol table written by the "build-symbol-table" command that the shallow indexer uses to resolve names imported from '
+			'other project files (if not specified, the table is built from the indexed files whenever more than one file is indexed in shallow mode)',
+		type=str,
+		required=False
+	)
+	parserIndex.add_argument(
+		'--cache-directory-path',
+		help='path to a directory that is used to cache the parsed source files between runs, so unchanged files do not need to be parsed again '
+			'(caching is disabled if not specified)',
+		type=str,
+		required=False
+	)
 
 	checkEnvironmentCommandName = 'check-environment'
 	parserCheckEnvironment = subparsers.add_parser(
@@ -42,63 +265,418 @@ def main():
 		required=True
 	)
 
-	args = parser.parse_args() # code exits here for "--version" and "--help"
+	watchCommandName = 'watch'
+	parserWatch = subparsers.add_parser(
+		watchCommandName,
+		help='Index all Python source files within the provided directories and keep re-indexing each file whenever it changes until the process is '
+			'interrupted. Run "' + watchCommandName + ' -h" for more info on available arguments.'
+	)
+	parserWatch.add_argument(
+		'--source-directory-path',
+		help='path to a directory (or a single source file) that should be watched for changes, may be provided multiple times',
+		type=str,
+		action='append',
+		required=True
+	)
+	parserWatch.add_argument('--database-file-path', help='path to the generated Sourcetrail database file', type=str, required=True)
+	parserWatch.add_argument(
+		'--environment-path',
+		help='path to the Python executable or the directory that contains the Python environment that should be used to resolve dependencies within the indexed source '
+			'code (if not specified the path to the currently used interpreter is used)',
+		type=str,
+		required=False
+	)
+	parserWatch.add_argument('--poll-interval', help='number of seconds to wait between two checks for changed files (default: 0.5)', type=float, default=0.5, required=False)
+	parserWatch.add_argument('--skip-initial-indexing', help='only index files that change after the watch has been started', action='store_true', required=False)
+	parserWatch.add_argument('--clear', help='clear the database before indexing', action='store_true', required=False)
+	parserWatch.add_argument('--verbose', help='enable verbose console output', action='store_true', required=False)
+	parserWatch.add_argument('--shallow', action='store_true', required=False)
+	parserWatch.add_argument(
+		'--max-memory',
+		help='resident memory in megabytes above which jedi\'s and parso\'s caches are cleared between two files, 0 disables this limit (default: 0)',
+		type=float,
+		default=0.0,
+		required=False
+	)
+	parserWatch.add_argument(
+		'--max-cached-modules',
+		help='number of parsed modules kept in memory above which jedi\'s and parso\'s caches are cleared between two files, 0 disables this limit (default: 0)',
+		type=int,
+		default=0,
+		required=False
+	)
+	addMaxResolutionFailuresArgument(parserWatch)
 
-	if args.command == indexCommandName:
-		processIndexCommand(args)
-	elif args.command == checkEnvironmentCommandName:
-		processCheckEnvironmentCommand(args)
-	else:
-		os.write(2, b"Error: No command has been specified.") # write to stderr
-		return 1
-	return 0
+	serveCommandName = 'serve'
+	parserServe = subparsers.add_parser(
+		serveCommandName,
+		help='Keep the indexer running and process index requests that are provided as JSON lines (with the fields "source_file_path", "database_file_path" '
+			'and optionally "environment_path", "shallow" and "clear") via stdin or a Unix domain socket. Each request is answered with a JSON line. '
+			'Run "' + serveCommandName + ' -h" for more info on available arguments.'
+	)
+	parserServe.add_argument('--socket-path', help='path of a Unix domain socket to listen on (if not specified requests are read from stdin)', type=str, required=False)
+	parserServe.add_argument(
+		'--cache-directory-path',
+		help='path to a directory that is used to cache the parsed source files between runs (if not specified parsed files are only kept in memory)',
+		type=str,
+		required=False
+	)
+	parserServe.add_argument('--verbose', help='enable verbose console output', action='store_true', required=False)
+	addMaxResolutionFailuresArgument(parserServe)
+
+	buildSymbolTableCommandName = 'build-symbol-table'
+	parserBuildSymbolTable = subparsers.add_parser(
+		buildSymbolTableCommandName,
+		help='Collect the module level classes, functions and variables of all given source files into a project symbol table that can be passed to '
+			'shallow indexing runs. Run "' + buildSymbolTableCommandName + ' -h" for more info on available arguments.'
+	)
+	parserBuildSymbolTable.add_argument(
+		'--source-file-list',
+		help='path to a text file that lists the paths of all source files of the project, one per line ("-" reads the list from stdin)',
+		type=str,
+		required=True
+	)
+	parserBuildSymbolTable.add_argument('--output-path', help='path to the generated project symbol table file', type=str, required=True)
+	parserBuildSymbolTable.add_argument('--verbose', help='enable verbose console output', action='store_true', required=False)
+
+	loadRecordsCommandName = 'load-records'
+	parserLoadRecords = subparsers.add_parser(
+		loadRecordsCommandName,
+		help='Load record streams written by "' + indexCommandName + ' --record-stream-path" into a Sourcetrail database. Run "' + loadRecordsCommandName + ' -h" '
+			'for more info on available arguments.'
+	)
+	parserLoadRecords.add_argument(
+		'--record-stream-path',
+		help='path to a record stream file that should be loaded, may be provided multiple times',
+		type=str,
+		action='append',
+		required=True
+	)
+	parserLoadRecords.add_argument('--database-file-path', help='path to the Sourcetrail database file the records are loaded into', type=str, required=True)
+	parserLoadRecords.add_argument('--clear', help='clear the database before loading', action='store_true', required=False)
+	parserLoadRecords.add_argument('--verbose', help='enable verbose console output', action='store_true', required=False)
+
+	replayCommandName = 'replay'
+	parserReplay = subparsers.add_parser(
+		replayCommandName,
+		help='Replay the calls recorded by "' + indexCommandName + ' --record-calls-path" into a cleared database as fast as possible and report how '
+			'long writing to the database takes. Run "' + replayCommandName + ' -h" for more info on available arguments.'
+	)
+	parserReplay.add_argument('--record-stream-path', help='path to the record stream file that should be replayed', type=str, required=True)
+	parserReplay.add_argument('--database-file-path', help='path to the Sourcetrail database file the calls are replayed into, which is cleared', type=str, required=True)
+	parserReplay.add_argument('--repeat', help='number of times the calls are replayed (default: 1)', type=int, default=1, required=False)
+
+	mergeCommandName = 'merge'
+	parserMerge = subparsers.add_parser(
+		mergeCommandName,
+		help='Merge Sourcetrail databases that have been written by separate indexer processes into one database. Run "' + mergeCommandName + ' -h" '
+			'for more info on available arguments.'
+	)
+	parserMerge.add_argument(
+		'--shard-path',
+		help='path to a Sourcetrail database file that should be merged, may be provided multiple times',
+		type=str,
+		action='append',
+		required=True
+	)
+	parserMerge.add_argument('--database-file-path', help='path to the merged Sourcetrail database file, which is overwritten', type=str, required=True)
+	parserMerge.add_argument('--verbose', help='enable verbose console output', action='store_true', required=False)
+
+	startupReportCommandName = 'startup-report'
+	parserStartupReport = subparsers.add_parser(
+		startupReportCommandName,
+		help='Measure the time it takes to import the required modules, to find the Python environment, to check the SourcetrailDB version and to open a '
+			'database, and print a breakdown of these startup costs. Run "' + startupReportCommandName + ' -h" for more info on available arguments.'
+	)
+	parserStartupReport.add_argument(
+		'--environment-path',
+		help='path to the Python executable or the directory that contains the Python environment that should be discovered (if not specified the path to the '
+			'currently used interpreter is used)',
+		type=str,
+		required=False
+	)
+	parserStartupReport.add_argument(
+		'--database-file-path',
+		help='path to the Sourcetrail database file that should be opened (if not specified a temporary database is used)',
+		type=str,
+		required=False
+	)
+	parserStartupReport.add_argument('--module-count', help='number of slowest modules to list (default: 20)', type=int, default=20, required=False)
+
+	for commandParser in [parserIndex, parserServe, parserBuildSymbolTable, parserLoadRecords]:
+		addLoggingArguments(commandParser, 'warning')
+	for commandParser in [parserWatch, parserReplay, parserMerge]:
+		addLoggingArguments(commandParser, 'info')
+
+	return parser
+
+
+def addMaxResolutionFailuresArgument(commandParser):
+	commandParser.add_argument(
+		'--max-resolution-failures',
+		help='number of consecutive failures to resolve names into the same module after which the remaining names of that module are '
+			'recorded as unsolved without trying to resolve them, 0 disables this limit. Not used in shallow mode (default: 50)',
+		type=int,
+		default=50,
+		required=False
+	)
+
+
+def getLogLevelName(args):
+	# info messages are only logged if they have been asked for, unless they report the results of the command
+	if args.log_level is not None:
+		return args.log_level
+	if getattr(args, 'verbose', False):
+		return 'info'
+	return args.default_log_level
+
+
+def addLoggingArguments(commandParser, defaultLevelName):
+	commandParser.add_argument(
+		'--log-level',
+		help='lowest level of the messages that are logged: "info", "warning" or "error" (default: ' + defaultLevelName + ', info with --verbose)',
+		type=str,
+		choices=['info', 'warning', 'error'],
+		required=False
+	)
+	commandParser.set_defaults(default_log_level=defaultLevelName)
+	commandParser.add_argument(
+		'--log-path',
+		help='path to a file that receives the logged messages instead of the console ("-" writes them to stderr)',
+		type=str,
+		required=False
+	)
+	commandParser.add_argument(
+		'--max-repeated-messages',
+		help='number of times the same message is logged before further repetitions are only counted and reported at the end, 0 disables this limit (default: 100)',
+		type=int,
+		default=100,
+		required=False
+	)
 
 
 def processIndexCommand(args):
+	import indexer_common
+	import indexing_session
+	import parse_cache
+
 	workingDirectory = os.getcwd()
 
-	if not indexer.isSourcetrailDBVersionCompatible(True):
+	if not indexer_common.isSourcetrailDBVersionCompatible(True):
 		return
 
-	databaseFilePath = args.database_file_path
-	if not os.path.isabs(databaseFilePath):
-		databaseFilePath = os.path.join(workingDirectory, databaseFilePath)
-
-	sourceFilePath = args.source_file_path
-	if not os.path.isabs(sourceFilePath):
-		sourceFilePath = os.path.join(workingDirectory, sourceFilePath)
+	if args.source_file_list is not None:
+		sourceFilePaths = readSourceFileList(args.source_file_list)
+	else:
+		sourceFilePaths = [args.source_file_path]
+	sourceFilePaths = [p if os.path.isabs(p) else os.path.join(workingDirectory, p) for p in sourceFilePaths]
+	projectFilePaths = sourceFilePaths
 
 	environmentPath = args.environment_path
 	if environmentPath is not None and not os.path.isabs(environmentPath):
 		environmentPath = os.path.join(workingDirectory, environmentPath)
 
-	if not srctrl.open(databaseFilePath):
-		print('ERROR: ' + srctrl.getLastError())
+	dependencyGraph = None
+	changedFilePaths = set()
+	if args.changed_files is not None and args.dependency_graph_path is None:
+		logger.error('Indexing only changed files and their dependents requires a dependency graph.')
+		return
+	if args.dependency_graph_path is not None:
+		import dependency_graph
+		dependencyGraphPath = args.dependency_graph_path
+		if not os.path.isabs(dependencyGraphPath):
+			dependencyGraphPath = os.path.join(workingDirectory, dependencyGraphPath)
+		if os.path.exists(dependencyGraphPath):
+			dependencyGraph = dependency_graph.loadDependencyGraph(dependencyGraphPath)
+			if dependencyGraph is None:
+				return
+		else:
+			dependencyGraph = dependency_graph.DependencyGraph()
+
+		if args.changed_files is not None:
+			changedFilePaths = set(os.path.abspath(os.path.join(workingDirectory, p)) for p in readSourceFileList(args.changed_files))
+			for changedFilePath in changedFilePaths:
+				if not os.path.exists(changedFilePath):
+					dependencyGraph.removeSourceFile(changedFilePath)
+			sourceFilePaths = dependencyGraph.getFilePathsToIndex(projectFilePaths, changedFilePaths)
+			if args.verbose:
+				logger.info(
+					'' + str(len(changedFilePaths)) + ' changed files require indexing ' + str(len(sourceFilePaths)) + ' of ' +
+					str(len(projectFilePaths)) + ' source files.'
+				)
+
+	parseCache = None
+	if args.cache_directory_path is not None:
+		cacheDirectoryPath = args.cache_directory_path
+		if not os.path.isabs(cacheDirectoryPath):
+			cacheDirectoryPath = os.path.join(workingDirectory, cacheDirectoryPath)
+		parseCache = parse_cache.ParseCache(cacheDirectoryPath)
+
+	memoryReport = None
+	if args.memory_report is not None:
+		import memory_report
+		if not memory_report.isMemoryReportSupported():
+			logger.error('Writing a memory report requires tracemalloc, which is only available for Python 3.4 and above.')
+			return
+		memoryReportFilePath = args.memory_report
+		if not os.path.isabs(memoryReportFilePath):
+			memoryReportFilePath = os.path.join(workingDirectory, memoryReportFilePath)
+		memoryReport = memory_report.MemoryReport(memoryReportFilePath)
+
+	if args.skip_unchanged_files and args.record_stream_path is not None:
+		logger.error('Unchanged files can only be skipped when indexing into a database.')
+		return
+
+	if args.shallow_backend == 'ast':
+		import shallow_ast_indexer
+		if not shallow_ast_indexer.isAstBackendSupported():
+			logger.error('The ast backend of the shallow indexer requires Python 3.8 or above.')
+			return
 
-	if args.clear:
+	commitPolicy = indexing_session.CommitPolicy(args.commit_interval, args.commit_record_count, args.commit_time_interval)
+
+	projectSymbolTable = None
+	if args.symbol_table_path is not None:
+		import project_symbol_table
+		symbolTablePath = args.symbol_table_path
+		if not os.path.isabs(symbolTablePath):
+			symbolTablePath = os.path.join(workingDirectory, symbolTablePath)
+		projectSymbolTable = project_symbol_table.loadProjectSymbolTable(symbolTablePath)
+		if projectSymbolTable is None:
+			return
+	elif args.shallow and not args.outline and len(projectFilePaths) > 1:
+		import project_symbol_table
+		startTime = time.time()
+		projectSymbolTable = project_symbol_table.buildProjectSymbolTable(projectFilePaths, parseCache)
 		if args.verbose:
-			print('INFO: Clearing database...')
-		if not srctrl.clear():
-			print('ERROR: ' + srctrl.getLastError())
-		else:
+			logger.info('Collected ' + str(len(projectSymbolTable.modules)) + ' modules into the project symbol table in ' + '{:.3f}'.format(time.time() - startTime) + ' seconds.')
+
+	if not args.shallow and not args.outline:
+		import indexer
+		indexer.setMaxConsecutiveResolutionFailureCount(args.max_resolution_failures)
+
+	largeFilePolicy = None
+	if args.max_file_size > 0 or args.max_file_lines > 0 or args.max_file_leaves > 0:
+		largeFilePolicy = indexing_session.LargeFilePolicy(args.max_file_size, args.max_file_lines, args.max_file_leaves, args.large_file_mode)
+
+	session = indexing_session.IndexingSession(
+		workingDirectory, environmentPath, args.verbose, args.shallow, parseCache, commitPolicy, createMemoryPolicy(args), memoryReport, projectSymbolTable,
+		args.shallow_backend, args.outline, largeFilePolicy
+	)
+	if args.record_stream_path is not None:
+		recordStreamPath = args.record_stream_path
+		if not os.path.isabs(recordStreamPath):
+			recordStreamPath = os.path.join(workingDirectory, recordStreamPath)
+		if not session.openRecordStream(recordStreamPath):
+			return
+	else:
+		databaseFilePath = args.database_file_path
+		if not os.path.isabs(databaseFilePath):
+			databaseFilePath = os.path.join(workingDirectory, databaseFilePath)
+		if not session.openDatabase(databaseFilePath, args.clear):
+			return
+		if args.record_calls_path is not None:
+			recordCallsPath = args.record_calls_path
+			if not os.path.isabs(recordCallsPath):
+				recordCallsPath = os.path.join(workingDirectory, recordCallsPath)
+			session.startRecordingCalls(recordCallsPath)
+		if args.skip_unchanged_files:
+			session.startSkippingUnchangedFiles(args.clear)
+
+	astDumpWriter = None
+	if args.ast_dump_path is not None:
+		astDumpPath = args.ast_dump_path
+		if not os.path.isabs(astDumpPath):
+			astDumpPath = os.path.join(workingDirectory, astDumpPath)
+		astDumpWriter = indexer_common.openAstDumpWriter(astDumpPath)
+		indexer_common.setAstDumpWriter(astDumpWriter)
+
+	progressReport = None
+	if args.progress_path is not None or args.progress_fd is not None:
+		import progress_report
+		progressPath = args.progress_path
+		if progressPath is not None and not os.path.isabs(progressPath):
+			progressPath = os.path.join(workingDirectory, progressPath)
+		progressReport = progress_report.ProgressReport(progress_report.openProgressOutput(progressPath, args.progress_fd))
+		session.startReportingProgress(progressReport)
+		progressReport.startRun(sourceFilePaths)
+
+	if len(sourceFilePaths) == 1:
+		# dependents of changed files have to be indexed again even though their own content has not changed
+		try:
+			indexFileIntoDependencyGraph(session, dependencyGraph, sourceFilePaths[0], args.changed_files is None)
+		except Exception:
+			if dependencyGraph is not None:
+				dependencyGraph.save(dependencyGraphPath)
+			raise
+	else:
+		for i, sourceFilePath in enumerate(sourceFilePaths):
 			if args.verbose:
-				print('INFO: Clearing done.')
+				logger.info('Indexing file %d of %d.', i + 1, len(sourceFilePaths))
+			try:
+				indexFileIntoDependencyGraph(session, dependencyGraph, sourceFilePath, args.changed_files is None)
+			except Exception as e:
+				logger.error('Encountered exception "%s" while indexing "%s".', e.__repr__(), sourceFilePath)
+
+	if dependencyGraph is not None:
+		dependencyGraph.save(dependencyGraphPath)
+
+	skippedFileCount = session.contentHashTable.skippedFileCount if session.contentHashTable is not None else 0
+	session.closeDatabase()
+
+	if progressReport is not None:
+		progressReport.finishRun()
+		progressReport.close()
+	if astDumpWriter is not None:
+		astDumpWriter.close()
+		indexer_common.setAstDumpWriter(None)
 
 	if args.verbose:
-		if srctrl.isEmpty():
-			print('INFO: Loaded database is empty.')
-		else:
-			print('INFO: Loaded database contains data.')
+		logger.info(session.getCommitStatisticsString())
+		if args.skip_unchanged_files:
+			logger.info('Skipped ' + str(skippedFileCount) + ' unchanged files.')
+		if parseCache is not None:
+			logger.info(parseCache.getStatisticsString())
+
+	if not args.shallow and not args.outline:
+		indexer.getResolutionFailureStatistics().logSummary()
+	indexer_log.logSummary()
+
+
+def indexFileIntoDependencyGraph(session, dependencyGraph, sourceFilePath, skipIfUnchanged):
+	# a file that fails is removed from the dependency graph, so the next run counts it as changed and indexes it again
+	try:
+		session.indexFile(sourceFilePath, skipIfUnchanged=skipIfUnchanged)
+		if dependencyGraph is not None:
+			dependencyGraph.addSourceFile(sourceFilePath)
+	except Exception:
+		if dependencyGraph is not None:
+			dependencyGraph.removeSourceFile(sourceFilePath)
+		raise
+
+
+def createMemoryPolicy(args):
+	import memory_policy
+
+	if args.max_memory <= 0 and args.max_cached_modules <= 0:
+		return None
+	return memory_policy.MemoryPolicy(int(args.max_memory * 1024 * 1024), args.max_cached_modules)
+
 
-	srctrl.beginTransaction()
-	indexSourceFile(sourceFilePath, environmentPath, workingDirectory, args.verbose, args.shallow)
-	srctrl.commitTransaction()
+def readSourceFileList(sourceFileListPath):
+	import sys
 
-	if not srctrl.close():
-		print('ERROR: ' + srctrl.getLastError())
+	if sourceFileListPath == '-':
+		lines = sys.stdin.readlines()
+	else:
+		with open(sourceFileListPath, 'r') as input:
+			lines = input.readlines()
+	return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
 
 
 def processCheckEnvironmentCommand(args):
+	import indexer
+
 	workingDirectory = os.getcwd()
 
 	environmentPath = args.environment_path
@@ -112,13 +690,259 @@ def processCheckEnvironmentCommand(args):
 		print('The provided path is not a valid Python environment: ' + message)
 
 
-def indexSourceFile(sourceFilePath, environmentPath, workingDirectory, verbose, shallow):
-	if shallow:
-		astVisitorClient = shallow_indexer.AstVisitorClient()
-		shallow_indexer.indexSourceFile(sourceFilePath, environmentPath, workingDirectory, astVisitorClient, verbose)
+def processWatchCommand(args):
+	import file_watcher
+	import module_locator
+	import indexer_common
+	import indexing_session
+	import parse_cache
+
+	workingDirectory = os.getcwd()
+
+	if not indexer_common.isSourcetrailDBVersionCompatible(True):
+		return
+
+	databaseFilePath = args.database_file_path
+	if not os.path.isabs(databaseFilePath):
+		databaseFilePath = os.path.join(workingDirectory, databaseFilePath)
+
+	sourceDirectoryPaths = []
+	for sourceDirectoryPath in args.source_directory_path:
+		if not os.path.isabs(sourceDirectoryPath):
+			sourceDirectoryPath = os.path.join(workingDirectory, sourceDirectoryPath)
+		sourceDirectoryPaths.append(sourceDirectoryPath)
+
+	environmentPath = args.environment_path
+	if environmentPath is not None and not os.path.isabs(environmentPath):
+		environmentPath = os.path.join(workingDirectory, environmentPath)
+
+	# the diff parse cache keeps the trees of all watched files in memory, so only the edited regions need to be parsed again
+	session = indexing_session.IndexingSession(
+		workingDirectory, environmentPath, args.verbose, args.shallow, parse_cache.DiffParseCache(), None, createMemoryPolicy(args)
+	)
+	if not session.openDatabase(databaseFilePath, args.clear):
+		return
+
+	if not args.shallow:
+		import indexer
+		indexer.setMaxConsecutiveResolutionFailureCount(args.max_resolution_failures)
+
+	watcher = file_watcher.SourceFileWatcher(sourceDirectoryPaths)
+	if args.skip_initial_indexing:
+		watcher.pollChangedFilePaths()
+
+	logger.info('Watching ' + str(len(sourceDirectoryPaths)) + ' path(s) for changes. Press Ctrl+C to stop.')
+	try:
+		while True:
+			changedFilePaths = watcher.pollChangedFilePaths()
+			if changedFilePaths:
+				module_locator.clearModuleLocatorCaches() # files may have been added or removed
+			for sourceFilePath in changedFilePaths:
+				startTime = time.time()
+				try:
+					session.indexFile(sourceFilePath)
+				except Exception as e:
+					logger.error('Encountered exception "%s" while indexing "%s".', e.__repr__(), sourceFilePath)
+					continue
+				logger.info('Indexed "%s" in %.3f seconds.', sourceFilePath, time.time() - startTime)
+			if changedFilePaths and not args.shallow:
+				# modules that have been skipped are tried again once their files (or the environment) may have changed
+				indexer.getResolutionFailureStatistics().logSummary()
+				indexer.resetResolutionFailureStatistics()
+			time.sleep(args.poll_interval)
+	except KeyboardInterrupt:
+		pass
+
+	if args.verbose:
+		logger.info(session.parseCache.getStatisticsString())
+	session.closeDatabase()
+	indexer_log.logSummary()
+
+
+def processServeCommand(args):
+	import index_server
+	import indexer
+	import indexer_common
+	import parse_cache
+	import sys
+
+	workingDirectory = os.getcwd()
+
+	if not indexer_common.isSourcetrailDBVersionCompatible(True):
+		return
+
+	if args.cache_directory_path is not None:
+		cacheDirectoryPath = args.cache_directory_path
+		if not os.path.isabs(cacheDirectoryPath):
+			cacheDirectoryPath = os.path.join(workingDirectory, cacheDirectoryPath)
+		parseCache = parse_cache.ParseCache(cacheDirectoryPath)
 	else:
-		astVisitorClient = indexer.AstVisitorClient()
-		indexer.indexSourceFile(sourceFilePath, environmentPath, workingDirectory, astVisitorClient, verbose)
+		parseCache = parse_cache.DiffParseCache()
+
+	indexer.setMaxConsecutiveResolutionFailureCount(args.max_resolution_failures)
+	server = index_server.IndexServer(workingDirectory, args.verbose, parseCache)
+	try:
+		if args.socket_path is not None:
+			socketPath = args.socket_path
+			if not os.path.isabs(socketPath):
+				socketPath = os.path.join(workingDirectory, socketPath)
+			server.serveUnixSocket(socketPath)
+		else:
+			index_server.serveStandardStreams(server)
+	except KeyboardInterrupt:
+		pass
+	server.shutdown()
+
+	if args.socket_path is None:
+		responseOutput = sys.stdout
+		sys.stdout = sys.stderr # stdout only carries responses
+		try:
+			indexer_log.logSummary()
+		finally:
+			sys.stdout = responseOutput
+	else:
+		indexer_log.logSummary()
+
+
+def processBuildSymbolTableCommand(args):
+	import project_symbol_table
+
+	workingDirectory = os.getcwd()
+
+	sourceFilePaths = [p if os.path.isabs(p) else os.path.join(workingDirectory, p) for p in readSourceFileList(args.source_file_list)]
+
+	outputPath = args.output_path
+	if not os.path.isabs(outputPath):
+		outputPath = os.path.join(workingDirectory, outputPath)
+
+	startTime = time.time()
+	projectSymbolTable = project_symbol_table.buildProjectSymbolTable(sourceFilePaths)
+	projectSymbolTable.save(outputPath)
+
+	if args.verbose:
+		logger.info('Collected ' + str(len(projectSymbolTable.modules)) + ' modules into "' + outputPath + '" in ' + '{:.3f}'.format(time.time() - startTime) + ' seconds.')
+
+
+def processLoadRecordsCommand(args):
+	import indexer_common
+	import indexing_session
+	import record_stream
+
+	workingDirectory = os.getcwd()
+
+	if not indexer_common.isSourcetrailDBVersionCompatible(True):
+		return
+
+	databaseFilePath = args.database_file_path
+	if not os.path.isabs(databaseFilePath):
+		databaseFilePath = os.path.join(workingDirectory, databaseFilePath)
+
+	session = indexing_session.IndexingSession(workingDirectory, None, args.verbose)
+	if not session.openDatabase(databaseFilePath, args.clear):
+		return
+
+	for recordStreamPath in args.record_stream_path:
+		if not os.path.isabs(recordStreamPath):
+			recordStreamPath = os.path.join(workingDirectory, recordStreamPath)
+
+		startTime = time.time()
+		session.beginTransaction()
+		try:
+			recordCount = record_stream.replayRecordStream(recordStreamPath, session.astVisitorClient)
+		except Exception as e:
+			session.rollbackTransaction()
+			logger.error('Encountered exception "%s" while loading "%s".', e.__repr__(), recordStreamPath)
+			continue
+		if recordCount is None:
+			session.rollbackTransaction()
+			continue
+		session.commitTransaction()
+
+		if args.verbose:
+			logger.info('Loaded %d records from "%s" in %.3f seconds.', recordCount, recordStreamPath, time.time() - startTime)
+
+	session.closeDatabase()
+
+
+def processReplayCommand(args):
+	import indexer_common
+	import indexing_session
+	import record_stream
+
+	workingDirectory = os.getcwd()
+
+	if not indexer_common.isSourcetrailDBVersionCompatible(True):
+		return
+
+	recordStreamPath = args.record_stream_path
+	if not os.path.isabs(recordStreamPath):
+		recordStreamPath = os.path.join(workingDirectory, recordStreamPath)
+
+	databaseFilePath = args.database_file_path
+	if not os.path.isabs(databaseFilePath):
+		databaseFilePath = os.path.join(workingDirectory, databaseFilePath)
+
+	# the records are decoded up front, so only the time spent writing to the database is measured
+	startTime = time.time()
+	records = record_stream.readRecordStream(recordStreamPath)
+	if records is None:
+		return
+	logger.info('Decoded ' + str(len(records)) + ' records in ' + '{:.3f}'.format(time.time() - startTime) + ' seconds.')
+
+	for i in range(args.repeat):
+		session = indexing_session.IndexingSession(workingDirectory)
+		if not session.openDatabase(databaseFilePath, True):
+			return
+
+		startTime = time.time()
+		session.beginTransaction()
+		record_stream.RecordStreamReplayer(session.astVisitorClient).replayRecords(records)
+		writeDuration = time.time() - startTime
+		session.closeDatabase()
+
+		logger.info(
+			'Replay %d: wrote %d records in %.3f seconds (%.0f records per second), committed in %.3f seconds.',
+			i + 1, len(records), writeDuration, len(records) / max(writeDuration, 1e-9), session.commitDuration
+		)
+
+
+def processMergeCommand(args):
+	import shard_merge
+
+	workingDirectory = os.getcwd()
+
+	shardFilePaths = [p if os.path.isabs(p) else os.path.join(workingDirectory, p) for p in args.shard_path]
+	for shardFilePath in shardFilePaths:
+		if not os.path.isfile(shardFilePath):
+			logger.error('Shard "%s" does not exist.', shardFilePath)
+			return
+
+	databaseFilePath = args.database_file_path
+	if not os.path.isabs(databaseFilePath):
+		databaseFilePath = os.path.join(workingDirectory, databaseFilePath)
+	if databaseFilePath in shardFilePaths:
+		logger.error('The merged database must not be one of the shards.')
+		return
+
+	startTime = time.time()
+	mergedShardCount = shard_merge.mergeShardDatabases(databaseFilePath, shardFilePaths, args.verbose)
+	logger.info('Merged ' + str(mergedShardCount) + ' of ' + str(len(shardFilePaths)) + ' shards in ' + '{:.3f}'.format(time.time() - startTime) + ' seconds.')
+
+
+def processStartupReportCommand(args):
+	import startup_report
+
+	workingDirectory = os.getcwd()
+
+	environmentPath = args.environment_path
+	if environmentPath is not None and not os.path.isabs(environmentPath):
+		environmentPath = os.path.join(workingDirectory, environmentPath)
+
+	databaseFilePath = args.database_file_path
+	if databaseFilePath is not None and not os.path.isabs(databaseFilePath):
+		databaseFilePath = os.path.join(workingDirectory, databaseFilePath)
+
+	startup_report.printStartupReport(_commandImportBudgets, environmentPath, databaseFilePath, args.module_count)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,1200 @@
+import ast
+import bisect
+import re
+import sys
+import unicodedata
+
+import sourcetraildb as srctrl
+
+import shallow_indexer
+from indexer_common import _virtualFilePath
+from indexer_common import _astParseErrorTypes
+from indexer_common import isAstBackendSupported
+from indexer_common import SourceRange
+from indexer_common import NameElement
+from indexer_common import getNameHierarchyForUnsolvedSymbol
+from indexer_common import getAstDumpWriter
+from indexer_log import logger
+from shallow_indexer import AstVisitor
+from shallow_indexer import ContextInfo
+from shallow_indexer import ContextType
+from shallow_indexer import ReferenceKindInfo
+from shallow_indexer import ScopeInfo
+from shallow_indexer import ScopeType
+from shallow_indexer import getSourceRangeOfNode
+
+
+# The stdlib ast module parses with CPython's C parser, which is much faster than parso, but it neither recovers from
+# syntax errors nor keeps the tokens of the source code. This backend walks the ast and recovers the token positions
+# it needs from the source code, so it records the same data as the parso based AstVisitor. Files that ast cannot
+# parse or that contain syntax the parso grammar does not know are indexed with parso instead.
+
+_lineBreakPattern = re.compile(r'\r\n|\r|\n')
+_tokenPattern = re.compile(r'(?:[ \t\f\r\n]+|\\\r?\n|#[^\r\n]*)*((?:\w|[^\x00-\x7f])+|\.\.\.|\S)')
+_identifierPattern = re.compile(r'(?:\w|[^\x00-\x7f])+')
+_identifierCharacterPattern = re.compile(r'\w|[^\x00-\x7f]')
+_stringStartPattern = re.compile(r'(?:[ \t\f\r\n]+|\\\r?\n|#[^\r\n]*)*([a-zA-Z]*)(\'\'\'|"""|\'|")')
+_stringEndPatterns = dict((quote, re.compile(r'(?:\\.|[^\\])*?' + quote, re.DOTALL)) for quote in ['\'\'\'', '"""', '\'', '"'])
+_fStringPrefixPattern = re.compile(r'(?<![\w\'"])[rRbB]?[fF][rRbB]?[\'"]')
+_conversionPattern = re.compile(r'[\s)=]*!(\w+)')
+
+_isDeletedNameDefinition = None # whether the installed version of parso treats the names of "del" statements as definitions
+_unsupportedNodeTypeNames = ['Match', 'TryStar', 'TypeAlias'] # syntax added after the grammars known to parso
+_comprehensionNodeTypes = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+# node types that older versions of Python do not know are left out as empty tuples, so the module can be imported by all of them
+_definitionNodeTypes = (ast.ClassDef, ast.FunctionDef, getattr(ast, 'AsyncFunctionDef', ()))
+_targetNodeTypes = (ast.Name, ast.Tuple, ast.List, getattr(ast, 'Starred', ()))
+_ignoredFieldNames = set(['ctx', 'op', 'ops', 'id', 'attr', 'name', 'arg', 'conversion', 'level', 'module', 'is_async', 'kind', 'simple', 'type_comment'])
+_childFieldNames = {}
+_statementListFieldNames = ['body', 'orelse', 'finalbody', 'handlers']
+_simpleStatementNodeTypes = (
+	ast.Assign, ast.AugAssign, getattr(ast, 'AnnAssign', ()), ast.Expr, ast.Delete, ast.Import, ast.ImportFrom, ast.Global,
+	getattr(ast, 'Nonlocal', ()), ast.Pass, ast.Break, ast.Continue, ast.Return, ast.Raise, ast.Assert
+)
+
+
+def indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, sysPath = None, parseCache = None, projectSymbolTable = None):
+	moduleNode = parseSourceCode(sourceCode, _virtualFilePath)
+	if moduleNode is None:
+		shallow_indexer.indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, sysPath, parseCache, projectSymbolTable)
+		return
+
+	if (isVerbose):
+		astVisitor = VerboseStdlibAstVisitor(astVisitorClient, _virtualFilePath, sourceCode, sysPath, projectSymbolTable)
+	else:
+		astVisitor = StdlibAstVisitor(astVisitorClient, _virtualFilePath, sourceCode, sysPath, projectSymbolTable)
+
+	astVisitor.traverseNode(moduleNode)
+
+
+def indexSourceFile(sourceFilePath, environmentDirectoryPath, workingDirectory, astVisitorClient, isVerbose, parseCache = None, projectSymbolTable = None, progressCallback = None, sourceCode = None):
+	if sourceCode is None:
+		with open(sourceFilePath, 'r', encoding='utf-8') as input:
+			sourceCode=input.read()
+
+	moduleNode = parseSourceCode(sourceCode, sourceFilePath)
+	if moduleNode is None:
+		if isVerbose:
+			logger.info('Source file "%s" cannot be indexed with the ast backend, falling back to parso.', sourceFilePath)
+		shallow_indexer.indexSourceFile(sourceFilePath, environmentDirectoryPath, workingDirectory, astVisitorClient, isVerbose, parseCache, projectSymbolTable, progressCallback, sourceCode)
+		return
+
+	if isVerbose:
+		logger.info('Indexing source file "%s".', sourceFilePath)
+		astVisitor = VerboseStdlibAstVisitor(astVisitorClient, sourceFilePath, sourceCode, None, projectSymbolTable)
+	else:
+		astVisitor = StdlibAstVisitor(astVisitorClient, sourceFilePath, sourceCode, None, projectSymbolTable)
+
+	astVisitor.progressCallback = progressCallback
+	astVisitor.traverseNode(moduleNode)
+
+
+def parseSourceCode(sourceCode, sourceFilePath):
+	# returns None if the source code needs to be indexed with parso
+	if not isAstBackendSupported():
+		return None
+	try:
+		moduleNode = ast.parse(sourceCode, sourceFilePath)
+	except _astParseErrorTypes:
+		return None
+	if not isSupportedModuleNode(moduleNode, sourceCode):
+		return None
+	return moduleNode
+
+
+def isSupportedModuleNode(moduleNode, sourceCode):
+	if not sourceCode.isascii():
+		for match in _identifierPattern.finditer(sourceCode):
+			name = match.group()
+			if not name.isascii() and name.isidentifier() and unicodedata.normalize('NFKC', name) != name:
+				return False # the names of the ast are normalized, so they would not match the names in the source code
+
+	if not isSupportedStatementList(moduleNode.body):
+		return False
+
+	if sys.version_info >= (3, 12) or _fStringPrefixPattern.search(sourceCode) is None:
+		return True
+
+	lines = None
+	for node in walkNodes(moduleNode):
+		if isinstance(node, ast.JoinedStr):
+			# before Python 3.12 the positions of the expressions of f-strings are computed after the fact and may be off
+			if lines is None:
+				lines = _lineBreakPattern.split(sourceCode)
+			positions = set()
+			for n in ast.walk(node):
+				if isinstance(n, ast.Name) and (getSourceSegment(lines, n) != n.id or (n.lineno, n.col_offset) in positions):
+					return False
+				if isinstance(n, ast.Name):
+					positions.add((n.lineno, n.col_offset))
+				if isinstance(n, ast.Attribute) and not getSourceSegment(lines, n).endswith(n.attr):
+					return False
+	return True
+
+
+def isSupportedStatementList(statements):
+	for statement in statements:
+		if type(statement).__name__ in _unsupportedNodeTypeNames or getattr(statement, 'type_params', None):
+			return False
+		for fieldName in _statementListFieldNames:
+			statements = getattr(statement, fieldName, None)
+			if statements and not isSupportedStatementList(statements):
+				return False
+	return True
+
+
+def getSourceSegment(lines, node):
+	if node.lineno != node.end_lineno:
+		return ''
+	return lines[node.lineno - 1].encode('utf-8')[node.col_offset:node.end_col_offset].decode('utf-8', 'replace')
+
+
+class NameLeaf:
+
+	# Stands in for a name leaf of a parso tree, so the methods shared with the parso based AstVisitor can be used.
+	def __init__(self, value, startLine, startColumn, endLine, endColumn):
+		self.value = value
+		self.start_pos = (startLine, startColumn)
+		self.end_pos = (endLine, endColumn)
+		self.isDefinition = False
+		self.isAttributeName = False
+		self.isQualifier = False # the name is followed by a "."
+		self.isCall = False # the name is followed by a "("
+		self.attributeNames = None # names of the attribute access up to this name, if it only consists of names
+		self.attributeRootName = None # name the attribute access starts with
+		self.importPath = None # import level, imported path and whether the name is imported, for names of import statements
+		self.parentFlags = [] # whether the nodes of the parso tree enclosing the name until its statement have direct name children
+
+
+class StdlibAstVisitor(AstVisitor):
+
+	def __init__(self, client, sourceFilePath, sourceCode, sysPath = None, projectSymbolTable = None):
+		AstVisitor.__init__(self, client, sourceFilePath, sourceCode, sysPath, projectSymbolTable)
+
+		self.sourceCode = sourceCode
+		self.isAsciiSource = sourceCode.isascii()
+		self.hasNamedExprs = ':=' in sourceCode
+		self.lineStartOffsets = [0] + [m.end() for m in _lineBreakPattern.finditer(sourceCode)]
+		self.moduleNameHierarchy = self.getNameHierarchyFromModuleFilePath(self.sourceFilePath)
+
+		self.nodeStack = []
+		self.definitionStack = [] # enclosing class and function definitions, including their headers
+
+		self.traversers = {
+			ast.Module: self.traverseModule,
+			ast.ClassDef: self.traverseClassdef,
+			ast.FunctionDef: self.traverseFuncdef,
+			ast.AsyncFunctionDef: self.traverseFuncdef,
+			ast.Lambda: self.traverseLambda,
+			ast.ListComp: self.traverseComprehension,
+			ast.SetComp: self.traverseComprehension,
+			ast.DictComp: self.traverseComprehension,
+			ast.GeneratorExp: self.traverseComprehension,
+			ast.Import: self.traverseImport,
+			ast.ImportFrom: self.traverseImportFrom,
+			ast.Global: self.traverseGlobalOrNonlocal,
+			ast.Nonlocal: self.traverseGlobalOrNonlocal,
+			ast.ExceptHandler: self.traverseExceptHandler,
+			ast.Name: self.traverseName,
+			ast.Attribute: self.traverseAttribute,
+			ast.Call: self.traverseCall,
+			ast.IfExp: self.traverseIfExp,
+			ast.Dict: self.traverseDict,
+			ast.Constant: self.traverseConstant,
+			ast.JoinedStr: self.traverseJoinedStr,
+			ast.FormattedValue: self.traverseFormattedValue,
+			ast.keyword: self.traverseKeyword,
+		}
+
+
+	def traverseNode(self, node):
+		if node is None:
+			return
+
+		self.nodeStack.append(node)
+		traverser = self.traversers.get(type(node))
+		if traverser is not None:
+			traverser(node)
+		else:
+			for fieldName in getChildFieldNames(type(node)):
+				value = getattr(node, fieldName, None)
+				if isinstance(value, list):
+					for c in value:
+						if isinstance(c, ast.AST):
+							self.traverseNode(c)
+				elif isinstance(value, ast.AST):
+					self.traverseNode(value)
+		self.nodeStack.pop()
+
+
+	def traverseNodes(self, nodes):
+		for node in nodes:
+			self.traverseNode(node)
+
+#----------------
+
+	def traverseModule(self, node):
+		if self.hasNamedExprs:
+			self.markNamedExprArguments(node)
+
+		scopeInfo = ScopeInfo(ScopeType.MODULE, node, self.getModuleNameHierarchy(), self.contextStack[-1].name)
+		collectBoundNames(scopeInfo, node.body, self.hasNamedExprs)
+		scopeInfo.removeDeclaredNames()
+		self.scopeStack.append(scopeInfo)
+
+		self.traverseNodes(node.body)
+
+		self.endVisitScope(node)
+
+
+	def traverseClassdef(self, node):
+		self.traverseDecorators(node.decorator_list)
+
+		self.beginVisitClassdef(node)
+		self.definitionStack.append(node)
+
+		superArguments = sortNodesByPosition(node.bases + node.keywords)
+		if superArguments:
+			self.referenceKindStack.append(ReferenceKindInfo(srctrl.REFERENCE_INHERITANCE, node))
+			self.traverseNodes(superArguments)
+			self.referenceKindStack.pop()
+
+		scopeInfo = ScopeInfo(ScopeType.CLASS, node, self.contextStack[-1].nameHierarchy, self.contextStack[-1].name)
+		collectBoundNames(scopeInfo, node.body, self.hasNamedExprs)
+		scopeInfo.removeDeclaredNames()
+		self.scopeStack.append(scopeInfo)
+		self.traverseNodes(node.body)
+		self.endVisitScope(node)
+
+		self.definitionStack.pop()
+		self.endVisitClassdef(node)
+
+
+	def traverseFuncdef(self, node):
+		self.traverseDecorators(node.decorator_list)
+
+		self.beginVisitFuncdef(node)
+		self.definitionStack.append(node)
+
+		params = getParams(node.args)
+		for param, default in params:
+			self.visitParam(param, default)
+
+		# default values of parameters are looked up in the enclosing scope, so the scope of the function only starts with its body
+		scopeInfo = ScopeInfo(ScopeType.FUNCTION, node, self.contextStack[-1].nameHierarchy, self.contextStack[-1].name)
+		for param, default in params:
+			scopeInfo.addBoundName(param.arg)
+		collectBoundNames(scopeInfo, node.body, self.hasNamedExprs)
+		scopeInfo.removeDeclaredNames()
+		self.scopeStack.append(scopeInfo)
+		self.traverseNodes(node.body)
+		self.endVisitScope(node)
+
+		self.definitionStack.pop()
+		self.endVisitFuncdef(node)
+
+
+	def traverseDecorators(self, nodes):
+		if sys.version_info < (3, 9):
+			# before Python 3.9 decorators are dotted names optionally followed by arguments, the names are not attribute accesses
+			for node in nodes:
+				nameNode = node.func if isinstance(node, ast.Call) else node
+				while isinstance(nameNode, ast.Attribute):
+					nameNode.isDottedName = True
+					nameNode = nameNode.value
+		self.traverseNodes(nodes)
+
+
+	def traverseLambda(self, node):
+		params = getParams(node.args)
+
+		scopeInfo = ScopeInfo(ScopeType.LAMBDA, node, None, self.contextStack[-1].name)
+		for param, default in params:
+			scopeInfo.addBoundName(param.arg)
+			if default is not None:
+				collectBoundNames(scopeInfo, [default], self.hasNamedExprs)
+		collectBoundNames(scopeInfo, [node.body], self.hasNamedExprs)
+		self.scopeStack.append(scopeInfo)
+
+		for param, default in params:
+			self.visitParam(param, default)
+		self.traverseNode(node.body)
+
+		self.endVisitScope(node)
+
+
+	def traverseComprehension(self, node):
+		if isinstance(node, ast.DictComp):
+			elements = [node.key, node.value]
+		else:
+			elements = [node.elt]
+
+		scopeInfo = ScopeInfo(ScopeType.COMPREHENSION, node, None, self.contextStack[-1].name)
+		collectBoundNames(scopeInfo, elements + node.generators, self.hasNamedExprs)
+		self.scopeStack.append(scopeInfo)
+
+		self.traverseNodes(elements)
+		self.traverseNodes(node.generators)
+
+		self.endVisitScope(node)
+
+
+	def traverseImport(self, node):
+		tokens = self.getTokensOfNode(node)
+		self.referenceKindStack.append(ReferenceKindInfo(srctrl.REFERENCE_IMPORT, node))
+		self.currentImportNode = node
+
+		i = 1 # skips "import"
+		for alias in node.names:
+			names = []
+			while True:
+				names.append(tokens[i][0])
+				leaf = self.createLeafAtOffset(tokens[i][0], tokens[i][1])
+				leaf.importPath = (0, list(names), True)
+				leaf.isQualifier = getTokenValue(tokens, i + 1) == '.'
+				self.visitName(leaf)
+				i += 1
+				if not leaf.isQualifier:
+					break
+				i += 1
+
+			if getTokenValue(tokens, i) == 'as':
+				# the alias is defined by the import statement
+				previousReferenceKind = self.referenceKindStack.pop()
+				leaf = self.createLeafAtOffset(tokens[i + 1][0], tokens[i + 1][1])
+				leaf.isDefinition = True
+				leaf.parentFlags = [False, len(node.names) > 1 and any(a.asname is None and '.' not in a.name for a in node.names), False]
+				self.visitName(leaf)
+				self.referenceKindStack.append(previousReferenceKind)
+				i += 2
+			i += 1 # skips ","
+
+		self.currentImportNode = None
+		self.referenceKindStack.pop()
+
+
+	def traverseImportFrom(self, node):
+		tokens = self.getTokensOfNode(node)
+		self.currentImportNode = node
+
+		i = 1 # skips "from"
+		level = node.level if node.level is not None else 0
+		moduleNames = []
+		while tokens[i][0] != 'import':
+			if tokens[i][0] not in ['.', '...']:
+				moduleNames.append(tokens[i][0])
+				leaf = self.createLeafAtOffset(tokens[i][0], tokens[i][1])
+				leaf.importPath = (level, list(moduleNames), False)
+				leaf.isQualifier = getTokenValue(tokens, i + 1) == '.'
+				self.visitName(leaf)
+			i += 1
+
+		self.referenceKindStack.append(ReferenceKindInfo(srctrl.REFERENCE_IMPORT, node))
+
+		hasModuleName = len(node.module.split('.')) == 1 if node.module is not None else False
+		hasPlainName = len(node.names) > 1 and any(a.asname is None for a in node.names)
+		for alias in node.names:
+			while getTokenValue(tokens, i) in ['import', '(', ',']:
+				i += 1
+			if alias.name == '*':
+				break
+
+			leaf = self.createLeafAtOffset(tokens[i][0], tokens[i][1])
+			leaf.importPath = (level, moduleNames + [tokens[i][0]], True)
+			self.visitName(leaf)
+			i += 1
+
+			if getTokenValue(tokens, i) == 'as':
+				# the alias is defined by the import statement
+				previousReferenceKind = self.referenceKindStack.pop()
+				leaf = self.createLeafAtOffset(tokens[i + 1][0], tokens[i + 1][1])
+				leaf.isDefinition = True
+				leaf.parentFlags = [False, hasPlainName or (len(node.names) == 1 and hasModuleName), hasModuleName] if len(node.names) > 1 else [False, hasModuleName]
+				self.visitName(leaf)
+				self.referenceKindStack.append(previousReferenceKind)
+				i += 2
+
+		self.referenceKindStack.pop()
+		self.currentImportNode = None
+
+
+	def traverseGlobalOrNonlocal(self, node):
+		tokens = self.getTokensOfNode(node)
+		for value, offset in tokens[1:]:
+			if value != ',':
+				self.visitName(self.createLeafAtOffset(value, offset))
+
+
+	def traverseExceptHandler(self, node):
+		self.traverseNode(node.type)
+
+		if node.name is not None:
+			offset = self.getOffset(node.type.end_lineno, node.type.end_col_offset)
+			while True:
+				match = _tokenPattern.match(self.sourceCode, offset)
+				offset = match.end(1)
+				if match.group(1) == 'as':
+					break
+			match = _tokenPattern.match(self.sourceCode, offset)
+			leaf = self.createLeafAtOffset(match.group(1), match.start(1))
+			leaf.isDefinition = True
+			leaf.parentFlags = [isBareName(self, node.type)]
+			self.visitName(leaf)
+
+		self.traverseNodes(node.body)
+
+
+	def traverseName(self, node):
+		leaf = self.createLeafOfNode(node)
+		leaf.isDefinition = isDefinitionContext(node.ctx) and not getattr(self.nodeStack[-2], 'isArgument', False)
+
+		parentNode = self.nodeStack[-2]
+		if isinstance(parentNode, ast.Attribute):
+			leaf.isQualifier = parentNode.value is node and self.getNextCharacter(node) == '.'
+		elif isinstance(parentNode, ast.Call):
+			leaf.isCall = parentNode.func is node and self.getNextCharacter(node) == '('
+
+		self.visitName(leaf)
+
+
+	def traverseAttribute(self, node):
+		self.traverseNode(node.value)
+
+		leaf = self.createLeafOfAttributeName(node)
+		leaf.isAttributeName = not getattr(node, 'isDottedName', False)
+		leaf.isDefinition = isDefinitionContext(node.ctx)
+
+		parentNode = self.nodeStack[-2]
+		if isinstance(parentNode, ast.Attribute):
+			leaf.isQualifier = parentNode.value is node and self.getNextCharacter(node) == '.'
+		elif isinstance(parentNode, ast.Call):
+			leaf.isCall = parentNode.func is node and self.getNextCharacter(node) == '('
+
+		if leaf.isAttributeName:
+			leaf.attributeNames = self.getAttributeNames(node)
+			leaf.attributeRootName = self.getAttributeRootName(node)
+
+		self.visitName(leaf)
+
+
+	def traverseCall(self, node):
+		self.traverseNode(node.func)
+		self.traverseNodes(sortNodesByPosition(node.args + node.keywords))
+
+
+	def traverseKeyword(self, node):
+		self.traverseNode(node.value) # the name of the keyword argument is not recorded
+
+
+	def traverseIfExp(self, node):
+		self.traverseNode(node.body)
+		self.traverseNode(node.test)
+		self.traverseNode(node.orelse)
+
+
+	def traverseDict(self, node):
+		for key, value in zip(node.keys, node.values):
+			self.traverseNode(key)
+			self.traverseNode(value)
+
+
+	def traverseConstant(self, node):
+		if isinstance(node.value, (str, bytes)) and node.lineno != node.end_lineno:
+			self.recordMultiLineStrings(node)
+
+
+	def traverseJoinedStr(self, node):
+		if node.lineno != node.end_lineno:
+			self.recordMultiLineStrings(node)
+		for value in node.values:
+			if isinstance(value, ast.FormattedValue):
+				self.traverseNode(value)
+
+
+	def traverseFormattedValue(self, node):
+		self.traverseNode(node.value)
+
+		if node.conversion is not None and node.conversion != -1:
+			# the conversion character of "{foo!r}" is a name leaf in parso's tree
+			match = _conversionPattern.match(self.sourceCode, self.getOffset(node.value.end_lineno, node.value.end_col_offset))
+			if match is not None:
+				self.visitName(self.createLeafAtOffset(match.group(1), match.start(1)))
+
+		self.traverseNode(node.format_spec)
+
+#----------------
+
+	def beginVisitClassdef(self, node):
+		tokens = self.getTokensOfRange(self.getOffset(node.lineno, node.col_offset), 2)
+		nameNode = self.createLeafAtOffset(tokens[1][0], tokens[1][1])
+
+		nameHierarchy = self.getNameHierarchyOfDefinition(nameNode.value)
+		symbolNameHierarchy = nameHierarchy
+		if symbolNameHierarchy is None:
+			symbolNameHierarchy = getNameHierarchyForUnsolvedSymbol()
+
+		symbolId = self.client.recordSymbol(symbolNameHierarchy)
+		self.client.recordSymbolDefinitionKind(symbolId, srctrl.DEFINITION_EXPLICIT)
+		self.client.recordSymbolKind(symbolId, srctrl.SYMBOL_CLASS)
+		self.client.recordSymbolLocation(symbolId, getSourceRangeOfNode(nameNode))
+		self.client.recordSymbolScopeLocation(symbolId, self.getScopeRangeOfDefinition(node, tokens[0][1]))
+		self.contextStack.append(ContextInfo(symbolId, ContextType.CLASS, symbolNameHierarchy.getDisplayString(), node, nameHierarchy))
+
+
+	def beginVisitFuncdef(self, node):
+		tokens = self.getTokensOfRange(self.getOffset(node.lineno, node.col_offset), 3)
+		if tokens[0][0] == 'async':
+			tokens = tokens[1:]
+		nameNode = self.createLeafAtOffset(tokens[1][0], tokens[1][1])
+
+		nameHierarchy = self.getNameHierarchyOfDefinition(nameNode.value)
+		symbolNameHierarchy = nameHierarchy
+		if symbolNameHierarchy is None:
+			symbolNameHierarchy = getNameHierarchyForUnsolvedSymbol()
+
+		selfParamName = None
+
+		contextType = ContextType.FUNCTION
+		symbolKind = srctrl.SYMBOL_FUNCTION
+		if self.contextStack[-1].contextType == ContextType.CLASS:
+			contextType = ContextType.METHOD
+			symbolKind = srctrl.SYMBOL_METHOD
+
+		params = getParams(node.args)
+		if contextType == ContextType.METHOD and params:
+			selfParamName = params[0][0].arg
+
+		symbolId = self.client.recordSymbol(symbolNameHierarchy)
+		self.client.recordSymbolDefinitionKind(symbolId, srctrl.DEFINITION_EXPLICIT)
+		self.client.recordSymbolKind(symbolId, symbolKind)
+		self.client.recordSymbolLocation(symbolId, getSourceRangeOfNode(nameNode))
+		self.client.recordSymbolScopeLocation(symbolId, self.getScopeRangeOfDefinition(node, tokens[0][1]))
+		contextInfo = ContextInfo(symbolId, contextType, symbolNameHierarchy.getDisplayString(), node, nameHierarchy)
+		contextInfo.selfParamName = selfParamName
+		self.contextStack.append(contextInfo)
+
+
+	def visitParam(self, param, default):
+		nameNode = self.createLeafOfNode(param)
+		localSymbolId = self.client.recordLocalSymbol(self.getLocalSymbolName(nameNode))
+		self.client.recordLocalSymbolLocation(localSymbolId, getSourceRangeOfNode(nameNode))
+
+		self.traverseNode(default)
+
+
+	def visitName(self, node):
+		# follows the same steps as AstVisitor.beginVisitName, but takes the information about the name from the leaf
+		if len(self.contextStack) == 0:
+			return
+
+		if self.currentImportNode is not None and self.recordReferenceToImportedName(node, self.currentImportNode):
+			return
+
+		if node.isQualifier:
+			if self.currentImportNode is None:
+				if node.isAttributeName:
+					if self.recordReferenceToImportedAttribute(node, srctrl.REFERENCE_USAGE):
+						return
+				elif self.recordReferenceToBoundName(node, srctrl.REFERENCE_USAGE):
+					return
+			symbolNameHierarchy = getNameHierarchyForUnsolvedSymbol()
+			symbolId = self.client.recordSymbol(symbolNameHierarchy)
+			self.client.recordQualifierLocation(symbolId, getSourceRangeOfNode(node))
+			return
+
+		if len(self.referenceKindStack) > 0 and self.referenceKindStack[-1] is not None:
+			if self.referenceKindStack[-1].kind == srctrl.REFERENCE_INHERITANCE:
+				if not node.isAttributeName and self.recordReferenceToBoundName(node, srctrl.REFERENCE_INHERITANCE):
+					return
+				self.client.recordReferenceToUnsolvedSymhol(self.contextStack[-1].id, srctrl.REFERENCE_INHERITANCE, getSourceRangeOfNode(node))
+				return
+			if self.referenceKindStack[-1].kind == srctrl.REFERENCE_IMPORT:
+				self.client.recordReferenceToUnsolvedSymhol(self.contextStack[-1].id, srctrl.REFERENCE_IMPORT, getSourceRangeOfNode(node))
+				return
+
+		referenceKind = srctrl.REFERENCE_USAGE
+		if node.isCall:
+			referenceKind = srctrl.REFERENCE_CALL
+
+		if node.isDefinition:
+			if self.scopeStack and self.scopeStack[-1].scopeType in [ScopeType.COMPREHENSION, ScopeType.LAMBDA]:
+				# definition is local to the comprehension or lambda, even if it is located at module or class level
+				if self.recordReferenceToBoundName(node, referenceKind):
+					return
+
+			namedDefinitionParentNode = self.definitionStack[-1] if self.definitionStack else None
+			if namedDefinitionParentNode is not None:
+				if isinstance(namedDefinitionParentNode, ast.ClassDef):
+					if self.isDirectlyDefinedInClass(node):
+						# definition is not local to some other field instantiation but instead it is a static member variable
+						# node is the definition of the static member variable
+						symbolNameHierarchy = self.getNameHierarchyOfDefinition(node.value)
+						if symbolNameHierarchy is not None:
+							symbolId = self.client.recordSymbol(symbolNameHierarchy)
+							self.client.recordSymbolKind(symbolId, srctrl.SYMBOL_FIELD)
+							self.client.recordSymbolDefinitionKind(symbolId, srctrl.DEFINITION_EXPLICIT)
+							self.client.recordSymbolLocation(symbolId, getSourceRangeOfNode(node))
+							return
+				else:
+					# definition may be a non-static member variable
+					if node.isAttributeName:
+						if node.attributeRootName is not None and node.attributeRootName == self.contextStack[-1].selfParamName:
+							# definition is a non-static member variable
+							symbolNameHierarchy = None
+							if len(self.contextStack) > 1 and self.contextStack[-2].nameHierarchy is not None:
+								symbolNameHierarchy = self.contextStack[-2].nameHierarchy.copy()
+								symbolNameHierarchy.nameElements.append(NameElement(node.value))
+							if symbolNameHierarchy is not None:
+								sourceRange = getSourceRangeOfNode(node)
+
+								symbolId = self.client.recordSymbol(symbolNameHierarchy)
+								self.client.recordSymbolKind(symbolId, srctrl.SYMBOL_FIELD)
+								self.client.recordSymbolDefinitionKind(symbolId, srctrl.DEFINITION_EXPLICIT)
+								self.client.recordSymbolLocation(symbolId, sourceRange)
+
+								referenceId = self.client.recordReference(self.contextStack[-1].id, symbolId, referenceKind)
+								self.client.recordReferenceLocation(referenceId, sourceRange)
+								return
+						else:
+							# this is just a re-definition of an other class' member
+							self.client.recordReferenceToUnsolvedSymhol(self.contextStack[-1].id, referenceKind, getSourceRangeOfNode(node))
+							return
+					# definition is a local variable or a variable of an enclosing scope declared "global" or "nonlocal"
+					if self.recordReferenceToBoundName(node, referenceKind):
+						return
+					localSymbolId = self.client.recordLocalSymbol(self.getLocalSymbolName(node))
+					self.client.recordLocalSymbolLocation(localSymbolId, getSourceRangeOfNode(node))
+					return
+			else:
+				symbolNameHierarchy = self.getNameHierarchyOfDefinition(node.value)
+				if symbolNameHierarchy is not None:
+					symbolId = self.client.recordSymbol(symbolNameHierarchy)
+					self.client.recordSymbolKind(symbolId, srctrl.SYMBOL_GLOBAL_VARIABLE)
+					self.client.recordSymbolDefinitionKind(symbolId, srctrl.DEFINITION_EXPLICIT)
+					self.client.recordSymbolLocation(symbolId, getSourceRangeOfNode(node))
+					return
+		else:
+			if self.currentImportNode is None:
+				if node.isAttributeName:
+					if self.recordReferenceToImportedAttribute(node, referenceKind):
+						return
+				elif self.recordReferenceToBoundName(node, referenceKind):
+					return
+
+		# fallback if not returned before
+		self.client.recordReferenceToUnsolvedSymhol(self.contextStack[-1].id, referenceKind, getSourceRangeOfNode(node))
+
+#----------------
+
+	def recordReferenceToImportedName(self, node, importNode):
+		if node.importPath is None:
+			return False # the alias is defined by the import statement
+
+		level, names, isImportedName = node.importPath
+		referenceKind = srctrl.REFERENCE_IMPORT
+		if not isImportedName:
+			referenceKind = srctrl.REFERENCE_USAGE
+		return self.recordReferenceToImportTarget(node, referenceKind, (level, names), [])
+
+
+	def recordReferenceToImportedAttribute(self, node, referenceKind):
+		names = node.attributeNames
+		if names is None:
+			return False
+
+		scopeInfo = self.getScopeOfName(names[0])
+		if scopeInfo is None or names[0] not in scopeInfo.importedNames:
+			return False
+		return self.recordReferenceToImportTarget(node, referenceKind, scopeInfo.importedNames[names[0]], names[1:])
+
+
+	def recordReferenceToSymbol(self, node, referenceKind, nameHierarchy):
+		sourceRange = getSourceRangeOfNode(node)
+		symbolId = self.client.recordSymbol(nameHierarchy)
+		if node.isQualifier:
+			self.client.recordQualifierLocation(symbolId, sourceRange)
+		else:
+			referenceId = self.client.recordReference(self.contextStack[-1].id, symbolId, referenceKind)
+			self.client.recordReferenceLocation(referenceId, sourceRange)
+		return symbolId
+
+
+	def recordMultiLineStrings(self, node):
+		# records the string literals spanning multiple lines, a node may consist of several implicitly concatenated literals
+		offset = self.getOffset(node.lineno, node.col_offset)
+		endOffset = self.getOffset(node.end_lineno, node.end_col_offset)
+		while offset < endOffset:
+			match = _stringStartPattern.match(self.sourceCode, offset)
+			if match is None:
+				return
+			endMatch = _stringEndPatterns[match.group(2)].match(self.sourceCode, match.end(2))
+			if endMatch is None:
+				return
+			offset = endMatch.end()
+
+			if 'f' in match.group(1).lower():
+				continue # f-strings are not string leaves in parso's tree
+			startLine, startColumn = self.getPositionOfOffset(match.start(1))
+			endLine, endColumn = self.getPositionOfOffset(offset)
+			if startLine != endLine:
+				self.client.recordAtomicSourceRange(SourceRange(startLine, startColumn + 1, endLine, endColumn))
+
+#----------------
+
+	def markNamedExprArguments(self, moduleNode):
+		# "foo(bar := baz)" and "foo[bar := baz]" are parsed as argument and slice by parso, so "bar" is neither defined nor bound
+		for node in walkNodes(moduleNode):
+			if isinstance(node, ast.Call):
+				self.markUnparenthesizedNamedExprs(node.func, node.args + node.keywords)
+			elif isinstance(node, ast.ClassDef):
+				tokens = self.getTokensOfRange(self.getOffset(node.lineno, node.col_offset), 2)
+				self.markUnparenthesizedNamedExprs(tokens[1][1] + len(tokens[1][0]), node.bases + node.keywords)
+			elif isinstance(node, ast.Subscript):
+				sliceNode = node.slice
+				if type(sliceNode).__name__ == 'Index':
+					sliceNode = sliceNode.value # Python 3.8 wraps the slice
+				if not hasattr(sliceNode, 'lineno'):
+					continue
+				elements = [sliceNode]
+				if isinstance(sliceNode, ast.Tuple) and self.getCharacter(sliceNode.lineno, sliceNode.col_offset) != '(':
+					elements = sliceNode.elts
+				self.markUnparenthesizedNamedExprs(node.value, elements)
+
+
+	def markUnparenthesizedNamedExprs(self, previousNodeOrOffset, nodes):
+		offset = previousNodeOrOffset
+		if isinstance(offset, ast.AST):
+			offset = self.getOffset(offset.end_lineno, offset.end_col_offset)
+
+		for node in sortNodesByPosition(nodes):
+			match = _tokenPattern.match(self.sourceCode, offset)
+			while match.group(1) == ')':
+				match = _tokenPattern.match(self.sourceCode, match.end(1))
+			match = _tokenPattern.match(self.sourceCode, match.end(1)) # skips the opening bracket or ","
+			if isinstance(node, ast.NamedExpr) and match.start(1) == self.getOffset(node.lineno, node.col_offset):
+				node.isArgument = True
+			if isinstance(node, ast.keyword):
+				node = node.value
+			offset = self.getOffset(node.end_lineno, node.end_col_offset)
+
+
+	def isDirectlyDefinedInClass(self, node):
+		# Emulates "getNamedParentNode(node) == classdef" of the parso based AstVisitor: starting at the grandparent of the
+		# name, none of the nodes of the parso tree up to the class may have a name as direct child.
+		flags = list(node.parentFlags)
+
+		index = len(self.nodeStack) - 1
+		childNode = self.nodeStack[index]
+		if isinstance(childNode, ast.Name):
+			if self.isParenthesized(childNode):
+				flags.append(True)
+		elif isinstance(childNode, ast.Attribute):
+			if node.attributeRootName is not None:
+				flags.extend([False, True])
+
+		while index > 0:
+			parentNode = self.nodeStack[index - 1]
+			if isinstance(parentNode, ast.ClassDef):
+				break
+			flags.extend(self.getParentFlags(parentNode, childNode))
+			childNode = parentNode
+			index -= 1
+
+		return not any(flags[1:])
+
+
+	def getParentFlags(self, node, childNode):
+		if isinstance(node, ast.Tuple):
+			if self.getCharacter(node.lineno, node.col_offset) == '(':
+				return [any(isBareName(self, e) for e in node.elts), False]
+			return [any(isBareName(self, e) for e in node.elts)]
+		if isinstance(node, ast.List):
+			if len(node.elts) == 1:
+				return [isBareName(self, node.elts[0])]
+			return [any(isBareName(self, e) for e in node.elts), False]
+		if isinstance(node, ast.Starred):
+			return [isBareName(self, node.value)]
+		if isinstance(node, ast.NamedExpr):
+			return [isBareName(self, node.target) or isBareName(self, node.value)]
+		if isinstance(node, ast.Assign):
+			return [any(isBareName(self, t) for t in node.targets) or isBareName(self, node.value), self.hasBareNameInSimpleStatement(node)]
+		if isinstance(node, ast.AugAssign):
+			return [isBareName(self, node.target) or isBareName(self, node.value), self.hasBareNameInSimpleStatement(node)]
+		if isinstance(node, ast.AnnAssign):
+			flags = [isBareName(self, node.target), self.hasBareNameInSimpleStatement(node)]
+			if childNode is not node.target:
+				flags.insert(0, isBareName(self, node.annotation) or isBareName(self, node.value))
+			return flags
+		if isinstance(node, ast.Delete):
+			if len(node.targets) > 1:
+				return [any(isBareName(self, t) for t in node.targets), False, self.hasBareNameInSimpleStatement(node)]
+			return [isBareName(self, node.targets[0]), self.hasBareNameInSimpleStatement(node)]
+		if isinstance(node, _simpleStatementNodeTypes):
+			return [self.hasBareNameInSimpleStatement(node)]
+		if isinstance(node, (ast.For, ast.AsyncFor)):
+			return [isBareName(self, node.target) or isBareName(self, node.iter)]
+		if isinstance(node, ast.While):
+			return [isBareName(self, node.test)]
+		if isinstance(node, ast.If):
+			if self.isElif(node):
+				return [] # part of the same node of the parso tree as the enclosing "if"
+			tests = [node.test]
+			while len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If) and self.isElif(node.orelse[0]):
+				node = node.orelse[0]
+				tests.append(node.test)
+			return [any(isBareName(self, t) for t in tests)]
+		if isinstance(node, ast.withitem):
+			return [isBareName(self, node.context_expr) or isBareName(self, node.optional_vars)]
+		if isinstance(node, (ast.With, ast.AsyncWith)):
+			return [any(item.optional_vars is None and isBareName(self, item.context_expr) for item in node.items)]
+		if isinstance(node, ast.ExceptHandler):
+			if childNode is node.type:
+				return [isBareName(self, node.type)]
+			return []
+		if isinstance(node, ast.Try):
+			return [False]
+		return [any(isBareName(self, c) for c in iterChildNodes(node))]
+
+
+	def hasBareNameInSimpleStatement(self, node):
+		# simple statements separated by ";" share the same node of the parso tree
+		for statements in getStatementLists(self.nodeStack[self.nodeStack.index(node) - 1]):
+			if node not in statements:
+				continue
+			index = statements.index(node)
+			start = index
+			while start > 0 and statements[start - 1].end_lineno == statements[start].lineno:
+				start -= 1
+			end = index
+			while end + 1 < len(statements) and statements[end + 1].lineno == statements[end].end_lineno:
+				end += 1
+			for statement in statements[start:end + 1]:
+				if statement is not node and isinstance(statement, ast.Expr) and isBareName(self, statement.value):
+					return True
+		return False
+
+
+	def isElif(self, node):
+		parentNode = self.nodeStack[self.nodeStack.index(node) - 1] if node in self.nodeStack else None
+		return (
+			(parentNode is None or (isinstance(parentNode, ast.If) and parentNode.orelse == [node])) and
+			self.sourceCode.startswith('elif', self.getOffset(node.lineno, node.col_offset))
+		)
+
+
+	def isParenthesized(self, node):
+		offset = self.getOffset(node.lineno, node.col_offset) - 1
+		while offset >= 0 and self.sourceCode[offset] in ' \t\f\r\n\\':
+			offset -= 1
+		return offset >= 0 and self.sourceCode[offset] == '(' and self.getNextCharacter(node) == ')'
+
+
+	def getAttributeNames(self, node):
+		# returns the names of the attribute access up to the node, like "getAttributeNames" of the parso based AstVisitor
+		topNode = node
+		index = len(self.nodeStack) - 2
+		while index >= 0:
+			parentNode = self.nodeStack[index]
+			if not (
+				(isinstance(parentNode, (ast.Attribute, ast.Subscript)) and parentNode.value is topNode) or
+				(isinstance(parentNode, ast.Call) and parentNode.func is topNode)
+			) or self.getNextCharacter(topNode) == ')':
+				break
+			topNode = parentNode
+			index -= 1
+		if index >= 0 and isinstance(self.nodeStack[index], ast.Await) and self.nodeStack[index].end_col_offset == topNode.end_col_offset:
+			return None # "await" is part of the same node of the parso tree
+
+		names = [node.attr]
+		valueNode = node.value
+		while True:
+			if self.getNextCharacter(valueNode) == ')':
+				return None
+			if isinstance(valueNode, ast.Attribute):
+				names.insert(0, valueNode.attr)
+				valueNode = valueNode.value
+			elif isinstance(valueNode, ast.Name):
+				names.insert(0, valueNode.id)
+				return names
+			else:
+				return None
+
+
+	def getAttributeRootName(self, node):
+		valueNode = node.value
+		while True:
+			if self.getNextCharacter(valueNode) == ')':
+				return None
+			if isinstance(valueNode, (ast.Attribute, ast.Subscript)):
+				valueNode = valueNode.value
+			elif isinstance(valueNode, ast.Call):
+				valueNode = valueNode.func
+			elif isinstance(valueNode, ast.Name):
+				return valueNode.id
+			else:
+				return None
+
+
+	def getModuleNameHierarchy(self):
+		if self.moduleNameHierarchy is None:
+			return None
+		return self.moduleNameHierarchy.copy()
+
+
+	def getNameHierarchyOfDefinition(self, name):
+		# the contexts of the enclosing classes and functions carry the names the way they are written in the source code
+		if self.contextStack[-1].nameHierarchy is None:
+			return None
+		nameHierarchy = self.contextStack[-1].nameHierarchy.copy()
+		nameHierarchy.nameElements.append(NameElement(name))
+		return nameHierarchy
+
+
+	def getScopeRangeOfDefinition(self, node, startOffset):
+		# the node of the parso tree ends after the line break of its last statement
+		startLine, startColumn = self.getPositionOfOffset(startOffset)
+		if node.end_lineno < len(self.lineStartOffsets):
+			return SourceRange(startLine, startColumn + 1, node.end_lineno + 1, 0)
+		return SourceRange(startLine, startColumn + 1, node.end_lineno, self.getColumn(node.end_lineno, node.end_col_offset))
+
+
+	def getLastLineOfNode(self, node):
+		return node.end_lineno
+
+#----------------
+
+	def getColumn(self, line, byteColumn):
+		# the column offsets of ast count bytes of the utf-8 encoded line, parso counts characters
+		if self.isAsciiSource:
+			return byteColumn
+		lineStartOffset = self.lineStartOffsets[line - 1]
+		lineEndOffset = self.lineStartOffsets[line] if line < len(self.lineStartOffsets) else len(self.sourceCode)
+		return len(self.sourceCode[lineStartOffset:lineEndOffset].encode('utf-8')[:byteColumn].decode('utf-8', 'replace'))
+
+
+	def getOffset(self, line, byteColumn):
+		return self.lineStartOffsets[line - 1] + self.getColumn(line, byteColumn)
+
+
+	def getCharacter(self, line, byteColumn):
+		return self.sourceCode[self.getOffset(line, byteColumn):][:1]
+
+
+	def getNextCharacter(self, node):
+		# returns the first character following the node that is not a space, a line continuation or part of a comment
+		match = _tokenPattern.match(self.sourceCode, self.getOffset(node.end_lineno, node.end_col_offset))
+		if match is None:
+			return ''
+		return match.group(1)[0]
+
+
+	def getTokensOfNode(self, node):
+		startOffset = self.getOffset(node.lineno, node.col_offset)
+		endOffset = self.getOffset(node.end_lineno, node.end_col_offset)
+		tokens = []
+		while True:
+			match = _tokenPattern.match(self.sourceCode, startOffset)
+			if match is None or match.start(1) >= endOffset:
+				return tokens
+			tokens.append((match.group(1), match.start(1)))
+			startOffset = match.end(1)
+
+
+	def getTokensOfRange(self, startOffset, tokenCount):
+		tokens = []
+		for i in range(tokenCount):
+			match = _tokenPattern.match(self.sourceCode, startOffset)
+			tokens.append((match.group(1), match.start(1)))
+			startOffset = match.end(1)
+		return tokens
+
+
+	def createLeafOfNode(self, node):
+		# the names of the ast are normalized, parso keeps them the way they are written
+		offset = self.getOffset(node.lineno, node.col_offset)
+		return self.createLeafAtOffset(_identifierPattern.match(self.sourceCode, offset).group(), offset)
+
+
+	def createLeafOfAttributeName(self, node):
+		# the name of the attribute is the identifier the node ends with
+		endColumn = self.getColumn(node.end_lineno, node.end_col_offset)
+		lineStartOffset = self.lineStartOffsets[node.end_lineno - 1]
+		startColumn = endColumn
+		while startColumn > 0 and _identifierCharacterPattern.match(self.sourceCode[lineStartOffset + startColumn - 1]):
+			startColumn -= 1
+
+		value = self.sourceCode[lineStartOffset + startColumn:lineStartOffset + endColumn]
+		return NameLeaf(value, node.end_lineno, startColumn, node.end_lineno, endColumn)
+
+
+	def createLeafAtOffset(self, value, offset):
+		line, column = self.getPositionOfOffset(offset)
+		return NameLeaf(value, line, column, line, column + len(value))
+
+
+	def getPositionOfOffset(self, offset):
+		line = bisect.bisect_right(self.lineStartOffsets, offset)
+		return line, offset - self.lineStartOffsets[line - 1]
+
+
+class VerboseStdlibAstVisitor(StdlibAstVisitor):
+
+	def __init__(self, client, sourceFilePath, sourceCode, sysPath = None, projectSymbolTable = None):
+		StdlibAstVisitor.__init__(self, client, sourceFilePath, sourceCode, sysPath, projectSymbolTable)
+		self.indentationLevel = 0
+		self.astDumpWriter = getAstDumpWriter()
+
+
+	def traverseNode(self, node):
+		if node is None:
+			return
+
+		currentString = type(node).__name__
+
+		for fieldName in ['id', 'attr', 'name', 'arg', 'value']:
+			value = getattr(node, fieldName, None)
+			if isinstance(value, (str, bytes, int, float)):
+				currentString += ' (' + repr(value) + ')'
+				break
+
+		if hasattr(node, 'end_lineno'):
+			currentString += ' ' + SourceRange(node.lineno, node.col_offset + 1, node.end_lineno, node.end_col_offset).toString()
+
+		self.astDumpWriter.writeNode(self.indentationLevel, currentString)
+
+		self.indentationLevel += 1
+		StdlibAstVisitor.traverseNode(self, node)
+		self.indentationLevel -= 1
+
+
+def getParams(argumentsNode):
+	# returns the parameters in the order of the source code together with their default values
+	positionalParams = getattr(argumentsNode, 'posonlyargs', []) + argumentsNode.args
+	defaults = [None] * (len(positionalParams) - len(argumentsNode.defaults)) + argumentsNode.defaults
+
+	params = list(zip(positionalParams, defaults))
+	if argumentsNode.vararg is not None:
+		params.append((argumentsNode.vararg, None))
+	params.extend(zip(argumentsNode.kwonlyargs, argumentsNode.kw_defaults))
+	if argumentsNode.kwarg is not None:
+		params.append((argumentsNode.kwarg, None))
+	return params
+
+
+def collectBoundNames(scopeInfo, nodes, hasNamedExprs = True):
+	# Collects the names bound within the scope of the nodes without descending into the scopes nested inside. Unless the
+	# source code contains named expressions like "(a := b)", only assignment targets need to be searched for names.
+	for node in nodes:
+		if not hasNamedExprs and isinstance(node, ast.expr) and not isinstance(node, _targetNodeTypes):
+			continue
+		elif isinstance(node, _definitionNodeTypes):
+			scopeInfo.symbolNames.add(node.name)
+			collectBoundNames(scopeInfo, node.decorator_list, hasNamedExprs)
+		elif isinstance(node, (ast.Lambda,) + _comprehensionNodeTypes):
+			continue
+		elif isinstance(node, ast.Global):
+			scopeInfo.globalNames.update(node.names)
+		elif isinstance(node, ast.Nonlocal):
+			scopeInfo.nonlocalNames.update(node.names)
+		elif isinstance(node, ast.Import):
+			for alias in node.names:
+				names = alias.name.split('.')
+				if alias.asname is None:
+					scopeInfo.importedNames[names[0]] = (0, names[:1])
+				else:
+					scopeInfo.importedNames[alias.asname] = (0, names)
+					scopeInfo.addBoundName(alias.asname)
+		elif isinstance(node, ast.ImportFrom):
+			moduleNames = node.module.split('.') if node.module is not None else []
+			for alias in node.names:
+				if alias.name == '*':
+					continue
+				if alias.asname is None:
+					scopeInfo.importedNames[alias.name] = (node.level or 0, moduleNames + [alias.name])
+				else:
+					scopeInfo.importedNames[alias.asname] = (node.level or 0, moduleNames + [alias.name])
+					scopeInfo.addBoundName(alias.asname)
+		elif isinstance(node, ast.Name):
+			if isDefinitionContext(node.ctx):
+				scopeInfo.addBoundName(node.id)
+		elif isinstance(node, ast.NamedExpr) and getattr(node, 'isArgument', False):
+			collectBoundNames(scopeInfo, [node.value], hasNamedExprs)
+		else:
+			if isinstance(node, ast.ExceptHandler) and node.name is not None:
+				scopeInfo.addBoundName(node.name)
+			collectBoundNames(scopeInfo, iterChildNodes(node), hasNamedExprs)
+
+
+def isDefinitionContext(ctx):
+	if isinstance(ctx, ast.Load):
+		return False
+	if isinstance(ctx, ast.Del):
+		return isDeletedNameDefinition()
+	return True
+
+
+def isDeletedNameDefinition():
+	# Recent versions of parso treat the names of "del" statements as definitions, older ones (like 0.5) as references. The
+	# installed version is asked once, so both backends record the same data.
+	global _isDeletedNameDefinition
+	if _isDeletedNameDefinition is None:
+		deletionNode = shallow_indexer.parseSourceCode('del x', _virtualFilePath).children[0]
+		_isDeletedNameDefinition = deletionNode.children[1].is_definition()
+	return _isDeletedNameDefinition
+
+
+def walkNodes(node):
+	# faster than "ast.walk", yields the node and all of its descendants in no particular order
+	nodes = [node]
+	while nodes:
+		node = nodes.pop()
+		nodes.extend(iterChildNodes(node))
+		yield node
+
+
+def iterChildNodes(node):
+	# faster than "ast.iter_child_nodes", because fields that never hold child nodes of interest are skipped
+	for fieldName in getChildFieldNames(type(node)):
+		value = getattr(node, fieldName, None)
+		if isinstance(value, list):
+			for item in value:
+				if isinstance(item, ast.AST):
+					yield item
+		elif isinstance(value, ast.AST):
+			yield value
+
+
+def getChildFieldNames(nodeType):
+	fieldNames = _childFieldNames.get(nodeType)
+	if fieldNames is None:
+		fieldNames = [f for f in nodeType._fields if f not in _ignoredFieldNames]
+		_childFieldNames[nodeType] = fieldNames
+	return fieldNames
+
+
+def getStatementLists(node):
+	for fieldName in ['body', 'orelse', 'finalbody']:
+		statements = getattr(node, fieldName, None)
+		if isinstance(statements, list):
+			yield statements
+
+
+def isBareName(astVisitor, node):
+	# names enclosed in parentheses are wrapped by an "atom" node in the parso tree
+	return isinstance(node, ast.Name) and not astVisitor.isParenthesized(node)
+
+
+def sortNodesByPosition(nodes):
+	return sorted(nodes, key=getPositionOfNode)
+
+
+def getPositionOfNode(node):
+	if isinstance(node, ast.keyword):
+		node = node.value # keywords do not have a position before Python 3.9
+	return (node.lineno, node.col_offset)
+
+
+def getTokenValue(tokens, index):
+	if index < len(tokens):
+		return tokens[index][0]
+	return None
@@ -1,70 +1,67 @@
+import codecs
 import parso
-import json
 import os
 from enum import Enum
 import sys
 
 import sourcetraildb as srctrl
 from _version import __version__
-from _version import _sourcetrail_db_version
 
-from indexer import AstVisitorClient
-from indexer import SourceRange
-from indexer import NameHierarchy
-from indexer import NameElement
-from indexer import NameHierarchyEncoder
-
-
-_virtualFilePath = 'virtual_file.py'
-
-
-def isSourcetrailDBVersionCompatible(allowLogging = False):
-	requiredVersion = _sourcetrail_db_version
-
-	try:
-		usedVersion = srctrl.getVersionString()
-	except AttributeError:
-		if allowLogging:
-			print('ERROR: Used version of SourcetrailDB is incompatible to what is required by this version of SourcetrailPythonIndexer (' + requiredVersion + ').')
-		return False
-
-	if usedVersion != requiredVersion:
-		if allowLogging:
-			print('ERROR: Used version of SourcetrailDB (' + usedVersion + ') is incompatible to what is required by this version of SourcetrailPythonIndexer (' + requiredVersion + ').')
-		return False
-	return True
-
-
-def indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, sysPath = None):
+from indexer_common import _virtualFilePath
+from indexer_common import isSourcetrailDBVersionCompatible
+from indexer_common import AstVisitorClient
+from indexer_common import SourceRange
+from indexer_common import NameHierarchy
+from indexer_common import NameElement
+from indexer_common import NameHierarchyEncoder
+from indexer_common import getNameHierarchyForUnsolvedSymbol
+from indexer_common import getNameHierarchyFromDottedName
+from indexer_common import getAstDumpWriter
+from indexer_log import logger
+from module_locator import getImportPathOfNameNode
+from module_locator import getModuleLocator
+
+
+def indexSourceCode(sourceCode, workingDirectory, astVisitorClient, isVerbose, sysPath = None, parseCache = None, projectSymbolTable = None):
 	sourceFilePath = _virtualFilePath
 
-	moduleNode = parso.parse(sourceCode)
+	moduleNode = parseSourceCode(sourceCode, sourceFilePath, parseCache)
 
 	if (isVerbose):
-		astVisitor = VerboseAstVisitor(astVisitorClient, sourceFilePath, sourceCode, sysPath)
+		astVisitor = VerboseAstVisitor(astVisitorClient, sourceFilePath, sourceCode, sysPath, projectSymbolTable)
 	else:
-		astVisitor = AstVisitor(astVisitorClient, sourceFilePath, sourceCode, sysPath)
+		astVisitor = AstVisitor(astVisitorClient, sourceFilePath, sourceCode, sysPath, projectSymbolTable)
 
 	astVisitor.traverseNode(moduleNode)
 
 
-def indexSourceFile(sourceFilePath, environmentDirectoryPath, workingDirectory, astVisitorClient, isVerbose):
+def indexSourceFile(sourceFilePath, environmentDirectoryPath, workingDirectory, astVisitorClient, isVerbose, parseCache = None, projectSymbolTable = None, progressCallback = None, sourceCode = None):
 
 	if isVerbose:
-		print('INFO: Indexing source file "' + sourceFilePath + '".')
+		logger.info('Indexing source file "%s".', sourceFilePath)
 
-	sourceCode = ''
-	with open(sourceFilePath, 'r', encoding='utf-8') as input:
-		sourceCode=input.read()
+	if sourceCode is None:
+		with codecs.open(sourceFilePath, 'r', encoding='utf-8') as input:
+			sourceCode=input.read()
 
-	moduleNode = parso.parse(sourceCode)
+	moduleNode = parseSourceCode(sourceCode, sourceFilePath, parseCache)
 	if (isVerbose):
-		astVisitor = VerboseAstVisitor(astVisitorClient, sourceFilePath)
+		astVisitor = VerboseAstVisitor(astVisitorClient, sourceFilePath, None, None, projectSymbolTable)
 	else:
-		astVisitor = AstVisitor(astVisitorClient, sourceFilePath)
+		astVisitor = AstVisitor(astVisitorClient, sourceFilePath, None, None, projectSymbolTable)
 
+	astVisitor.progressCallback = progressCallback
 	astVisitor.traverseNode(moduleNode)
 
+
+def parseSourceCode(sourceCode, sourceFilePath, parseCache = None):
+	grammar = parso.load_grammar()
+
+	if parseCache is None:
+		return grammar.parse(sourceCode)
+	return parseCache.getModuleNode(sourceCode, sourceFilePath, grammar, lambda: grammar.parse(sourceCode))
+
+
 class ContextType(Enum):
 	FILE = 1
 	MODULE = 2
@@ -75,15 +72,51 @@ class ContextType(Enum):
 
 class ContextInfo:
 
-	def __init__(self, id, contextType, name, node):
+	def __init__(self, id, contextType, name, node, nameHierarchy = None):
 		self.id = id
 		self.name = name
 		self.node = node
+		self.nameHierarchy = nameHierarchy
 		self.selfParamName = None
-		self.localSymbolNames = []
 		self.contextType = contextType
 
 
+class ScopeType(Enum):
+	MODULE = 1
+	CLASS = 2
+	FUNCTION = 3
+	COMPREHENSION = 4
+	LAMBDA = 5
+
+
+class ScopeInfo:
+
+	def __init__(self, scopeType, node, nameHierarchy, localSymbolPrefix):
+		self.scopeType = scopeType
+		self.node = node
+		self.nameHierarchy = nameHierarchy # parent of the symbols defined in this scope, None if they cannot be named
+		self.localSymbolPrefix = localSymbolPrefix
+		self.symbolNames = set() # names of classes, functions and module or class level variables defined in this scope
+		self.localSymbolNames = set() # names of local variables defined in this scope
+		self.importedNames = {} # maps names bound by import statements to the import level and the imported path
+		self.globalNames = set()
+		self.nonlocalNames = set()
+
+
+	def addBoundName(self, name):
+		if self.scopeType in [ScopeType.MODULE, ScopeType.CLASS]:
+			self.symbolNames.add(name)
+		else:
+			self.localSymbolNames.add(name)
+
+
+	def removeDeclaredNames(self):
+		# names declared "global" or "nonlocal" are bound in some enclosing scope, even if they are assigned in this one
+		for name in self.globalNames | self.nonlocalNames:
+			self.symbolNames.discard(name)
+			self.localSymbolNames.discard(name)
+
+
 class ReferenceKindInfo:
 
 	def __init__(self, kind, node):
@@ -92,9 +125,10 @@ class ReferenceKindInfo:
 
 class AstVisitor:
 
-	def __init__(self, client, sourceFilePath, sourceFileContent = None, sysPath = None):
+	def __init__(self, client, sourceFilePath, sourceFileContent = None, sysPath = None, projectSymbolTable = None):
 
 		self.client = client
+		self.projectSymbolTable = projectSymbolTable
 
 		self.sourceFilePath = sourceFilePath
 		if sourceFilePath != _virtualFilePath:
@@ -103,10 +137,7 @@ class AstVisitor:
 		self.sourceFileName = os.path.split(self.sourceFilePath)[-1]
 		self.sourceFileContent = sourceFileContent
 
-		packageRootPath = os.path.dirname(self.sourceFilePath)
-		while os.path.exists(os.path.join(packageRootPath, '__init__.py')):
-			packageRootPath =  os.path.dirname(packageRootPath)
-		self.sysPath = [packageRootPath]
+		self.sysPath = [getPackageRootPath(self.sourceFilePath)]
 
 		if sysPath is not None:
 			self.sysPath.extend(sysPath)
@@ -116,21 +147,28 @@ class AstVisitor:
 #			self.sysPath.extend(baseSysPath)
 		self.sysPath = list(filter(None, self.sysPath))
 
+		moduleNameHierarchy = self.getNameHierarchyFromModuleFilePath(self.sourceFilePath)
+		self.moduleName = moduleNameHierarchy.getDisplayString() if moduleNameHierarchy is not None else None
+		self.isPackage = self.sourceFileName == '__init__.py'
+		self.moduleLocator = getModuleLocator(self.sysPath)
+
 		self.contextStack = []
 		self.referenceKindStack = []
+		self.scopeStack = []
+		self.currentImportNode = None
+		self.progressCallback = None # called with the name and the last line of every top-level definition that has been indexed
 
 		fileId = self.client.recordFile(self.sourceFilePath)
 		if fileId == 0:
-			print('ERROR: ' + srctrl.getLastError())
+			logger.error(srctrl.getLastError())
 		self.client.recordFileLanguage(fileId, 'python')
 		self.contextStack.append(ContextInfo(fileId, ContextType.FILE, self.sourceFilePath, None))
 
-		moduleNameHierarchy = self.getNameHierarchyFromModuleFilePath(self.sourceFilePath)
 		if moduleNameHierarchy is not None:
 			moduleId = self.client.recordSymbol(moduleNameHierarchy)
 			self.client.recordSymbolDefinitionKind(moduleId, srctrl.DEFINITION_EXPLICIT)
 			self.client.recordSymbolKind(moduleId, srctrl.SYMBOL_MODULE)
-			self.contextStack.append(ContextInfo(moduleId, ContextType.MODULE, moduleNameHierarchy.getDisplayString(), None))
+			self.contextStack.append(ContextInfo(moduleId, ContextType.MODULE, moduleNameHierarchy.getDisplayString(), None, moduleNameHierarchy))
 
 
 	def traverseNode(self, node):
@@ -152,6 +190,13 @@ class AstVisitor:
 		elif node.type == 'import_as_name':
 			self.traverseDottedAsNameOrImportAsName(node)
 		else:
+			if node.type == 'file_input':
+				self.beginVisitFileInput(node)
+			elif node.type == 'lambdef':
+				self.beginVisitLambdef(node)
+			elif isComprehensionNode(node):
+				self.beginVisitComprehension(node)
+
 			if node.type == 'name':
 				self.beginVisitName(node)
 			elif node.type == 'string':
@@ -174,6 +219,9 @@ class AstVisitor:
 			elif node.type == 'import_name':
 				self.endVisitImportName(node)
 
+			if node.type in ['file_input', 'lambdef'] or isComprehensionNode(node):
+				self.endVisitScope(node)
+
 #----------------
 
 	def traverseClassdef(self, node):
@@ -187,7 +235,11 @@ class AstVisitor:
 			self.beginVisitClassdefSuperArglist(superArglist)
 			self.traverseNode(superArglist)
 			self.endVisitClassdefSuperArglist(superArglist)
+
+		# the base classes are looked up in the enclosing scope, so the scope of the class only starts with its suite
+		self.beginVisitClassdefSuite(node)
 		self.traverseNode(node.get_suite())
+		self.endVisitScope(node)
 
 		self.endVisitClassdef(node)
 
@@ -200,7 +252,11 @@ class AstVisitor:
 
 		for n in node.get_params():
 			self.traverseNode(n)
+
+		# default values of parameters are looked up in the enclosing scope, so the scope of the function only starts with its suite
+		self.beginVisitFuncdefSuite(node)
 		self.traverseNode(node.get_suite())
+		self.endVisitScope(node)
 
 		self.endVisitFuncdef(node)
 
@@ -227,15 +283,23 @@ class AstVisitor:
 				childTraverseStartIndex = i + 1
 				break
 
+		isComprehension = isComprehensionNode(node)
+		if isComprehension: # this would be the case for "foo(x for x in bar)"
+			self.beginVisitComprehension(node)
+
 		for i in range(childTraverseStartIndex, len(node.children)):
 			self.traverseNode(node.children[i])
 
+		if isComprehension:
+			self.endVisitScope(node)
+
 
 	def traverseImportFrom(self, node):
 		if node is None:
 			return
 
 		referenceKindAdded = False
+		self.currentImportNode = node
 
 		for c in node.children:
 			self.traverseNode(c)
@@ -245,6 +309,7 @@ class AstVisitor:
 
 		if referenceKindAdded:
 			self.referenceKindStack.pop()
+		self.currentImportNode = None
 
 
 	def traverseDottedAsNameOrImportAsName(self, node):
@@ -267,10 +332,54 @@ class AstVisitor:
 
 #----------------
 
+	def beginVisitFileInput(self, node):
+		nameHierarchy = self.getNameHierarchyFromModuleFilePath(self.sourceFilePath)
+		scopeInfo = ScopeInfo(ScopeType.MODULE, node, nameHierarchy, self.contextStack[-1].name)
+		collectBoundNames(scopeInfo, node)
+		scopeInfo.removeDeclaredNames()
+		self.scopeStack.append(scopeInfo)
+
+
+	def beginVisitClassdefSuite(self, node):
+		scopeInfo = ScopeInfo(ScopeType.CLASS, node, self.contextStack[-1].nameHierarchy, self.contextStack[-1].name)
+		collectBoundNames(scopeInfo, node.get_suite())
+		scopeInfo.removeDeclaredNames()
+		self.scopeStack.append(scopeInfo)
+
+
+	def beginVisitFuncdefSuite(self, node):
+		scopeInfo = ScopeInfo(ScopeType.FUNCTION, node, self.contextStack[-1].nameHierarchy, self.contextStack[-1].name)
+		for param in node.get_params():
+			scopeInfo.addBoundName(param.name.value)
+		collectBoundNames(scopeInfo, node.get_suite())
+		scopeInfo.removeDeclaredNames()
+		self.scopeStack.append(scopeInfo)
+
+
+	def beginVisitLambdef(self, node):
+		scopeInfo = ScopeInfo(ScopeType.LAMBDA, node, None, self.contextStack[-1].name)
+		collectBoundNames(scopeInfo, node)
+		self.scopeStack.append(scopeInfo)
+
+
+	def beginVisitComprehension(self, node):
+		scopeInfo = ScopeInfo(ScopeType.COMPREHENSION, node, None, self.contextStack[-1].name)
+		collectBoundNames(scopeInfo, node)
+		self.scopeStack.append(scopeInfo)
+
+
+	def endVisitScope(self, node):
+		if len(self.scopeStack) > 0:
+			scopeNode = self.scopeStack[-1].node
+			if node == scopeNode:
+				self.scopeStack.pop()
+
+
 	def beginVisitClassdef(self, node):
 		nameNode = node.name
 
-		symbolNameHierarchy = self.getNameHierarchyOfNode(nameNode)
+		nameHierarchy = self.getNameHierarchyOfNode(nameNode)
+		symbolNameHierarchy = nameHierarchy
 		if symbolNameHierarchy is None:
 			symbolNameHierarchy = getNameHierarchyForUnsolvedSymbol()
 
@@ -279,14 +388,14 @@ class AstVisitor:
 		self.client.recordSymbolKind(symbolId, srctrl.SYMBOL_CLASS)
 		self.client.recordSymbolLocation(symbolId, getSourceRangeOfNode(nameNode))
 		self.client.recordSymbolScopeLocation(symbolId, getSourceRangeOfNode(node))
-		self.contextStack.append(ContextInfo(symbolId, ContextType.CLASS, symbolNameHierarchy.getDisplayString(), node))
+		self.contextStack.append(ContextInfo(symbolId, ContextType.CLASS, symbolNameHierarchy.getDisplayString(), node, nameHierarchy))
 
 
 	def endVisitClassdef(self, node):
 		if len(self.contextStack) > 0:
 			contextNode = self.contextStack[-1].node
 			if node == contextNode:
-				self.contextStack.pop()
+				self.reportProgress(self.contextStack.pop())
 
 
 	def beginVisitClassdefSuperArglist(self, node):
@@ -303,12 +412,12 @@ class AstVisitor:
 	def beginVisitFuncdef(self, node):
 		nameNode = node.name
 
-		symbolNameHierarchy = self.getNameHierarchyOfNode(nameNode)
+		nameHierarchy = self.getNameHierarchyOfNode(nameNode)
+		symbolNameHierarchy = nameHierarchy
 		if symbolNameHierarchy is None:
 			symbolNameHierarchy = getNameHierarchyForUnsolvedSymbol()
 
 		selfParamName = None
-		localSymbolNames = []
 
 		contextType = ContextType.FUNCTION
 		symbolKind = srctrl.SYMBOL_FUNCTION
@@ -319,16 +428,14 @@ class AstVisitor:
 		for param in node.get_params():
 			if contextType == ContextType.METHOD and selfParamName is None:
 				selfParamName = param.name.value
-			localSymbolNames.append(param.name.value)
 
 		symbolId = self.client.recordSymbol(symbolNameHierarchy)
 		self.client.recordSymbolDefinitionKind(symbolId, srctrl.DEFINITION_EXPLICIT)
 		self.client.recordSymbolKind(symbolId, symbolKind)
 		self.client.recordSymbolLocation(symbolId, getSourceRangeOfNode(nameNode))
 		self.client.recordSymbolScopeLocation(symbolId, getSourceRangeOfNode(node))
-		contextInfo = ContextInfo(symbolId, contextType, symbolNameHierarchy.getDisplayString(), node)
+		contextInfo = ContextInfo(symbolId, contextType, symbolNameHierarchy.getDisplayString(), node, nameHierarchy)
 		contextInfo.selfParamName = selfParamName
-		contextInfo.localSymbolNames.extend(localSymbolNames)
 		self.contextStack.append(contextInfo)
 
 
@@ -336,7 +443,18 @@ class AstVisitor:
 		if len(self.contextStack) > 0:
 			contextNode = self.contextStack[-1].node
 			if node == contextNode:
-				self.contextStack.pop()
+				self.reportProgress(self.contextStack.pop())
+
+
+	def reportProgress(self, contextInfo):
+		if self.progressCallback is not None and self.contextStack[-1].contextType in [ContextType.FILE, ContextType.MODULE]:
+			self.progressCallback(contextInfo.name, self.getLastLineOfNode(contextInfo.node))
+
+
+	def getLastLineOfNode(self, node):
+		# the node of a definition ends after the line break of its last statement
+		line, column = node.end_pos
+		return line - 1 if column == 0 else line
 
 
 	def beginVisitParam(self, node):
@@ -359,9 +477,18 @@ class AstVisitor:
 		if node.value in ['True', 'False', 'None']: # these are not parsed as "keywords" in Python 2
 			return
 
+		if self.currentImportNode is not None and self.recordReferenceToImportedName(node, self.currentImportNode):
+			return
+
 		nextLeafNode = getNextLeaf(node)
 
 		if nextLeafNode is not None and nextLeafNode.type == "operator" and nextLeafNode.value == ".":
+			if self.currentImportNode is None:
+				if isAttributeNameNode(node):
+					if self.recordReferenceToImportedAttribute(node, srctrl.REFERENCE_USAGE):
+						return
+				elif self.recordReferenceToBoundName(node, srctrl.REFERENCE_USAGE):
+					return
 			symbolNameHierarchy = getNameHierarchyForUnsolvedSymbol()
 			symbolId = self.client.recordSymbol(symbolNameHierarchy)
 			self.client.recordQualifierLocation(symbolId, getSourceRangeOfNode(node))
@@ -369,6 +496,8 @@ class AstVisitor:
 
 		if len(self.referenceKindStack) > 0 and self.referenceKindStack[-1] is not None:
 			if self.referenceKindStack[-1].kind == srctrl.REFERENCE_INHERITANCE:
+				if not isAttributeNameNode(node) and self.recordReferenceToBoundName(node, srctrl.REFERENCE_INHERITANCE):
+					return
 				self.client.recordReferenceToUnsolvedSymhol(self.contextStack[-1].id, srctrl.REFERENCE_INHERITANCE, getSourceRangeOfNode(node))
 				return
 			if self.referenceKindStack[-1].kind == srctrl.REFERENCE_IMPORT:
@@ -380,6 +509,11 @@ class AstVisitor:
 			referenceKind = srctrl.REFERENCE_CALL
 
 		if node.is_definition():
+			if self.scopeStack and self.scopeStack[-1].scopeType in [ScopeType.COMPREHENSION, ScopeType.LAMBDA]:
+				# definition is local to the comprehension or lambda, even if it is located at module or class level
+				if self.recordReferenceToBoundName(node, referenceKind):
+					return
+
 			namedDefinitionParentNode = getParentWithTypeInList(node, ['classdef', 'funcdef'])
 			if namedDefinitionParentNode is not None:
 				if namedDefinitionParentNode.type in ['classdef']:
@@ -415,9 +549,11 @@ class AstVisitor:
 							# despite "node.is_definition()" says so, this is just a re-definition of an other class' member
 							self.client.recordReferenceToUnsolvedSymhol(self.contextStack[-1].id, referenceKind, getSourceRangeOfNode(node))
 							return
+					# definition is a local variable or a variable of an enclosing scope declared "global" or "nonlocal"
+					if self.recordReferenceToBoundName(node, referenceKind):
+						return
 					localSymbolId = self.client.recordLocalSymbol(self.getLocalSymbolName(node))
 					self.client.recordLocalSymbolLocation(localSymbolId, getSourceRangeOfNode(node))
-					self.contextStack[-1].localSymbolNames.append(node.value)
 					return
 			else:
 				symbolNameHierarchy = self.getNameHierarchyOfNode(node)
@@ -428,15 +564,11 @@ class AstVisitor:
 					self.client.recordSymbolLocation(symbolId, getSourceRangeOfNode(node))
 					return
 		else: # if not node.is_definition():
-			recordLocalSymbolUsage = True
-
-			if node.parent is not None and node.parent.type == 'trailer' and node.get_previous_sibling() is not None and node.get_previous_sibling().value == '.':
-				recordLocalSymbolUsage = False
-
-			if recordLocalSymbolUsage:
-				if node.value in self.contextStack[-1].localSymbolNames:
-					localSymbolId = self.client.recordLocalSymbol(self.getLocalSymbolName(node))
-					self.client.recordLocalSymbolLocation(localSymbolId, getSourceRangeOfNode(node))
+			if self.currentImportNode is None:
+				if isAttributeNameNode(node):
+					if self.recordReferenceToImportedAttribute(node, referenceKind):
+						return
+				elif self.recordReferenceToBoundName(node, referenceKind):
 					return
 
 		# fallback if not returned before
@@ -476,9 +608,11 @@ class AstVisitor:
 
 	def beginVisitImportName(self, node):
 		self.referenceKindStack.append(ReferenceKindInfo(srctrl.REFERENCE_IMPORT, node))
+		self.currentImportNode = node
 
 
 	def endVisitImportName(self, node):
+		self.currentImportNode = None
 		if len(self.referenceKindStack) > 0:
 			referenceKindNode = self.referenceKindStack[-1].node
 			if node == referenceKindNode:
@@ -487,50 +621,113 @@ class AstVisitor:
 
 #----------------
 
-	def getLocalSymbolName(self, nameNode):
-		return str(self.contextStack[-1].name) + '<' + nameNode.value + '>'
+	def recordReferenceToBoundName(self, node, referenceKind):
+		scopeInfo = self.getScopeOfName(node.value)
+		if scopeInfo is None:
+			return False
 
+		if node.value in scopeInfo.importedNames:
+			if self.recordReferenceToImportTarget(node, referenceKind, scopeInfo.importedNames[node.value], []):
+				return True
 
-	def getNameHierarchyFromModuleFilePath(self, filePath):
-		if filePath is None:
-			return None
+		if node.value in scopeInfo.localSymbolNames:
+			localSymbolId = self.client.recordLocalSymbol(scopeInfo.localSymbolPrefix + '<' + node.value + '>')
+			self.client.recordLocalSymbolLocation(localSymbolId, getSourceRangeOfNode(node))
+			return True
 
-		if filePath == _virtualFilePath:
-			return NameHierarchy(NameElement(os.path.splitext(_virtualFilePath)[0]), '.')
+		if node.value not in scopeInfo.symbolNames or scopeInfo.nameHierarchy is None:
+			return False
 
-		filePath = os.path.abspath(filePath)
-		# First remove the suffix.
-		for suffix in ['.py']:
-			if filePath.endswith(suffix):
-				filePath = filePath[:-len(suffix)]
-				break
+		nameHierarchy = scopeInfo.nameHierarchy.copy()
+		nameHierarchy.nameElements.append(NameElement(node.value))
+		self.recordReferenceToSymbol(node, referenceKind, nameHierarchy)
+		return True
 
-		for p in self.sysPath:
-			if filePath.startswith(p):
-				rest = filePath[len(p):]
-				if rest.startswith(os.path.sep):
-					# Remove a slash in cases it's still there.
-					rest = rest[1:]
-				if rest:
-					split = rest.split(os.path.sep)
-					for string in split:
-						if not string:
-							return None
-
-					if split[-1] == '__init__':
-						split = split[:-1]
-
-					nameHierarchy = None
-					for namePart in split:
-						if nameHierarchy is None:
-							nameHierarchy = NameHierarchy(NameElement(namePart), '.')
-						else:
-							nameHierarchy.nameElements.append(NameElement(namePart))
-					return nameHierarchy
 
+	def recordReferenceToImportedName(self, node, importNode):
+		previousNode = node.get_previous_sibling()
+		if previousNode is not None and previousNode.type == 'keyword' and previousNode.value == 'as':
+			return False # the alias is defined by the import statement
+
+		level, names, isImportedName = getImportPathOfNameNode(importNode, node)
+		referenceKind = srctrl.REFERENCE_IMPORT
+		if not isImportedName:
+			# this would be the case for "from foo.bar import baz"
+			#                                  ^   ^
+			referenceKind = srctrl.REFERENCE_USAGE
+		return self.recordReferenceToImportTarget(node, referenceKind, (level, names), [])
+
+
+	def recordReferenceToImportedAttribute(self, node, referenceKind):
+		# resolves names like "bar" in "foo.bar" if "foo" has been bound by an import statement
+		names = getAttributeNames(node)
+		if names is None:
+			return False
+
+		scopeInfo = self.getScopeOfName(names[0])
+		if scopeInfo is None or names[0] not in scopeInfo.importedNames:
+			return False
+		return self.recordReferenceToImportTarget(node, referenceKind, scopeInfo.importedNames[names[0]], names[1:])
+
+
+	def recordReferenceToImportTarget(self, node, referenceKind, importedName, attributeNames):
+		# resolves the target with the project symbol table if available and falls back to looking up modules on the sys path
+		level, names = importedName
+		importPath = getAbsoluteImportPath(self.moduleName, self.isPackage, level, names + attributeNames)
+		if importPath is None:
+			return False
+
+		resolvedSymbol = None
+		if self.projectSymbolTable is not None:
+			resolvedSymbol = self.projectSymbolTable.resolveName(importPath)
+		if resolvedSymbol is None and self.moduleLocator.locateModule(importPath) is not None:
+			resolvedSymbol = (getNameHierarchyFromDottedName(importPath), srctrl.SYMBOL_MODULE)
+		if resolvedSymbol is None:
+			return False
+
+		nameHierarchy, symbolKind = resolvedSymbol
+		symbolId = self.recordReferenceToSymbol(node, referenceKind, nameHierarchy)
+		# the symbol may be defined in a file that is not indexed, so its kind is recorded here as well
+		self.client.recordSymbolKind(symbolId, symbolKind)
+		return True
+
+
+	def recordReferenceToSymbol(self, node, referenceKind, nameHierarchy):
+		sourceRange = getSourceRangeOfNode(node)
+		symbolId = self.client.recordSymbol(nameHierarchy)
+		if isQualifierNode(node):
+			self.client.recordQualifierLocation(symbolId, sourceRange)
+		else:
+			referenceId = self.client.recordReference(self.contextStack[-1].id, symbolId, referenceKind)
+			self.client.recordReferenceLocation(referenceId, sourceRange)
+		return symbolId
+
+
+	def getScopeOfName(self, name):
+		# Walks the scope chain from the innermost scope outwards. The bodies of classes are skipped unless the name
+		# is used within the class body itself, because they are not visible to the scopes nested inside.
+		for i in range(len(self.scopeStack) - 1, -1, -1):
+			scopeInfo = self.scopeStack[i]
+			if scopeInfo.scopeType == ScopeType.CLASS and i != len(self.scopeStack) - 1:
+				continue
+			if name in scopeInfo.globalNames:
+				moduleScopeInfo = self.scopeStack[0]
+				if name in moduleScopeInfo.symbolNames:
+					return moduleScopeInfo
+				return None
+			if name in scopeInfo.symbolNames or name in scopeInfo.localSymbolNames or name in scopeInfo.importedNames:
+				return scopeInfo
 		return None
 
 
+	def getLocalSymbolName(self, nameNode):
+		return str(self.contextStack[-1].name) + '<' + nameNode.value + '>'
+
+
+	def getNameHierarchyFromModuleFilePath(self, filePath):
+		return getNameHierarchyFromModuleFilePath(filePath, self.sysPath)
+
+
 	def getNameHierarchyOfNode(self, node):
 		if node is None:
 			return None
@@ -572,38 +769,30 @@ class AstVisitor:
 
 class VerboseAstVisitor(AstVisitor):
 
-	def __init__(self, client, sourceFilePath, sourceFileContent = None, sysPath = None):
-		AstVisitor.__init__(self, client, sourceFilePath, sourceFileContent, sysPath)
+	def __init__(self, client, sourceFilePath, sourceFileContent = None, sysPath = None, projectSymbolTable = None):
+		AstVisitor.__init__(self, client, sourceFilePath, sourceFileContent, sysPath, projectSymbolTable)
 		self.indentationLevel = 0
-		self.indentationToken = '| '
+		self.astDumpWriter = getAstDumpWriter()
 
 
 	def traverseNode(self, node):
 		if node is None:
 			return
 
-		currentString = ''
-		for i in range(0, self.indentationLevel):
-			currentString += self.indentationToken
-
-		currentString += node.type
+		currentString = node.type
 
 		if hasattr(node, 'value'):
 			currentString += ' (' + repr(node.value) + ')'
 
 		currentString += ' ' + getSourceRangeOfNode(node).toString()
 
-		print('AST: ' + currentString)
+		self.astDumpWriter.writeNode(self.indentationLevel, currentString)
 
 		self.indentationLevel += 1
 		AstVisitor.traverseNode(self, node)
 		self.indentationLevel -= 1
 
 
-def getNameHierarchyForUnsolvedSymbol():
-	return NameHierarchy(NameElement(NameHierarchy.unsolvedSymbolName), '')
-
-
 def isQualifierNode(node):
 	nextNode = getNext(node)
 	if nextNode is not None and nextNode.type == 'trailer':
@@ -613,6 +802,139 @@ def isQualifierNode(node):
 	return False
 
 
+def getPackageRootPath(sourceFilePath):
+	packageRootPath = os.path.dirname(sourceFilePath)
+	while os.path.exists(os.path.join(packageRootPath, '__init__.py')):
+		packageRootPath =  os.path.dirname(packageRootPath)
+	return packageRootPath
+
+
+def getNameHierarchyFromModuleFilePath(filePath, sysPath):
+	if filePath is None:
+		return None
+
+	if filePath == _virtualFilePath:
+		return NameHierarchy(NameElement(os.path.splitext(_virtualFilePath)[0]), '.')
+
+	filePath = os.path.abspath(filePath)
+	# First remove the suffix.
+	for suffix in ['.py']:
+		if filePath.endswith(suffix):
+			filePath = filePath[:-len(suffix)]
+			break
+
+	for p in sysPath:
+		if filePath.startswith(p):
+			rest = filePath[len(p):]
+			if rest.startswith(os.path.sep):
+				# Remove a slash in cases it's still there.
+				rest = rest[1:]
+			if rest:
+				split = rest.split(os.path.sep)
+				for string in split:
+					if not string:
+						return None
+
+				if split[-1] == '__init__':
+					split = split[:-1]
+
+				nameHierarchy = None
+				for namePart in split:
+					if nameHierarchy is None:
+						nameHierarchy = NameHierarchy(NameElement(namePart), '.')
+					else:
+						nameHierarchy.nameElements.append(NameElement(namePart))
+				return nameHierarchy
+
+	return None
+
+
+def getAbsoluteImportPath(moduleName, isPackage, level, names):
+	# returns the dotted name of the target of an import statement, resolving relative imports against the importing module
+	if level == 0:
+		return '.'.join(names)
+	if moduleName is None:
+		return None
+
+	packageNames = moduleName.split('.')
+	if not isPackage:
+		packageNames = packageNames[:-1]
+	if level - 1 > len(packageNames):
+		return None
+	packageNames = packageNames[:len(packageNames) - (level - 1)]
+
+	if not packageNames and not names:
+		return None
+	return '.'.join(packageNames + names)
+
+
+def isComprehensionNode(node):
+	if node.type not in ['testlist_comp', 'dictorsetmaker', 'argument']:
+		return False
+	for c in node.children:
+		if c.type in ['comp_for', 'sync_comp_for']:
+			return True
+	return False
+
+
+def isAttributeNameNode(node):
+	previousNode = node.get_previous_sibling()
+	return node.parent is not None and node.parent.type == 'trailer' and previousNode is not None and previousNode.value == '.'
+
+
+def collectBoundNames(scopeInfo, node):
+	# collects the names bound within the scope of the node without descending into the scopes nested inside
+	for c in node.children:
+		if c.type in ['classdef', 'funcdef']:
+			scopeInfo.symbolNames.add(c.name.value)
+		elif c.type == 'lambdef' or isComprehensionNode(c):
+			continue
+		elif c.type == 'global_stmt':
+			scopeInfo.globalNames.update(n.value for n in c.get_global_names())
+		elif c.type == 'nonlocal_stmt':
+			scopeInfo.nonlocalNames.update(n.value for n in getDirectChildrenWithType(c, 'name'))
+		elif c.type in ['import_name', 'import_from']:
+			if not c.is_star_import():
+				for n in c.get_defined_names():
+					scopeInfo.importedNames[n.value] = (c.level, [p.value for p in c.get_path_for_name(n)])
+			collectBoundNames(scopeInfo, c)
+		elif c.type == 'name':
+			if isBoundNameNode(c):
+				scopeInfo.addBoundName(c.value)
+		elif hasattr(c, 'children'):
+			collectBoundNames(scopeInfo, c)
+
+
+def getAttributeNames(node):
+	# returns the names of the attribute access containing the node up to the node itself, e.g. "foo.bar" for "bar" in "foo.bar.baz()"
+	# or None if the access contains anything else than names, like calls or subscripts
+	trailerNode = node.parent
+	if trailerNode is None or trailerNode.parent is None or trailerNode.parent.type not in ['power', 'atom_expr']:
+		return None
+
+	names = []
+	for c in trailerNode.parent.children:
+		if c.type == 'name' and not names:
+			names.append(c.value)
+		elif c.type == 'trailer' and c.children[0].type == 'operator' and c.children[0].value == '.' and names:
+			names.append(c.children[1].value)
+		else:
+			return None
+		if c is trailerNode:
+			return names
+	return None
+
+
+def isBoundNameNode(node):
+	if not node.is_definition() or isAttributeNameNode(node):
+		return False
+	if getParentWithTypeInList(node, ['import_name', 'import_from']) is not None:
+		# only aliases are recorded as symbols, all other imported names remain references to the imported module
+		previousNode = node.get_previous_sibling()
+		return previousNode is not None and previousNode.type == 'keyword' and previousNode.value == 'as'
+	return True
+
+
 def getSourceRangeOfNode(node):
 	startLine, startColumn = node.start_pos
 	endLine, endColumn = node.end_pos
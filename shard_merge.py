@@ -0,0 +1,176 @@
+import shutil
+import sqlite3
+
+from indexer_log import logger
+
+
+# Merges Sourcetrail databases that have been written by separate indexer processes. The first shard is copied to become the
+# merged database, so it has exactly the schema SourcetrailDB creates, and all other shards are attached and copied over one
+# after the other. All ids of a shard are local to that shard: nodes are unified by their serialized name hierarchy, edges
+# by their kind and their remapped end points, local symbols by their name and source locations by their position. Elements
+# and locations that are new to the merged database get the largest id of the merged database plus their id in the shard,
+# so the remapping is done by SQLite in temporary tables and merging many large shards does not need much memory.
+
+_mergeIndexes = [
+	('merge_node_serialized_name', 'node(serialized_name)'),
+	('merge_edge_end_points', 'edge(source_node_id, target_node_id, type)'),
+	('merge_local_symbol_name', 'local_symbol(name)'),
+	('merge_source_location_position', 'source_location(file_node_id, start_line, start_column, end_line, end_column, type)'),
+]
+
+
+def mergeShardDatabases(databaseFilePath, shardFilePaths, isVerbose = False):
+	# returns the number of merged shards
+	if not shardFilePaths:
+		return 0
+
+	shutil.copyfile(shardFilePaths[0], databaseFilePath)
+	connection = sqlite3.connect(databaseFilePath, isolation_level=None)
+	try:
+		storageVersion = getStorageVersion(connection, 'main')
+		for indexName, indexDefinition in _mergeIndexes:
+			connection.execute('CREATE INDEX IF NOT EXISTS ' + indexName + ' ON ' + indexDefinition)
+
+		mergedShardCount = 1
+		for shardFilePath in shardFilePaths[1:]:
+			connection.execute('ATTACH DATABASE ? AS shard', (shardFilePath,))
+			try:
+				if getStorageVersion(connection, 'shard') != storageVersion:
+					logger.error('Shard "%s" has been written by an incompatible version of SourcetrailDB.', shardFilePath)
+					continue
+				connection.execute('BEGIN')
+				try:
+					mergeShard(connection)
+				except Exception:
+					connection.execute('ROLLBACK')
+					raise
+				connection.execute('COMMIT')
+				mergedShardCount += 1
+			finally:
+				connection.execute('DETACH DATABASE shard')
+
+			if isVerbose:
+				logger.info('Merged shard "%s".', shardFilePath)
+
+		for indexName, indexDefinition in _mergeIndexes:
+			connection.execute('DROP INDEX IF EXISTS ' + indexName)
+	finally:
+		connection.close()
+	return mergedShardCount
+
+
+def mergeShard(connection):
+	elementOffset = connection.execute('SELECT COALESCE(MAX(id), 0) FROM main.element').fetchone()[0]
+	locationOffset = connection.execute('SELECT COALESCE(MAX(id), 0) FROM main.source_location').fetchone()[0]
+
+	connection.execute('CREATE TEMP TABLE element_map(shard_id INTEGER PRIMARY KEY, id INTEGER NOT NULL)')
+	connection.execute('CREATE TEMP TABLE location_map(shard_id INTEGER PRIMARY KEY, id INTEGER NOT NULL)')
+
+	# nodes, e.g. symbols and files
+	connection.execute(
+		'INSERT INTO element_map SELECT s.id, n.id FROM shard.node s JOIN main.node n ON n.serialized_name = s.serialized_name'
+	)
+	addNewElements(connection, 'node', elementOffset)
+	connection.execute( # a kind that has been recorded by one of the shards replaces the kind of symbols that are only referenced
+		'UPDATE main.node SET type = (SELECT s.type FROM shard.node s JOIN element_map m ON m.shard_id = s.id WHERE m.id = main.node.id) '
+		'WHERE id IN (SELECT m.id FROM element_map m JOIN shard.node s ON s.id = m.shard_id WHERE m.id <= ? AND s.type > main.node.type)',
+		(elementOffset,)
+	)
+	copyRows(connection, 'symbol', ['id'])
+	connection.execute(
+		'UPDATE main.symbol SET definition_kind = (SELECT s.definition_kind FROM shard.symbol s JOIN element_map m ON m.shard_id = s.id WHERE m.id = main.symbol.id) '
+		'WHERE id IN (SELECT m.id FROM element_map m JOIN shard.symbol s ON s.id = m.shard_id WHERE s.definition_kind > main.symbol.definition_kind)'
+	)
+	copyRows(connection, 'file', ['id'])
+	copyRows(connection, 'filecontent', ['id'])
+	if hasTable(connection, 'component_access'):
+		copyRows(connection, 'component_access', ['node_id'])
+
+	# local symbols
+	connection.execute(
+		'INSERT INTO element_map SELECT s.id, l.id FROM shard.local_symbol s JOIN main.local_symbol l ON l.name = s.name'
+	)
+	addNewElements(connection, 'local_symbol', elementOffset)
+
+	# edges, i.e. references
+	connection.execute(
+		'INSERT INTO element_map SELECT s.id, e.id FROM shard.edge s '
+		'JOIN element_map source ON source.shard_id = s.source_node_id JOIN element_map target ON target.shard_id = s.target_node_id '
+		'JOIN main.edge e ON e.source_node_id = source.id AND e.target_node_id = target.id AND e.type = s.type'
+	)
+	addNewElements(connection, 'edge', elementOffset, ['source_node_id', 'target_node_id'])
+
+	# errors are never unified
+	addNewElements(connection, 'error', elementOffset)
+
+	connection.execute(
+		'INSERT INTO main.element_component(element_id, type, data) SELECT m.id, s.type, s.data FROM shard.element_component s '
+		'JOIN element_map m ON m.shard_id = s.element_id WHERE NOT EXISTS '
+		'(SELECT 1 FROM main.element_component c WHERE c.element_id = m.id AND c.type = s.type AND c.data IS s.data)'
+	)
+
+	# source locations and their occurrences
+	connection.execute(
+		'INSERT INTO location_map SELECT s.id, l.id FROM shard.source_location s JOIN element_map f ON f.shard_id = s.file_node_id '
+		'JOIN main.source_location l ON l.file_node_id = f.id AND l.start_line = s.start_line AND l.start_column = s.start_column '
+		'AND l.end_line = s.end_line AND l.end_column = s.end_column AND l.type = s.type'
+	)
+	connection.execute('INSERT OR IGNORE INTO location_map SELECT id, ? + id FROM shard.source_location', (locationOffset,))
+	columnNames = getColumnNames(connection, 'source_location')
+	connection.execute(
+		'INSERT INTO main.source_location(' + ', '.join(columnNames) + ') SELECT ' +
+		', '.join(getMappedColumn(c, {'id': 'l.id', 'file_node_id': 'f.id'}) for c in columnNames) + ' FROM shard.source_location s '
+		'JOIN location_map l ON l.shard_id = s.id JOIN element_map f ON f.shard_id = s.file_node_id WHERE l.id > ?',
+		(locationOffset,)
+	)
+	connection.execute(
+		'INSERT OR IGNORE INTO main.occurrence(element_id, source_location_id) SELECT e.id, l.id FROM shard.occurrence s '
+		'JOIN element_map e ON e.shard_id = s.element_id JOIN location_map l ON l.shard_id = s.source_location_id'
+	)
+
+	connection.execute('DROP TABLE temp.element_map')
+	connection.execute('DROP TABLE temp.location_map')
+
+
+def addNewElements(connection, tableName, elementOffset, referencedIdColumnNames = None):
+	# maps all rows of the table that have not been unified with an existing element to new elements
+	connection.execute('INSERT OR IGNORE INTO element_map SELECT id, ? + id FROM shard.' + tableName, (elementOffset,))
+	connection.execute(
+		'INSERT INTO main.element(id) SELECT m.id FROM shard.' + tableName + ' s JOIN element_map m ON m.shard_id = s.id WHERE m.id > ?',
+		(elementOffset,)
+	)
+	copyRows(connection, tableName, ['id'] + (referencedIdColumnNames or []), 'WHERE m0.id > ' + str(int(elementOffset)))
+
+
+def copyRows(connection, tableName, idColumnNames, condition = ''):
+	# copies the rows of the shard table whose id columns all refer to mapped elements, keeping the rows that already exist
+	columnNames = getColumnNames(connection, tableName)
+	mappedColumns = {}
+	joins = ''
+	for i, idColumnName in enumerate(idColumnNames):
+		mappedColumns[idColumnName] = 'm' + str(i) + '.id'
+		joins += ' JOIN element_map m' + str(i) + ' ON m' + str(i) + '.shard_id = s.' + idColumnName
+	connection.execute(
+		'INSERT OR IGNORE INTO main.' + tableName + '(' + ', '.join(columnNames) + ') SELECT ' +
+		', '.join(getMappedColumn(c, mappedColumns) for c in columnNames) + ' FROM shard.' + tableName + ' s' + joins + ' ' + condition
+	)
+
+
+def getMappedColumn(columnName, mappedColumns):
+	return mappedColumns.get(columnName, 's.' + columnName)
+
+
+def getColumnNames(connection, tableName):
+	return [row[1] for row in connection.execute('PRAGMA main.table_info(' + tableName + ')')]
+
+
+def hasTable(connection, tableName):
+	return connection.execute('SELECT COUNT(*) FROM main.sqlite_master WHERE type = \'table\' AND name = ?', (tableName,)).fetchone()[0] > 0
+
+
+def getStorageVersion(connection, schemaName):
+	try:
+		row = connection.execute('SELECT value FROM ' + schemaName + '.meta WHERE key = \'storage_version\'').fetchone()
+	except sqlite3.DatabaseError:
+		return None
+	return row[0] if row is not None else None
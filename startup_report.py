@@ -0,0 +1,138 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+	import builtins
+except ImportError: # Python 2
+	import __builtin__ as builtins
+
+
+class ImportTimer:
+
+	def __init__(self):
+		self.records = []
+		self.childTimeStack = []
+		self.originalImport = None
+
+
+	def install(self):
+		self.originalImport = builtins.__import__
+		builtins.__import__ = self.timedImport
+
+
+	def uninstall(self):
+		if self.originalImport is not None:
+			builtins.__import__ = self.originalImport
+			self.originalImport = None
+
+
+	def timedImport(self, name, globals = None, locals = None, fromlist = (), level = 0):
+		if name in sys.modules and not fromlist:
+			return self.originalImport(name, globals, locals, fromlist, level)
+
+		moduleCount = len(sys.modules)
+		self.childTimeStack.append(0.0)
+		startTime = time.time()
+		try:
+			return self.originalImport(name, globals, locals, fromlist, level)
+		finally:
+			cumulativeTime = time.time() - startTime
+			childTime = self.childTimeStack.pop()
+			if self.childTimeStack:
+				self.childTimeStack[-1] += cumulativeTime
+			if len(sys.modules) != moduleCount: # only imports that actually loaded something are of interest
+				if level > 0 and globals is not None and globals.get('__package__'):
+					name = globals['__package__'] + '.' + name
+				self.records.append((name, cumulativeTime - childTime, cumulativeTime))
+
+
+	def getTotalTime(self):
+		return sum(selfTime for name, selfTime, cumulativeTime in self.records)
+
+
+def measureImportTimeInFreshInterpreter(moduleNames):
+	# returns the time it takes to import the modules and whether jedi got imported along the way
+	script = (
+		'import sys, time\n'
+		'startTime = time.time()\n'
+		'for moduleName in sys.argv[1:]:\n'
+		'	__import__(moduleName)\n'
+		'print(time.time() - startTime)\n'
+		'print("jedi" in sys.modules)\n'
+	)
+	output = subprocess.check_output(
+		[sys.executable, '-c', script] + moduleNames,
+		cwd=os.path.dirname(os.path.abspath(__file__))
+	)
+	lines = output.decode('utf-8').split()
+	return float(lines[0]), lines[1] == 'True'
+
+
+def printStartupReport(commandImportBudgets, environmentPath = None, databaseFilePath = None, moduleCount = 20):
+	importTimer = ImportTimer()
+	importTimer.install()
+	try:
+		import indexer_common
+		import parse_cache
+		import shallow_indexer
+		import indexing_session
+		import indexer
+	finally:
+		importTimer.uninstall()
+
+	import sourcetraildb as srctrl
+
+	print('Imports (slowest ' + str(moduleCount) + ' modules):')
+	print('  ' + 'module'.ljust(50) + 'self [ms]'.rjust(12) + 'cumulative [ms]'.rjust(18))
+	for name, selfTime, cumulativeTime in sorted(importTimer.records, key=lambda r: r[1], reverse=True)[:moduleCount]:
+		print('  ' + name.ljust(50) + formatMilliseconds(selfTime).rjust(12) + formatMilliseconds(cumulativeTime).rjust(18))
+	print('  ' + 'total'.ljust(50) + formatMilliseconds(importTimer.getTotalTime()).rjust(12))
+
+	if not getattr(sys, 'frozen', False): # a frozen executable cannot be used to run a fresh interpreter
+		print('Command imports (fresh interpreter):')
+		for commandName, moduleNames, requiresJedi, budget in commandImportBudgets:
+			duration, importsJedi = measureImportTimeInFreshInterpreter(moduleNames)
+			status = 'ok' if duration <= budget else 'EXCEEDS BUDGET'
+			print('  ' + commandName.ljust(50) + formatMilliseconds(duration).rjust(12) + ' ms of ' + formatMilliseconds(budget) + ' ms budget (' + status + ')')
+
+	startTime = time.time()
+	isCompatible = indexer_common.isSourcetrailDBVersionCompatible(True)
+	printDuration('SourcetrailDB version check', time.time() - startTime, 'compatible' if isCompatible else 'incompatible')
+
+	startTime = time.time()
+	try:
+		environment = indexer.getEnvironment(environmentPath)
+		printDuration('Environment discovery', time.time() - startTime, environment.path)
+	except Exception as e:
+		printDuration('Environment discovery', time.time() - startTime, 'failed: ' + str(e))
+
+	temporaryDirectoryPath = None
+	if databaseFilePath is None:
+		temporaryDirectoryPath = tempfile.mkdtemp()
+		databaseFilePath = os.path.join(temporaryDirectoryPath, 'startup_report.srctrldb')
+	try:
+		startTime = time.time()
+		isOpen = srctrl.open(databaseFilePath)
+		printDuration('Database open', time.time() - startTime, databaseFilePath if isOpen else 'failed: ' + srctrl.getLastError())
+		if isOpen:
+			startTime = time.time()
+			srctrl.close()
+			printDuration('Database close', time.time() - startTime)
+	finally:
+		if temporaryDirectoryPath is not None:
+			shutil.rmtree(temporaryDirectoryPath, ignore_errors=True)
+
+
+def printDuration(title, duration, details = None):
+	line = title.ljust(52) + formatMilliseconds(duration).rjust(12) + ' ms'
+	if details:
+		line += ' (' + details + ')'
+	print(line)
+
+
+def formatMilliseconds(seconds):
+	return '{:.1f}'.format(seconds * 1000.0)
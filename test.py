@@ -1,8 +1,12 @@
 import indexer
 import multiprocessing
 import os
+import parse_cache
+import parso
+import shutil
 import sourcetraildb as srctrl
 import sys
+import tempfile
 import unittest
 
 
@@ -700,9 +704,143 @@ class TestPythonIndexer(unittest.TestCase):
 		self.assertTrue('CALL: virtual_file -> virtual_file.Foo.__init__ at [3:7|3:9]' in client.references)
 
 
+# Test Parse Cache
+
+	def test_indexer_records_same_data_for_source_code_loaded_from_parse_cache(self):
+		sourceCode = (
+			'class Foo:\n'
+			'	def bar(self):\n'
+			'		self.x = None\n'
+		)
+		cacheDirectoryPath = tempfile.mkdtemp()
+		try:
+			parseCache = parse_cache.ParseCache(cacheDirectoryPath)
+			parsedClient = self.indexSourceCode(sourceCode, parseCache=parseCache)
+			cachedClient = self.indexSourceCode(sourceCode, parseCache=parseCache)
+		finally:
+			shutil.rmtree(cacheDirectoryPath)
+
+		self.assertEqual(parseCache.missCount, 1)
+		self.assertEqual(parseCache.hitCount, 1)
+		self.assertEqual(parsedClient.symbols, cachedClient.symbols)
+		self.assertEqual(parsedClient.localSymbols, cachedClient.localSymbols)
+		self.assertEqual(parsedClient.references, cachedClient.references)
+
+
+# Test Resolution Failures
+
+	def test_resolution_failure_statistics_trip_module_after_consecutive_failures(self):
+		statistics = indexer.ResolutionFailureStatistics(3)
+		self.assertFalse(statistics.recordFailure('foo', KeyError()))
+		self.assertFalse(statistics.recordFailure('foo', KeyError()))
+		statistics.recordSuccess('foo')
+		self.assertFalse(statistics.recordFailure('foo', AttributeError()))
+		self.assertFalse(statistics.recordFailure('foo', KeyError()))
+		self.assertFalse(statistics.isTripped('foo'))
+		self.assertTrue(statistics.recordFailure('foo', KeyError()))
+
+		self.assertTrue(statistics.isTripped('foo'))
+		self.assertFalse(statistics.isTripped('bar'))
+		self.assertEqual(statistics.failureCounts, {'foo': {'AttributeError': 1, 'KeyError': 4}})
+		self.assertEqual(statistics.trippedModuleNames, ['foo'])
+		self.assertEqual(statistics.skippedResolutionCounts, {'foo': 1})
+
+
+	def test_resolution_failure_statistics_are_reset_with_configured_limit(self):
+		indexer.setMaxConsecutiveResolutionFailureCount(1)
+		try:
+			self.assertTrue(indexer.getResolutionFailureStatistics().recordFailure('foo', KeyError()))
+			self.assertTrue(indexer.getResolutionFailureStatistics().isTripped('foo'))
+			indexer.resetResolutionFailureStatistics()
+			self.assertFalse(indexer.getResolutionFailureStatistics().isTripped('foo'))
+			self.assertEqual(indexer.getResolutionFailureStatistics().failureCounts, {})
+			self.assertEqual(indexer.getResolutionFailureStatistics().maxConsecutiveFailureCount, 1)
+		finally:
+			indexer.setMaxConsecutiveResolutionFailureCount(50)
+			indexer.resetResolutionFailureStatistics()
+
+
+	def test_resolution_failures_are_grouped_by_imported_module(self):
+		moduleNode = parso.parse(
+			'import foo.bar\n'
+			'import foo.baz as qux\n'
+			'from ..pkg import mod as m\n'
+			'def f():\n'
+			'	from os import path\n'
+		)
+		self.assertEqual(indexer.getImportedModuleNames(moduleNode), {'foo': 'foo', 'qux': 'foo.baz', 'm': '..pkg', 'path': 'os'})
+		self.assertEqual(indexer.getImportedModuleNames(moduleNode, 'app.sub'), {'foo': 'foo', 'qux': 'foo.baz', 'm': 'app.pkg', 'path': 'os'})
+		self.assertEqual(indexer.getImportedModuleNames(moduleNode, 'app')['m'], '..pkg') # beyond the top level package
+
+
+# Test Environment Registry
+
+	def test_environment_registry_reuses_environment(self):
+		registry = indexer.EnvironmentRegistry()
+		environment = registry.getEnvironment()
+		self.assertIs(registry.getEnvironment(), environment)
+		self.assertEqual(registry.restartCount, 0)
+
+
+	def test_environment_registry_restarts_subprocess_that_has_died(self):
+		registry = indexer.EnvironmentRegistry()
+		environment = registry.getEnvironment()
+		if not hasattr(environment, '_get_subprocess'):
+			self.skipTest('the environment does not use a subprocess')
+
+		process = environment._get_subprocess()._get_process()
+		process.kill()
+		process.wait()
+
+		self.assertIs(registry.getEnvironment(), environment)
+		self.assertEqual(registry.restartCount, 1)
+		self.assertIsNone(environment._get_subprocess()._get_process().poll())
+		self.assertTrue(len(environment._get_subprocess().get_sys_path()) > 0)
+
+
+	def test_environment_registry_reports_invalid_environment_path(self):
+		registry = indexer.EnvironmentRegistry()
+		with self.assertRaises(Exception):
+			registry.getEnvironment(os.path.join(tempfile.gettempdir(), 'no_such_environment'))
+		self.assertEqual(len(registry.errorMessages), 1)
+
+
+	def test_environment_registry_retries_invalid_environment_path_later(self):
+		registry = indexer.EnvironmentRegistry()
+		directoryPath = tempfile.mkdtemp()
+		try:
+			environmentPath = os.path.join(directoryPath, 'python')
+			with self.assertRaises(Exception):
+				registry.getEnvironment(environmentPath)
+
+			os.symlink(sys.executable, environmentPath)
+			with self.assertRaises(Exception): # the failure is remembered for a few seconds
+				registry.getEnvironment(environmentPath)
+
+			errorMessage, errorTime = registry.errorMessages[environmentPath]
+			registry.errorMessages[environmentPath] = (errorMessage, errorTime - 3600.0)
+			self.assertTrue(registry.getEnvironment(environmentPath) is not None)
+			self.assertEqual(registry.errorMessages, {})
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_environment_registry_creates_new_environment_if_subprocess_cannot_be_checked(self):
+		registry = indexer.EnvironmentRegistry()
+		environment = registry.getEnvironment()
+		if not hasattr(environment, '_get_subprocess'):
+			self.skipTest('the environment does not use a subprocess')
+
+		environment._subprocess = object() # e.g. a version of jedi with other private attributes
+		newEnvironment = registry.getEnvironment()
+		self.assertIsNot(newEnvironment, environment)
+		self.assertIs(registry.getEnvironment(), newEnvironment)
+		self.assertEqual(registry.restartCount, 0)
+
+
 # Utility Functions
 
-	def indexSourceCode(self, sourceCode, environmentPath = None, sysPath = None, verbose = False):
+	def indexSourceCode(self, sourceCode, environmentPath = None, sysPath = None, verbose = False, parseCache = None):
 		workingDirectory = os.getcwd()
 		astVisitorClient = TestAstVisitorClient()
 
@@ -712,7 +850,8 @@ class TestPythonIndexer(unittest.TestCase):
 			astVisitorClient,
 			verbose,
 			environmentPath,
-			sysPath
+			sysPath,
+			parseCache
 		)
 
 		astVisitorClient.updateReadableOutput()
@@ -0,0 +1,65 @@
+import content_hash_table
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+
+class TestContentHashTable(unittest.TestCase):
+
+	def test_file_is_unchanged_if_hash_version_and_mode_match_and_database_contains_file(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			databaseFilePath = self.createDatabase(os.path.join(directoryPath, 'project.srctrldb'), ['/src/a.py'])
+			contentHashTable = content_hash_table.ContentHashTable(databaseFilePath)
+			try:
+				contentHashTable.storeContentHashes([('/src/a.py', 'abc', 'shallow:parso'), ('/src/b.py', 'abc', 'shallow:parso')])
+
+				self.assertTrue(contentHashTable.isFileUnchanged('/src/a.py', 'abc', 'shallow:parso'))
+				self.assertFalse(contentHashTable.isFileUnchanged('/src/a.py', 'def', 'shallow:parso'))
+				self.assertFalse(contentHashTable.isFileUnchanged('/src/a.py', 'abc', 'outline'))
+				self.assertFalse(contentHashTable.isFileUnchanged('/src/b.py', 'abc', 'shallow:parso')) # not contained in the database
+				self.assertFalse(contentHashTable.isFileUnchanged('/src/c.py', 'abc', 'shallow:parso'))
+			finally:
+				contentHashTable.close()
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_content_hashes_are_kept_between_runs_until_cleared(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			databaseFilePath = self.createDatabase(os.path.join(directoryPath, 'project.srctrldb'), ['/src/a.py'])
+			contentHashTable = content_hash_table.ContentHashTable(databaseFilePath)
+			contentHashTable.storeContentHashes([('/src/a.py', 'abc', 'outline')])
+			contentHashTable.close()
+
+			contentHashTable = content_hash_table.ContentHashTable(databaseFilePath)
+			try:
+				self.assertTrue(contentHashTable.isFileUnchanged('/src/a.py', 'abc', 'outline'))
+				contentHashTable.clear()
+				self.assertFalse(contentHashTable.isFileUnchanged('/src/a.py', 'abc', 'outline'))
+			finally:
+				contentHashTable.close()
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+# Utility Functions
+
+	def createDatabase(self, databaseFilePath, filePaths):
+		# creates a database with the file table of SourcetrailDB that contains the given files
+		connection = sqlite3.connect(databaseFilePath)
+		connection.execute(
+			'CREATE TABLE file(id INTEGER NOT NULL, path TEXT, language TEXT, modification_time TEXT, indexed INTEGER, complete INTEGER, line_count INTEGER, PRIMARY KEY(id))'
+		)
+		for i, filePath in enumerate(filePaths):
+			connection.execute('INSERT INTO file VALUES (?, ?, \'python\', \'\', 1, 1, 1)', (i + 1, filePath))
+		connection.commit()
+		connection.close()
+		return databaseFilePath
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
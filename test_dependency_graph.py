@@ -0,0 +1,135 @@
+import dependency_graph
+import module_locator
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+	def test_changed_file_requires_indexing_its_transitive_dependents(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createProject(directoryPath, {
+				'pkg/__init__.py': '',
+				'pkg/base.py': 'class Base:\n	pass\n',
+				'pkg/mid.py': 'from . import base\n',
+				'app.py': 'def main():\n	from pkg.mid import base\n',
+				'other.py': 'import os\n',
+			})
+			graph = dependency_graph.DependencyGraph()
+			for filePath in filePaths.values():
+				graph.addSourceFile(filePath)
+
+			self.assertEqual(
+				graph.getDependentFilePaths([filePaths['pkg/base.py']]),
+				set([filePaths['pkg/base.py'], filePaths['pkg/mid.py'], filePaths['app.py']])
+			)
+			self.assertEqual(
+				graph.getDependentFilePaths([filePaths['pkg/__init__.py']]),
+				set([filePaths['pkg/__init__.py'], filePaths['pkg/mid.py'], filePaths['app.py']])
+			)
+			self.assertEqual(graph.getDependentFilePaths([filePaths['other.py']]), set([filePaths['other.py']]))
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_files_missing_from_loaded_graph_are_always_indexed(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createProject(directoryPath, {
+				'a.py': 'import b\n',
+				'b.py': 'def foo(:\n	pass\nimport c\n', # parso recovers from the syntax error
+				'c.py': '',
+				'd.py': '',
+			})
+			graph = dependency_graph.DependencyGraph()
+			for name in ['a.py', 'b.py', 'c.py']:
+				graph.addSourceFile(filePaths[name])
+			graphFilePath = os.path.join(directoryPath, 'graph.json')
+			graph.save(graphFilePath)
+
+			graph = dependency_graph.loadDependencyGraph(graphFilePath)
+			sourceFilePaths = [filePaths[name] for name in ['a.py', 'b.py', 'c.py', 'd.py']]
+			self.assertEqual(graph.getFilePathsToIndex(sourceFilePaths, [filePaths['c.py']]), sourceFilePaths)
+			self.assertEqual(graph.getFilePathsToIndex(sourceFilePaths, [filePaths['b.py']]), [filePaths['a.py'], filePaths['b.py'], filePaths['d.py']])
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_added_file_requires_indexing_files_with_unresolved_imports_of_it(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createProject(directoryPath, {
+				'pkg/__init__.py': '',
+				'pkg/sub/__init__.py': 'from ..new import Foo\n',
+				'app.py': 'from pkg.new import Foo\n',
+				'other.py': 'import pkg\n',
+			})
+			graph = dependency_graph.DependencyGraph()
+			for filePath in filePaths.values():
+				graph.addSourceFile(filePath)
+			graphFilePath = os.path.join(directoryPath, 'graph.json')
+			graph.save(graphFilePath)
+			graph = dependency_graph.loadDependencyGraph(graphFilePath)
+
+			newFilePath = os.path.join(directoryPath, 'pkg', 'new.py')
+			with open(newFilePath, 'w') as output:
+				output.write('class Foo:\n	pass\n')
+			module_locator.clearModuleLocatorCaches()
+
+			self.assertEqual(
+				graph.getDependentFilePaths([newFilePath]),
+				set([newFilePath, filePaths['app.py'], filePaths['pkg/sub/__init__.py']])
+			)
+			sourceFilePaths = [filePaths[name] for name in ['pkg/__init__.py', 'pkg/sub/__init__.py', 'app.py', 'other.py']] + [newFilePath]
+			self.assertEqual(
+				graph.getFilePathsToIndex(sourceFilePaths, []),
+				[filePaths['pkg/sub/__init__.py'], filePaths['app.py'], newFilePath]
+			)
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_file_that_fails_to_index_is_removed_from_graph(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createProject(directoryPath, {
+				'a.py': 'import b\n',
+				'b.py': '',
+			})
+			graph = dependency_graph.DependencyGraph()
+			for filePath in filePaths.values():
+				graph.addSourceFile(filePath)
+
+			class FailingSession:
+				def indexFile(self, sourceFilePath, skipIfUnchanged = True):
+					raise ValueError('failed')
+
+			import run
+			with self.assertRaises(ValueError):
+				run.indexFileIntoDependencyGraph(FailingSession(), graph, filePaths['a.py'], True)
+			sourceFilePaths = [filePaths['a.py'], filePaths['b.py']]
+			self.assertEqual(graph.getFilePathsToIndex(sourceFilePaths, []), [filePaths['a.py']])
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+# Utility Functions
+
+	def createProject(self, directoryPath, sourceCodes):
+		module_locator.clearModuleLocatorCaches()
+		filePaths = {}
+		for name, sourceCode in sourceCodes.items():
+			filePath = os.path.join(directoryPath, name)
+			if not os.path.isdir(os.path.dirname(filePath)):
+				os.makedirs(os.path.dirname(filePath))
+			with open(filePath, 'w') as output:
+				output.write(sourceCode)
+			filePaths[name] = filePath
+		return filePaths
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
@@ -0,0 +1,86 @@
+import index_server
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from test_shallow import StringIO
+from test_shallow import redirectStdout
+
+
+class TestIndexServer(unittest.TestCase):
+
+	def test_server_answers_each_request_line_with_one_response_line(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			with open(os.path.join(directoryPath, 'a.py'), 'w') as output:
+				output.write('def foo():\n	pass\n')
+			responses = self.serveRequestLines(directoryPath, [
+				json.dumps({'source_file_path': 'a.py', 'database_file_path': 'a.srctrldb', 'shallow': True}),
+				'{"source_file_path": ',
+				json.dumps({'database_file_path': 'a.srctrldb'}),
+				json.dumps(['a.py']),
+				json.dumps({'command': 'shutdown'}),
+				json.dumps({'source_file_path': 'a.py', 'database_file_path': 'a.srctrldb', 'shallow': True}),
+			])
+
+			self.assertEqual(len(responses), 5) # requests after "shutdown" are not handled
+			self.assertEqual(responses[0]['status'], 'ok')
+			self.assertEqual(responses[0]['source_file_path'], os.path.join(directoryPath, 'a.py'))
+			self.assertTrue(responses[0]['duration'] >= 0.0)
+			self.assertEqual(responses[1]['status'], 'error')
+			self.assertTrue(responses[1]['message'].startswith('Unable to parse request: '))
+			self.assertEqual(responses[2], {'status': 'error', 'message': 'A request needs to provide "source_file_path" and "database_file_path".'})
+			self.assertEqual(responses[3], {'status': 'error', 'message': 'A request needs to be a JSON object.'})
+			self.assertEqual(responses[4], {'status': 'ok'})
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_server_reopens_database_only_if_it_changes_or_is_cleared(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			with open(os.path.join(directoryPath, 'a.py'), 'w') as output:
+				output.write('foo = 1\n')
+			openedDatabases = []
+			responses = self.serveRequestLines(directoryPath, [
+				json.dumps({'source_file_path': 'a.py', 'database_file_path': 'a.srctrldb', 'shallow': True}),
+				json.dumps({'source_file_path': 'a.py', 'database_file_path': 'a.srctrldb', 'shallow': True}),
+				json.dumps({'source_file_path': 'a.py', 'database_file_path': 'a.srctrldb', 'shallow': True, 'clear': True}),
+				json.dumps({'source_file_path': 'missing.py', 'database_file_path': 'b.srctrldb', 'shallow': True}),
+			], openedDatabases)
+
+			self.assertEqual([response['status'] for response in responses], ['ok', 'ok', 'ok', 'error'])
+			self.assertEqual(responses[3]['source_file_path'], os.path.join(directoryPath, 'missing.py'))
+			self.assertEqual(openedDatabases, [
+				(os.path.join(directoryPath, 'a.srctrldb'), False),
+				(os.path.join(directoryPath, 'a.srctrldb'), True),
+				(os.path.join(directoryPath, 'b.srctrldb'), False),
+			])
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+# Utility Functions
+
+	def serveRequestLines(self, workingDirectory, requestLines, openedDatabases = None):
+		# returns the decoded responses, the databases opened by the session are appended to "openedDatabases" as (path, clear)
+		server = index_server.IndexServer(workingDirectory)
+		if openedDatabases is not None:
+			openDatabase = server.session.openDatabase
+			def recordOpenDatabase(databaseFilePath, clear = False):
+				openedDatabases.append((databaseFilePath, clear))
+				return openDatabase(databaseFilePath, clear)
+			server.session.openDatabase = recordOpenDatabase
+
+		output = StringIO()
+		try:
+			with redirectStdout(StringIO()):
+				server.serveStream(StringIO(''.join(line + '\n' for line in requestLines)), output)
+		finally:
+			server.shutdown()
+		return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
@@ -0,0 +1,53 @@
+import indexer_common
+import os
+import shallow_indexer
+import shutil
+import tempfile
+import unittest
+from test_shallow import StringIO
+from test_shallow import TestAstVisitorClient
+
+
+class TestAstDumpWriter(unittest.TestCase):
+
+	def test_writer_indents_lines_by_depth_and_writes_them_in_batches(self):
+		output = StringIO()
+		astDumpWriter = indexer_common.AstDumpWriter(output, 2)
+		astDumpWriter.writeNode(0, 'file_input')
+		self.assertEqual(output.getvalue(), '')
+		astDumpWriter.writeNode(2, 'name')
+		astDumpWriter.writeNode(1, 'suite')
+		self.assertEqual(output.getvalue(), 'AST: file_input\nAST: | | name\n')
+		astDumpWriter.flush()
+		self.assertEqual(output.getvalue(), 'AST: file_input\nAST: | | name\nAST: | suite\n')
+
+
+	def test_verbose_visitor_writes_ast_dump_to_set_writer(self):
+		output = StringIO()
+		indexer_common.setAstDumpWriter(indexer_common.AstDumpWriter(output))
+		try:
+			shallow_indexer.indexSourceCode('x = 1\n', os.getcwd(), TestAstVisitorClient(), True)
+			indexer_common.getAstDumpWriter().flush()
+		finally:
+			indexer_common.setAstDumpWriter(None)
+		self.assertEqual(output.getvalue().splitlines()[:2], ['AST: file_input [1:1|2:0]', 'AST: | simple_stmt [1:1|2:0]'])
+
+
+	def test_opened_writer_writes_plain_and_compressed_dumps_as_utf8(self):
+		import gzip
+		directoryPath = tempfile.mkdtemp()
+		try:
+			for fileName, openFunction in [('dump.txt', open), ('dump.txt.gz', gzip.open)]:
+				filePath = os.path.join(directoryPath, fileName)
+				astDumpWriter = indexer_common.openAstDumpWriter(filePath)
+				astDumpWriter.writeNode(0, 'file_input')
+				astDumpWriter.writeNode(1, u'name: \xe9')
+				astDumpWriter.close()
+				with openFunction(filePath, 'rb') as input:
+					self.assertEqual(input.read().decode('utf-8'), u'AST: file_input\nAST: | name: \xe9\n')
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
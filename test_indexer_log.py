@@ -0,0 +1,69 @@
+import indexer_log
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from test_shallow import StringIO
+from test_shallow import redirectStdout
+
+
+class TestIndexerLog(unittest.TestCase):
+
+	def test_messages_keep_level_prefix_and_repetitions_are_suppressed_and_summarized(self):
+		output = StringIO()
+		indexer_log.configureLogging(logging.INFO, None, 2)
+		try:
+			with redirectStdout(output):
+				for i in range(5):
+					indexer_log.logger.error('Encountered exception "%s" at %d.', 'KeyError', i)
+				indexer_log.logger.info('Indexing source file "a.py".')
+				indexer_log.logSummary()
+		finally:
+			indexer_log.configureLogging()
+
+		self.assertEqual(output.getvalue().splitlines(), [
+			'ERROR: Encountered exception "KeyError" at 0.',
+			'ERROR: Encountered exception "KeyError" at 1.',
+			'INFO: Indexing source file "a.py".',
+			'INFO: Suppressed 3 repetitions of ERROR message "Encountered exception "%s" at %d.".',
+			'INFO: Logged 0 warnings and 5 errors.',
+		])
+
+
+	def test_repetition_filter_counts_limited_number_of_messages(self):
+		repetitionFilter = indexer_log.RepetitionFilter(2, 3)
+		records = [
+			logging.LogRecord(indexer_log.logger.name, logging.INFO, __file__, 0, 'Indexing source file "%s".', (str(i),), None)
+			for i in range(5)
+		]
+		self.assertTrue(all(repetitionFilter.filter(r) for r in records[:2]))
+		self.assertFalse(any(repetitionFilter.filter(r) for r in records[2:]))
+
+		for i in range(10):
+			self.assertTrue(repetitionFilter.filter(
+				logging.LogRecord(indexer_log.logger.name, logging.ERROR, __file__, 0, 'Message ' + str(i), None, None)
+			))
+		self.assertEqual(len(repetitionFilter.messageCounts), 3)
+		self.assertEqual(repetitionFilter.getSuppressedMessageCounts(), [('INFO', 'Indexing source file "%s".', 3)])
+
+
+	def test_messages_below_level_are_not_written_to_sink(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			logFilePath = os.path.join(directoryPath, 'indexer.log')
+			indexer_log.configureLogging(logging.WARNING, logFilePath)
+			try:
+				indexer_log.logger.info('Indexing source file "a.py".')
+				indexer_log.logger.warning('Loaded database is not compatible.')
+			finally:
+				indexer_log.configureLogging()
+
+			with open(logFilePath, 'r') as input:
+				self.assertEqual(input.read(), 'WARNING: Loaded database is not compatible.\n')
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
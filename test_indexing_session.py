@@ -0,0 +1,279 @@
+import content_hash_table
+import indexing_session
+import json
+import os
+import outline_indexer
+import parse_cache
+import progress_report
+import shallow_ast_indexer
+import shallow_indexer
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from test_shallow import StringIO
+from test_shallow import TestAstVisitorClient
+
+
+class TestLargeFilePolicy(unittest.TestCase):
+
+	def test_policy_reports_first_exceeded_limit(self):
+		sourceFilePath = self.createSourceFile('class Foo:\n	def bar(self):\n		return 1\n')
+		try:
+			self.assertEqual(indexing_session.LargeFilePolicy().getExceededLimit(sourceFilePath), None)
+			self.assertEqual(indexing_session.LargeFilePolicy(maxByteCount=10).getExceededLimit(sourceFilePath), '38 bytes (limit: 10)')
+			self.assertEqual(indexing_session.LargeFilePolicy(maxLineCount=2).getExceededLimit(sourceFilePath), '3 lines (limit: 2)')
+			self.assertEqual(indexing_session.LargeFilePolicy(maxLineCount=3).getExceededLimit(sourceFilePath), None)
+			self.assertEqual(indexing_session.LargeFilePolicy(maxLeafCount=10).getExceededLimit(sourceFilePath), '15 leaves (limit: 10)')
+			self.assertEqual(indexing_session.LargeFilePolicy(maxLeafCount=15).getExceededLimit(sourceFilePath), None)
+		finally:
+			os.remove(sourceFilePath)
+
+
+	def test_progress_is_reported_after_each_top_level_definition(self):
+		sourceFilePath = self.createSourceFile(
+			'class Foo:\n'
+			'	def bar(self):\n'
+			'		pass\n'
+			'\n'
+			'x = 1\n'
+			'def baz():\n'
+			'	def qux():\n'
+			'		pass\n'
+		)
+		try:
+			moduleName = os.path.splitext(os.path.basename(sourceFilePath))[0]
+			expectedProgress = [(moduleName + '.Foo', 3), (moduleName + '.baz', 8)]
+
+			progress = []
+			shallow_indexer.indexSourceFile(sourceFilePath, None, os.getcwd(), TestAstVisitorClient(), False, None, None, lambda *args: progress.append(args))
+			self.assertEqual(progress, expectedProgress)
+
+			progress = []
+			outline_indexer.indexSourceFile(sourceFilePath, None, os.getcwd(), TestAstVisitorClient(), False, None, lambda *args: progress.append(args))
+			self.assertEqual(progress, expectedProgress)
+
+			if shallow_ast_indexer.isAstBackendSupported():
+				progress = []
+				shallow_ast_indexer.indexSourceFile(sourceFilePath, None, os.getcwd(), TestAstVisitorClient(), False, None, None, lambda *args: progress.append(args))
+				self.assertEqual(progress, expectedProgress)
+		finally:
+			os.remove(sourceFilePath)
+
+
+# Utility Functions
+
+	def createSourceFile(self, sourceCode):
+		fileDescriptor, sourceFilePath = tempfile.mkstemp(suffix='.py')
+		with os.fdopen(fileDescriptor, 'w') as output:
+			output.write(sourceCode)
+		return sourceFilePath
+
+
+class TestIndexingSession(unittest.TestCase):
+
+	def test_file_that_cannot_be_decoded_does_not_roll_back_transaction(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createSourceFiles(directoryPath, {
+				'a.py': 'foo = 1\n'.encode('utf-8'),
+				'b.py': 'bar = 2\n'.encode('utf-8'),
+				'c.py': 'baz = 3\n'.encode('utf-8'),
+				'latin.py': u'qux = "\xe9"\n'.encode('latin-1'),
+			})
+			session, indexedFilePaths = self.createSession(directoryPath)
+			try:
+				for name in ['a.py', 'b.py', 'c.py']:
+					session.indexFile(filePaths[name])
+				with self.assertRaises(UnicodeDecodeError):
+					session.indexFile(filePaths['latin.py'])
+				self.assertTrue(session.isTransactionOpen)
+			finally:
+				session.closeDatabase()
+
+			self.assertEqual(indexedFilePaths, [filePaths['a.py'], filePaths['b.py'], filePaths['c.py']])
+			self.assertEqual(session.committedFileCount, 3)
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_file_that_fails_after_recording_rolls_back_and_reindexes_transaction(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createSourceFiles(directoryPath, {
+				'a.py': 'foo = 1\n'.encode('utf-8'),
+				'b.py': 'bar = 2\n'.encode('utf-8'),
+				'broken.py': 'baz = 3\n'.encode('utf-8'),
+				'c.py': 'qux = 4\n'.encode('utf-8'),
+			})
+			session, indexedFilePaths = self.createSession(directoryPath)
+			try:
+				for name in ['a.py', 'b.py']:
+					session.indexFile(filePaths[name])
+				with self.assertRaises(ValueError):
+					session.indexFile(filePaths['broken.py'])
+				session.indexFile(filePaths['c.py'])
+			finally:
+				session.closeDatabase()
+
+			self.assertEqual(indexedFilePaths, [
+				filePaths['a.py'], filePaths['b.py'], filePaths['broken.py'], filePaths['a.py'], filePaths['b.py'], filePaths['c.py']
+			])
+			self.assertEqual(session.committedFileCount, 3)
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_progress_report_counts_files_once_despite_rollbacks_and_early_failures(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createSourceFiles(directoryPath, {
+				'a.py': 'foo = 1\n'.encode('utf-8'),
+				'b.py': 'bar = 2\n'.encode('utf-8'),
+				'broken.py': 'baz = 3\n'.encode('utf-8'),
+				'latin.py': u'qux = "\xe9"\n'.encode('latin-1'),
+			})
+			output = StringIO()
+			report = progress_report.ProgressReport(output)
+			session, indexedFilePaths = self.createSession(directoryPath)
+			session.startReportingProgress(report)
+			sourceFilePaths = [filePaths[name] for name in ['a.py', 'b.py', 'broken.py', 'latin.py']]
+			report.startRun(sourceFilePaths)
+			try:
+				for sourceFilePath in sourceFilePaths:
+					try:
+						session.indexFile(sourceFilePath)
+					except (ValueError, UnicodeDecodeError):
+						pass
+			finally:
+				session.closeDatabase()
+			report.finishRun()
+
+			events = [json.loads(line) for line in output.getvalue().splitlines()]
+			fileFinishedEvents = [e for e in events if e['event'] == 'file_finished']
+			self.assertEqual([(e['file_path'], e['successful']) for e in fileFinishedEvents], [
+				(filePaths['a.py'], True), (filePaths['b.py'], True), (filePaths['broken.py'], False), (filePaths['latin.py'], False)
+			])
+			self.assertEqual(events[-1]['file_count'], 4)
+			self.assertEqual(events[-1]['eta'], 0.0)
+			self.assertEqual(events[-1]['names'], fileFinishedEvents[0]['names'] + fileFinishedEvents[1]['names'])
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_commit_policy_requires_commit_once_any_limit_is_reached(self):
+		self.assertFalse(indexing_session.CommitPolicy(0, 0, 0.0).isCommitRequired(1000, 100000, 3600.0))
+
+		filePolicy = indexing_session.CommitPolicy(3, 0, 0.0)
+		self.assertFalse(filePolicy.isCommitRequired(2, 100000, 3600.0))
+		self.assertTrue(filePolicy.isCommitRequired(3, 0, 0.0))
+
+		recordPolicy = indexing_session.CommitPolicy(0, 100, 0.0)
+		self.assertFalse(recordPolicy.isCommitRequired(1000, 99, 3600.0))
+		self.assertTrue(recordPolicy.isCommitRequired(1, 100, 0.0))
+
+		durationPolicy = indexing_session.CommitPolicy(0, 0, 2.5)
+		self.assertFalse(durationPolicy.isCommitRequired(1000, 100000, 2.4))
+		self.assertTrue(durationPolicy.isCommitRequired(1, 0, 2.5))
+
+		combinedPolicy = indexing_session.CommitPolicy(10, 100, 2.5)
+		self.assertFalse(combinedPolicy.isCommitRequired(9, 99, 2.4))
+		self.assertTrue(combinedPolicy.isCommitRequired(9, 100, 2.4))
+
+
+	def test_commit_statistics_count_transactions_files_and_records(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createSourceFiles(directoryPath, {
+				'a.py': 'foo = 1\n'.encode('utf-8'),
+				'b.py': 'bar = 2\n'.encode('utf-8'),
+				'c.py': 'baz = 3\n'.encode('utf-8'),
+			})
+			session, indexedFilePaths = self.createSession(directoryPath, indexing_session.CommitPolicy(2))
+			try:
+				recordCounts = []
+				for name in ['a.py', 'b.py', 'c.py']:
+					session.indexFile(filePaths[name])
+					recordCounts.append(session.astVisitorClient.recordCount)
+			finally:
+				session.closeDatabase()
+
+			recordCount = recordCounts[1] + recordCounts[2] # the record count starts over with every transaction
+			self.assertTrue(session.getCommitStatisticsString().startswith(
+				'Commits: 2 transactions with 3 files and ' + str(recordCount) + ' records, '
+			))
+			self.assertTrue(session.getCommitStatisticsString().endswith(' seconds spent committing.'))
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_unchanged_file_exceeding_leaf_limit_is_skipped_without_parsing(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			filePaths = self.createSourceFiles(directoryPath, {
+				'large.py': 'foo = bar(1, 2, 3)\n'.encode('utf-8'),
+				'changed.py': 'foo = bar(1, 2, 4)\n'.encode('utf-8'),
+			})
+			databaseFilePath = os.path.join(directoryPath, 'project.srctrldb')
+			connection = sqlite3.connect(databaseFilePath)
+			connection.execute('CREATE TABLE file(id INTEGER NOT NULL, path TEXT, PRIMARY KEY(id))')
+			connection.executemany('INSERT INTO file VALUES (?, ?)', [(1, filePaths['large.py']), (2, filePaths['changed.py'])])
+			connection.commit()
+			connection.close()
+
+			session, indexedFilePaths = self.createSession(directoryPath)
+			session.largeFilePolicy = indexing_session.LargeFilePolicy(maxLeafCount=5, fallbackMode='outline')
+			session.parseCache = parse_cache.DiffParseCache()
+			session.contentHashTable = content_hash_table.ContentHashTable(databaseFilePath)
+			try:
+				session.contentHashTable.storeContentHashes([
+					(filePaths['large.py'], content_hash_table.getContentHash(b'foo = bar(1, 2, 3)\n'), 'outline'),
+					(filePaths['changed.py'], content_hash_table.getContentHash(b'foo = bar(1, 2, 3)\n'), 'outline'),
+				])
+				session.indexFile(filePaths['large.py'])
+				self.assertEqual(indexedFilePaths, [])
+				self.assertEqual(session.contentHashTable.skippedFileCount, 1)
+				self.assertEqual(session.parseCache.hitCount + session.parseCache.missCount, 0)
+
+				session.indexFile(filePaths['changed.py'])
+				self.assertEqual(indexedFilePaths, [filePaths['changed.py']])
+				self.assertEqual(session.uncommittedContentHashes[filePaths['changed.py']][1], 'outline')
+			finally:
+				session.contentHashTable.close()
+				session.contentHashTable = None
+				session.closeDatabase()
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+# Utility Functions
+
+	def createSourceFiles(self, directoryPath, sourceCodes):
+		filePaths = {}
+		for name, sourceCode in sourceCodes.items():
+			filePaths[name] = os.path.join(directoryPath, name)
+			with open(filePaths[name], 'wb') as output:
+				output.write(sourceCode)
+		return filePaths
+
+
+	def createSession(self, directoryPath, commitPolicy = None):
+		# returns a session that keeps all files in one transaction unless another commit policy is given and the list of files
+		# it indexes, indexing a file named "broken.py" fails after the file has been recorded
+		if commitPolicy is None:
+			commitPolicy = indexing_session.CommitPolicy(0)
+		session = indexing_session.IndexingSession(directoryPath, None, False, True, None, commitPolicy)
+		session.openRecordStream(os.path.join(directoryPath, 'records.jsonl'))
+		indexedFilePaths = []
+		indexFileInTransaction = session.indexFileInTransaction
+		def recordIndexFileInTransaction(sourceFilePath, *args):
+			indexedFilePaths.append(sourceFilePath)
+			indexFileInTransaction(sourceFilePath, *args)
+			if os.path.basename(sourceFilePath) == 'broken.py':
+				raise ValueError(sourceFilePath)
+		session.indexFileInTransaction = recordIndexFileInTransaction
+		return session, indexedFilePaths
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
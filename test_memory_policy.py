@@ -0,0 +1,45 @@
+import memory_policy
+import os
+import parso
+import tempfile
+import unittest
+
+
+class TestMemoryPolicy(unittest.TestCase):
+
+	def test_caches_are_evicted_once_any_limit_is_exceeded(self):
+		memory_policy.MemoryPolicy().evictCaches()
+		grammar = parso.load_grammar()
+		for i in range(3):
+			grammar.parse('foo = ' + str(i) + '\n', path=os.path.join(tempfile.gettempdir(), 'module_' + str(i) + '.py'), diff_cache=True)
+		self.assertEqual(memory_policy.getCachedModuleCount(), 3)
+
+		self.assertFalse(memory_policy.MemoryPolicy().isEvictionRequired())
+		self.assertFalse(memory_policy.MemoryPolicy(0, 3).isEvictionRequired())
+		self.assertFalse(memory_policy.MemoryPolicy(1024 * 1024 * 1024 * 1024, 0).isEvictionRequired())
+		self.assertTrue(memory_policy.MemoryPolicy(1, 0).isEvictionRequired())
+
+		policy = memory_policy.MemoryPolicy(0, 2)
+		self.assertTrue(policy.isEvictionRequired())
+		evicted = policy.evictCaches()
+		self.assertEqual(evicted[0], '3 parsed module trees')
+		self.assertEqual(memory_policy.getCachedModuleCount(), 0)
+		self.assertEqual(policy.evictionCount, 1)
+		self.assertFalse(policy.isEvictionRequired())
+
+
+	def test_peak_resident_set_size_covers_only_time_since_reset(self):
+		if not memory_policy.resetPeakResidentSetSize():
+			self.skipTest('the peak resident set size cannot be reset on this platform')
+		peakResidentSetSize = memory_policy.getPeakResidentSetSize()
+
+		data = b'x' * (64 * 1024 * 1024)
+		self.assertTrue(memory_policy.getPeakResidentSetSize() >= peakResidentSetSize + len(data) // 2)
+		del data
+
+		memory_policy.resetPeakResidentSetSize()
+		self.assertTrue(memory_policy.getPeakResidentSetSize() < peakResidentSetSize + 32 * 1024 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
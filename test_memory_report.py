@@ -0,0 +1,48 @@
+import json
+import memory_report
+import os
+import parso
+import shallow_indexer
+import shutil
+import tempfile
+import unittest
+
+
+class TestMemoryReport(unittest.TestCase):
+
+	def test_allocations_are_attributed_to_indexer_modules_and_packages(self):
+		indexerDirectoryPath = os.path.dirname(os.path.abspath(shallow_indexer.__file__))
+		for moduleName in ['indexer', 'shallow_indexer', 'shallow_ast_indexer', 'outline_indexer', 'indexing_session']:
+			self.assertEqual(memory_report.getComponentName(os.path.join(indexerDirectoryPath, moduleName + '.py')), moduleName)
+		self.assertEqual(memory_report.getComponentName(os.path.dirname(os.path.abspath(parso.__file__)) + os.sep + 'tree.py'), 'parso')
+		self.assertEqual(memory_report.getComponentName(os.path.join(tempfile.gettempdir(), 'indexer.py')), 'other')
+
+
+	@unittest.skipIf(not memory_report.isMemoryReportSupported(), 'tracemalloc is not available')
+	def test_report_contains_one_entry_per_file(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			reportFilePath = os.path.join(directoryPath, 'memory.jsonl')
+			report = memory_report.MemoryReport(reportFilePath, 3)
+			report.startFile('a.py')
+			moduleNode = shallow_indexer.parseSourceCode('def foo():\n	return [i for i in range(10)]\n' * 50, 'a.py')
+			report.finishFile()
+			report.startFile('b.py')
+			report.finishFile(False)
+
+			with open(reportFilePath, 'r') as input:
+				entries = [json.loads(line) for line in input]
+			self.assertEqual([(entry['source_file_path'], entry['successful']) for entry in entries], [('a.py', True), ('b.py', False)])
+			self.assertTrue(entries[0]['component_sizes']['parso'] > 0)
+			self.assertTrue(entries[0]['peak_size'] >= entries[0]['current_size'] > 0)
+			self.assertTrue(0 < len(entries[0]['top_allocations']) <= 3)
+			self.assertEqual(
+				sorted(entries[0]['top_allocations'][0].keys()), ['component', 'count', 'file_path', 'line', 'size']
+			)
+			self.assertIsNotNone(moduleNode)
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
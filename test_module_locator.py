@@ -0,0 +1,40 @@
+import module_locator
+import os
+import parso
+import shutil
+import tempfile
+import unittest
+
+
+class TestModuleLocator(unittest.TestCase):
+
+	def test_alias_is_located_as_module_it_is_bound_to(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			for name in ['c.py', 'a/__init__.py', 'a/b.py']: # "c" shadows the alias of "a.b"
+				filePath = os.path.join(directoryPath, name)
+				if not os.path.isdir(os.path.dirname(filePath)):
+					os.makedirs(os.path.dirname(filePath))
+				open(filePath, 'w').close()
+			module_locator.clearModuleLocatorCaches()
+			moduleLocator = module_locator.ModuleLocator([directoryPath])
+
+			moduleNode = parso.parse('import a.b as c\nfrom a import b as c\nimport a as c\n')
+			importPaths = []
+			for importNode in moduleNode.children[:3]:
+				importNode = importNode.children[0]
+				level, names, isImportedName = module_locator.getImportPathOfNameNode(importNode, importNode.get_defined_names()[0])
+				importPaths.append((level, names, isImportedName, moduleLocator.locateModule('.'.join(names))))
+
+			self.assertEqual(importPaths, [
+				(0, ['a', 'b'], True, os.path.join(directoryPath, 'a', 'b.py')),
+				(0, ['a', 'b'], True, os.path.join(directoryPath, 'a', 'b.py')),
+				(0, ['a'], True, os.path.join(directoryPath, 'a', '__init__.py')),
+			])
+		finally:
+			shutil.rmtree(directoryPath)
+			module_locator.clearModuleLocatorCaches()
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
@@ -0,0 +1,84 @@
+import os
+import outline_indexer
+import sys
+import unittest
+from test_shallow import TestAstVisitorClient
+
+
+class TestPythonOutlineIndexer(unittest.TestCase):
+
+	def test_outline_indexer_records_definitions_with_scopes(self):
+		client = self.indexSourceCode(
+			'class Foo:\n'
+			'	def bar(self):\n'
+			'		pass\n'
+			'def baz():\n'
+			'	pass\n'
+		)
+		self.assertTrue('MODULE: virtual_file' in client.symbols)
+		self.assertTrue('CLASS: virtual_file.Foo at [1:7|1:9] with scope [1:1|4:0]' in client.symbols)
+		self.assertTrue('METHOD: virtual_file.Foo.bar at [2:6|2:8] with scope [2:2|4:0]' in client.symbols)
+		self.assertTrue('FUNCTION: virtual_file.baz at [4:5|4:7] with scope [4:1|6:0]' in client.symbols)
+
+
+	@unittest.skipIf(sys.version_info < (3, 0), 'starred assignments and annotations require Python 3')
+	def test_outline_indexer_records_static_and_non_static_fields(self):
+		client = self.indexSourceCode(
+			'class Foo:\n'
+			'	x, *y = 1, 2\n'
+			'	if True:\n'
+			'		z: int = 3\n'
+			'	def __init__(self, other):\n'
+			'		self.a = other\n'
+			'		other.b = 4\n'
+		)
+		self.assertTrue('FIELD: virtual_file.Foo.x at [2:2|2:2]' in client.symbols)
+		self.assertTrue('FIELD: virtual_file.Foo.y at [2:6|2:6]' in client.symbols)
+		self.assertTrue('FIELD: virtual_file.Foo.z at [4:3|4:3]' in client.symbols)
+		self.assertTrue('FIELD: virtual_file.Foo.a at [6:8|6:8]' in client.symbols)
+		self.assertTrue('USAGE: virtual_file.Foo.__init__ -> virtual_file.Foo.a at [6:8|6:8]' in client.references)
+		self.assertFalse('FIELD: virtual_file.Foo.b at [7:9|7:9]' in client.symbols)
+
+
+	def test_outline_indexer_does_not_record_references_or_local_symbols(self):
+		client = self.indexSourceCode(
+			'import os\n'
+			'foo = os.getcwd()\n'
+			'def bar(a):\n'
+			'	b = a\n'
+			'	return foo\n'
+		)
+		self.assertEqual(client.references, [])
+		self.assertEqual(client.qualifiers, [])
+		self.assertEqual(client.localSymbols, [])
+		self.assertFalse('GLOBAL_VARIABLE: virtual_file.foo at [2:1|2:3]' in client.symbols)
+
+
+	def test_outline_indexer_falls_back_to_parso_for_invalid_source_code(self):
+		sourceCode = 'class Foo:\n	def bar(self):\n		self.x = 1\n		baz(\n'
+		self.assertEqual(outline_indexer.parseSourceCode(sourceCode, 'virtual_file.py'), None)
+		client = self.indexSourceCode(sourceCode)
+		self.assertTrue('METHOD: virtual_file.Foo.bar at [2:6|2:8] with scope [2:2|4:6]' in client.symbols)
+		self.assertTrue('FIELD: virtual_file.Foo.x at [3:8|3:8]' in client.symbols)
+
+
+# Utility Functions
+
+	def indexSourceCode(self, sourceCode, sysPath = None, verbose = False):
+		workingDirectory = os.getcwd()
+		astVisitorClient = TestAstVisitorClient()
+
+		outline_indexer.indexSourceCode(
+			sourceCode,
+			workingDirectory,
+			astVisitorClient,
+			verbose,
+			sysPath
+		)
+
+		astVisitorClient.updateReadableOutput()
+		return astVisitorClient
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
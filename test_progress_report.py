@@ -0,0 +1,52 @@
+import json
+import os
+import progress_report
+import shallow_indexer
+import shutil
+import tempfile
+import unittest
+from test_shallow import StringIO
+from test_shallow import TestAstVisitorClient
+
+
+class TestProgressReport(unittest.TestCase):
+
+	def test_file_events_contain_counts_of_recorded_names_and_references(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			sourceFilePaths = [os.path.join(directoryPath, 'a.py'), os.path.join(directoryPath, 'b.py')]
+			for sourceFilePath in sourceFilePaths:
+				with open(sourceFilePath, 'w') as output:
+					output.write('def bar(x):\n	pass\ndef foo(x):\n	return bar(x, undefined)\n')
+
+			output = StringIO()
+			report = progress_report.ProgressReport(output)
+			client = progress_report.CountingAstVisitorClient(TestAstVisitorClient())
+			report.client = client
+			report.startRun(sourceFilePaths)
+			report.startFile(sourceFilePaths[0])
+			shallow_indexer.indexSourceFile(sourceFilePaths[0], None, os.getcwd(), client, False)
+			report.finishFile()
+			report.skipFile(sourceFilePaths[1])
+			report.finishRun()
+
+			events = [json.loads(line) for line in output.getvalue().splitlines()]
+			self.assertEqual([e['event'] for e in events], ['run_started', 'file_started', 'file_finished', 'file_skipped', 'run_finished'])
+			self.assertEqual(events[0]['file_count'], 2)
+			self.assertEqual(events[0]['eta'], None)
+
+			fileFinishedEvent = events[2]
+			self.assertEqual(fileFinishedEvent['file_path'], sourceFilePaths[0])
+			self.assertTrue(fileFinishedEvent['successful'])
+			self.assertEqual(fileFinishedEvent['references'], 1)
+			self.assertEqual(fileFinishedEvent['unsolved_references'], 1)
+			self.assertEqual(fileFinishedEvent['names'], 7) # "bar", "foo", three times "x", the call of "bar" and "undefined"
+			self.assertEqual(fileFinishedEvent['finished_file_count'], 1)
+			self.assertTrue(fileFinishedEvent['eta'] is not None)
+			self.assertEqual(events[4]['eta'], 0.0)
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
@@ -0,0 +1,114 @@
+import os
+import record_stream
+import shallow_indexer
+import shutil
+import tempfile
+import unittest
+from test_shallow import StringIO
+from test_shallow import TestAstVisitorClient
+
+
+class TestRecordStream(unittest.TestCase):
+
+	def test_replayed_record_stream_records_same_data_as_direct_indexing(self):
+		sourceCode = (
+			'import os\n'
+			'class Foo:\n'
+			'	"""multi\n'
+			'	line"""\n'
+			'	def bar(self, x):\n'
+			'		self.y = os.path.join(x, undefined)\n'
+			'		return [z for z in x]\n'
+		)
+		directClient = TestAstVisitorClient()
+		shallow_indexer.indexSourceCode(sourceCode, os.getcwd(), directClient, False)
+		directClient.updateReadableOutput()
+
+		replayedClient = self.replay(self.writeRecordStream(sourceCode))
+
+		self.assertEqual(replayedClient.symbols, directClient.symbols)
+		self.assertEqual(replayedClient.localSymbols, directClient.localSymbols)
+		self.assertEqual(replayedClient.references, directClient.references)
+		self.assertEqual(replayedClient.qualifiers, directClient.qualifiers)
+		self.assertEqual(replayedClient.atomicSourceRanges, directClient.atomicSourceRanges)
+
+
+	def test_record_stream_discards_records_of_rolled_back_transaction(self):
+		output = StringIO()
+		client = record_stream.RecordStreamClient(output)
+		client.beginTransaction()
+		shallow_indexer.indexSourceCode('def foo():\n	pass\n', os.getcwd(), client, False)
+		client.rollbackTransaction()
+		client.beginTransaction()
+		shallow_indexer.indexSourceCode('def bar():\n	pass\n', os.getcwd(), client, False)
+		client.commitTransaction()
+
+		replayedClient = self.replay(output.getvalue())
+		self.assertTrue('FUNCTION: virtual_file.bar at [1:5|1:7] with scope [1:1|3:0]' in replayedClient.symbols)
+		self.assertFalse('FUNCTION: virtual_file.foo at [1:5|1:7] with scope [1:1|3:0]' in replayedClient.symbols)
+
+
+	def test_recording_client_forwards_calls_and_records_them_for_replay(self):
+		sourceCode = (
+			'class Foo:\n'
+			'	def bar(self, x):\n'
+			'		self.y = x\n'
+			'		return undefined\n'
+		)
+		output = StringIO()
+		directClient = TestAstVisitorClient()
+		recordingClient = record_stream.RecordingAstVisitorClient(directClient, output)
+		recordingClient.recorder.beginTransaction()
+		shallow_indexer.indexSourceCode(sourceCode, os.getcwd(), recordingClient, False)
+		recordingClient.recorder.commitTransaction()
+		directClient.updateReadableOutput()
+
+		replayedClient = self.replay(output.getvalue())
+
+		self.assertTrue('FIELD: virtual_file.Foo.y at [3:8|3:8]' in directClient.symbols)
+		self.assertEqual(replayedClient.symbols, directClient.symbols)
+		self.assertEqual(replayedClient.localSymbols, directClient.localSymbols)
+		self.assertEqual(replayedClient.references, directClient.references)
+
+
+	def test_record_stream_files_are_replayed_with_and_without_compression(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			for fileName in ['records.jsonl', 'records.jsonl.gz']:
+				filePath = os.path.join(directoryPath, fileName)
+				output = record_stream.openRecordStream(filePath, 'w')
+				output.write(self.writeRecordStream('def foo():\n	pass\n'))
+				output.close()
+				client = TestAstVisitorClient()
+				record_stream.replayRecordStream(filePath, client)
+				client.updateReadableOutput()
+				self.assertTrue('FUNCTION: virtual_file.foo at [1:5|1:7] with scope [1:1|3:0]' in client.symbols)
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+	def test_record_stream_of_incompatible_version_is_not_replayed(self):
+		recordCount = record_stream.RecordStreamReplayer(TestAstVisitorClient()).replay(StringIO('{"version":0}\n["f",1,"foo.py"]\n'))
+		self.assertEqual(recordCount, None)
+
+
+# Utility Functions
+
+	def writeRecordStream(self, sourceCode):
+		output = StringIO()
+		client = record_stream.RecordStreamClient(output)
+		client.beginTransaction()
+		shallow_indexer.indexSourceCode(sourceCode, os.getcwd(), client, False)
+		client.commitTransaction()
+		return output.getvalue()
+
+
+	def replay(self, recordStream):
+		client = TestAstVisitorClient()
+		record_stream.RecordStreamReplayer(client).replay(StringIO(recordStream))
+		client.updateReadableOutput()
+		return client
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
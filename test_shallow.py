@@ -1,10 +1,33 @@
 import shallow_indexer
-import multiprocessing
+import contextlib
+import memory_policy
 import os
+import parse_cache
+import project_symbol_table
+import shallow_ast_indexer
+import shutil
 import sourcetraildb as srctrl
 import sys
+import tempfile
 import unittest
 
+# StringIO, redirectStdout and TestAstVisitorClient are shared with the test modules of the other indexer modules
+try:
+	from StringIO import StringIO # accepts the byte strings that are written by Python 2
+except ImportError:
+	from io import StringIO
+
+
+@contextlib.contextmanager
+def redirectStdout(output):
+	# contextlib.redirect_stdout is not available in Python 2
+	stdout = sys.stdout
+	sys.stdout = output
+	try:
+		yield output
+	finally:
+		sys.stdout = stdout
+
 
 class TestPythonIndexer(unittest.TestCase):
 
@@ -133,6 +156,55 @@ class TestPythonIndexer(unittest.TestCase):
 		self.assertTrue('virtual_file.Foo.bar<baz> at [3:3|3:5]' in client.localSymbols)
 
 
+	def test_indexer_records_usage_of_variable_defined_after_usage_as_local_symbol(self):
+		client = self.indexSourceCode(
+			'def foo():\n'
+			'	for i in range(3):\n'
+			'		if i > 0:\n'
+			'			print(x)\n'
+			'		x = i\n'
+		)
+		self.assertTrue('virtual_file.foo<x> at [4:10|4:10]' in client.localSymbols)
+
+
+	def test_indexer_records_usage_of_enclosing_function_variable_as_local_symbol(self):
+		client = self.indexSourceCode(
+			'def foo(bar):\n'
+			'	def baz():\n'
+			'		return bar\n'
+		)
+		self.assertTrue('virtual_file.foo<bar> at [3:10|3:12]' in client.localSymbols)
+
+
+	@unittest.skipIf(sys.version_info < (3, 0), 'nonlocal requires Python 3')
+	def test_indexer_records_assignment_to_nonlocal_variable_as_local_symbol_of_enclosing_function(self):
+		client = self.indexSourceCode(
+			'def foo():\n'
+			'	x = 0\n'
+			'	def bar():\n'
+			'		nonlocal x\n'
+			'		x = 1\n'
+		)
+		self.assertTrue('virtual_file.foo<x> at [5:3|5:3]' in client.localSymbols)
+		self.assertFalse('virtual_file.foo.bar<x> at [5:3|5:3]' in client.localSymbols)
+
+
+	def test_indexer_records_comprehension_variable_as_local_symbol(self):
+		client = self.indexSourceCode(
+			'foo = [x for x in range(3)]\n'
+		)
+		self.assertTrue('virtual_file<x> at [1:8|1:8]' in client.localSymbols)
+		self.assertTrue('virtual_file<x> at [1:14|1:14]' in client.localSymbols)
+		self.assertFalse('GLOBAL_VARIABLE: virtual_file.x at [1:14|1:14]' in client.symbols)
+
+
+	def test_indexer_records_usage_of_lambda_parameter_as_local_symbol(self):
+		client = self.indexSourceCode(
+			'foo = lambda bar: bar + 1\n'
+		)
+		self.assertTrue('virtual_file<bar> at [1:19|1:21]' in client.localSymbols)
+
+
 # Test Recording References
 
 	def test_indexer_records_import_of_builtin_module(self):
@@ -225,7 +297,7 @@ class TestPythonIndexer(unittest.TestCase):
 			'class Bar(Foo):\n'
 			'	pass\n'
 		)
-		self.assertTrue('INHERITANCE: virtual_file.Bar -> unsolved symbol at [3:11|3:13]' in client.references)
+		self.assertTrue('INHERITANCE: virtual_file.Bar -> virtual_file.Foo at [3:11|3:13]' in client.references)
 
 
 	def test_indexer_records_multiple_class_inheritence(self):
@@ -237,8 +309,8 @@ class TestPythonIndexer(unittest.TestCase):
 			'class Baz(Foo, Bar):\n'
 			'	pass\n'
 		)
-		self.assertTrue('INHERITANCE: virtual_file.Baz -> unsolved symbol at [5:11|5:13]' in client.references)
-		self.assertTrue('INHERITANCE: virtual_file.Baz -> unsolved symbol at [5:16|5:18]' in client.references)
+		self.assertTrue('INHERITANCE: virtual_file.Baz -> virtual_file.Foo at [5:11|5:13]' in client.references)
+		self.assertTrue('INHERITANCE: virtual_file.Baz -> virtual_file.Bar at [5:16|5:18]' in client.references)
 
 
 	def test_indexer_records_instantiation_of_custom_class(self):
@@ -248,7 +320,7 @@ class TestPythonIndexer(unittest.TestCase):
 			'\n'
 			'bar = Bar()\n'
 		)
-		self.assertTrue('CALL: virtual_file -> unsolved symbol at [4:7|4:9]' in client.references)
+		self.assertTrue('CALL: virtual_file -> virtual_file.Bar at [4:7|4:9]' in client.references)
 
 
 	def test_indexer_records_instantiation_of_environment_class(self):
@@ -286,6 +358,44 @@ class TestPythonIndexer(unittest.TestCase):
 		self.assertTrue('CALL: virtual_file -> unsolved symbol at [1:21|1:27]' in client.references)
 
 
+	def test_indexer_records_usage_of_global_variable_within_function(self):
+		client = self.indexSourceCode(
+			'def foo():\n'
+			'	return bar\n'
+			'bar = 9\n'
+		)
+		self.assertTrue('USAGE: virtual_file.foo -> virtual_file.bar at [2:9|2:11]' in client.references)
+
+
+	def test_indexer_records_assignment_to_variable_declared_global_as_usage_of_global_variable(self):
+		client = self.indexSourceCode(
+			'bar = 0\n'
+			'def foo():\n'
+			'	global bar\n'
+			'	bar = 1\n'
+		)
+		self.assertTrue('USAGE: virtual_file.foo -> virtual_file.bar at [4:2|4:4]' in client.references)
+
+
+	def test_indexer_records_usage_of_static_field_within_class_body(self):
+		client = self.indexSourceCode(
+			'class Foo:\n'
+			'	x = 0\n'
+			'	y = x\n'
+		)
+		self.assertTrue('USAGE: virtual_file.Foo -> virtual_file.Foo.x at [3:6|3:6]' in client.references)
+
+
+	def test_indexer_does_not_resolve_static_field_within_method_without_self(self):
+		client = self.indexSourceCode(
+			'class Foo:\n'
+			'	x = 0\n'
+			'	def bar(self):\n'
+			'		return x\n'
+		)
+		self.assertTrue('USAGE: virtual_file.Foo.bar -> unsolved symbol at [4:10|4:10]' in client.references)
+
+
 	def test_indexer_records_function_call(self):
 		client = self.indexSourceCode(
 			'def main():\n'
@@ -293,7 +403,7 @@ class TestPythonIndexer(unittest.TestCase):
 			'\n'
 			'main()\n'
 		)
-		self.assertTrue('CALL: virtual_file -> unsolved symbol at [4:1|4:4]' in client.references)
+		self.assertTrue('CALL: virtual_file -> virtual_file.main at [4:1|4:4]' in client.references)
 
 
 	def test_indexer_does_not_record_static_field_initialization_as_usage(self):
@@ -331,7 +441,7 @@ class TestPythonIndexer(unittest.TestCase):
 			'import pkg.mod\n',
 			[os.path.join(os.getcwd(), 'data', 'test')]
 		)
-		self.assertTrue('unsolved symbol at [1:8|1:10]' in client.qualifiers)
+		self.assertTrue('pkg at [1:8|1:10]' in client.qualifiers)
 
 
 	def test_indexer_records_module_as_qualifier_in_expression_statement(self):
@@ -348,7 +458,7 @@ class TestPythonIndexer(unittest.TestCase):
 			'	bar = 0\n'
 			'baz = Foo.bar\n'
 		)
-		self.assertTrue('unsolved symbol at [3:7|3:9]' in client.qualifiers)
+		self.assertTrue('virtual_file.Foo at [3:7|3:9]' in client.qualifiers)
 
 
 # Test Atomic Ranges
@@ -372,9 +482,178 @@ class TestPythonIndexer(unittest.TestCase):
 		self.assertTrue('ERROR: "Unexpected token of type "INDENT" encountered." at [2:2|2:1]' in client.errors)
 
 
+# Test Parse Cache
+
+	def test_indexer_records_same_data_for_source_code_loaded_from_parse_cache(self):
+		sourceCode = (
+			'class Foo:\n'
+			'	def bar(self):\n'
+			'		self.x = None\n'
+		)
+		cacheDirectoryPath = tempfile.mkdtemp()
+		try:
+			parseCache = parse_cache.ParseCache(cacheDirectoryPath)
+			parsedClient = self.indexSourceCode(sourceCode, parseCache=parseCache)
+			cachedClient = self.indexSourceCode(sourceCode, parseCache=parseCache)
+		finally:
+			shutil.rmtree(cacheDirectoryPath)
+
+		self.assertEqual(parseCache.missCount, 1)
+		self.assertEqual(parseCache.hitCount, 1)
+		self.assertEqual(parsedClient.symbols, cachedClient.symbols)
+		self.assertEqual(parsedClient.localSymbols, cachedClient.localSymbols)
+		self.assertEqual(parsedClient.references, cachedClient.references)
+
+
+	def test_indexer_records_changed_source_code_reparsed_by_diff_parse_cache(self):
+		parseCache = parse_cache.DiffParseCache()
+		self.indexSourceCode(
+			'def foo():\n'
+			'	pass\n',
+			parseCache=parseCache
+		)
+		hitCount = parseCache.hitCount
+		client = self.indexSourceCode(
+			'def foo():\n'
+			'	pass\n'
+			'def bar():\n'
+			'	pass\n',
+			parseCache=parseCache
+		)
+		self.assertEqual(parseCache.hitCount, hitCount + 1)
+		self.assertTrue('FUNCTION: virtual_file.bar at [3:5|3:7] with scope [3:1|5:0]' in client.symbols)
+
+
+	def test_diff_parse_cache_counts_full_parse_after_eviction(self):
+		parseCache = parse_cache.DiffParseCache()
+		self.indexSourceCode('foo = 1\n', parseCache=parseCache)
+		missCount = parseCache.missCount
+		memory_policy.MemoryPolicy().evictCaches(parseCache)
+		self.assertEqual(parseCache.moduleNodeIds, {})
+		self.indexSourceCode('foo = 2\n', parseCache=parseCache)
+		self.assertEqual(parseCache.missCount, missCount + 1)
+
+
+# Test Module Locator
+
+	def test_indexer_records_import_of_module_found_on_sys_path(self):
+		client = self.indexSourceCode(
+			'import pkg.mod\n',
+			[os.path.join(os.getcwd(), 'data', 'test')]
+		)
+		self.assertTrue('IMPORT: virtual_file -> pkg.mod at [1:12|1:14]' in client.references)
+		self.assertTrue('NON-INDEXED MODULE: pkg.mod' in client.symbols)
+
+
+	def test_indexer_records_usage_of_package_found_on_sys_path_in_from_import(self):
+		client = self.indexSourceCode(
+			'from pkg.mod import ModuleLevelClass\n',
+			[os.path.join(os.getcwd(), 'data', 'test')]
+		)
+		self.assertTrue('pkg at [1:6|1:8]' in client.qualifiers)
+		self.assertTrue('USAGE: virtual_file -> pkg.mod at [1:10|1:12]' in client.references)
+
+
+	def test_indexer_does_not_resolve_module_missing_on_sys_path(self):
+		client = self.indexSourceCode(
+			'import pkg.missing\n',
+			[os.path.join(os.getcwd(), 'data', 'test')]
+		)
+		self.assertTrue('pkg at [1:8|1:10]' in client.qualifiers)
+		self.assertTrue('IMPORT: virtual_file -> unsolved symbol at [1:12|1:18]' in client.references)
+
+
+# Test Project Symbol Table
+
+	def test_indexer_records_import_of_project_module(self):
+		client = self.indexSourceCode(
+			'import pkg.mod\n',
+			projectSymbolTable=self.buildTestProjectSymbolTable()
+		)
+		self.assertTrue('pkg at [1:8|1:10]' in client.qualifiers)
+		self.assertTrue('IMPORT: virtual_file -> pkg.mod at [1:12|1:14]' in client.references)
+
+
+	def test_indexer_records_usage_of_class_of_imported_project_module(self):
+		client = self.indexSourceCode(
+			'import pkg.mod\n'
+			'c = pkg.mod.ModuleLevelClass()\n',
+			projectSymbolTable=self.buildTestProjectSymbolTable()
+		)
+		self.assertTrue('pkg at [2:5|2:7]' in client.qualifiers)
+		self.assertTrue('pkg.mod at [2:9|2:11]' in client.qualifiers)
+		self.assertTrue('CALL: virtual_file -> pkg.mod.ModuleLevelClass at [2:13|2:28]' in client.references)
+		self.assertTrue('NON-INDEXED CLASS: pkg.mod.ModuleLevelClass' in client.symbols)
+
+
+	def test_indexer_records_import_of_class_from_project_package(self):
+		client = self.indexSourceCode(
+			'from pkg import PackageLevelClass as P\n'
+			'p = P()\n',
+			projectSymbolTable=self.buildTestProjectSymbolTable()
+		)
+		self.assertTrue('USAGE: virtual_file -> pkg at [1:6|1:8]' in client.references)
+		self.assertTrue('IMPORT: virtual_file -> pkg.PackageLevelClass at [1:17|1:33]' in client.references)
+		self.assertTrue('CALL: virtual_file -> pkg.PackageLevelClass at [2:5|2:5]' in client.references)
+
+
+	def test_indexer_records_import_of_unknown_module_as_unsolved_with_project_symbol_table(self):
+		client = self.indexSourceCode(
+			'import itertools\n',
+			projectSymbolTable=self.buildTestProjectSymbolTable()
+		)
+		self.assertTrue('IMPORT: virtual_file -> unsolved symbol at [1:8|1:16]' in client.references)
+
+
+	def test_project_symbol_table_resolves_same_names_after_saving_and_loading(self):
+		projectSymbolTable = self.buildTestProjectSymbolTable()
+		temporaryDirectoryPath = tempfile.mkdtemp()
+		try:
+			symbolTableFilePath = os.path.join(temporaryDirectoryPath, 'symbols.json')
+			projectSymbolTable.save(symbolTableFilePath)
+			loadedProjectSymbolTable = project_symbol_table.loadProjectSymbolTable(symbolTableFilePath)
+		finally:
+			shutil.rmtree(temporaryDirectoryPath)
+
+		self.assertEqual(projectSymbolTable.modules, loadedProjectSymbolTable.modules)
+		nameHierarchy, symbolKind = loadedProjectSymbolTable.resolveName('pkg.mod.ModuleLevelClass')
+		self.assertEqual(nameHierarchy.getDisplayString(), 'pkg.mod.ModuleLevelClass')
+		self.assertEqual(symbolKind, srctrl.SYMBOL_CLASS)
+		self.assertEqual(loadedProjectSymbolTable.resolveName('pkg.mod.Unknown'), None)
+
+
+	def test_indexer_records_names_of_del_statement_like_installed_parso(self):
+		sourceCode = (
+			'foo = 1\n'
+			'del foo\n'
+			'def bar():\n'
+			'	x = 1\n'
+			'	del x, foo.baz\n'
+		)
+		client = self.indexSourceCode(sourceCode)
+		parsoClient = TestPythonIndexer.indexSourceCode(self, sourceCode)
+
+		self.assertEqual(client.symbols, parsoClient.symbols)
+		self.assertEqual(client.localSymbols, parsoClient.localSymbols)
+		self.assertEqual(client.references, parsoClient.references)
+		self.assertEqual(client.qualifiers, parsoClient.qualifiers)
+		if shallow_ast_indexer.isDeletedNameDefinition():
+			self.assertFalse('USAGE: virtual_file -> virtual_file.foo at [2:5|2:7]' in client.references)
+		else:
+			self.assertTrue('USAGE: virtual_file -> virtual_file.foo at [2:5|2:7]' in client.references)
+
+
 # Utility Functions
 
-	def indexSourceCode(self, sourceCode, sysPath = None, verbose = False):
+	def buildTestProjectSymbolTable(self):
+		packageDirectoryPath = os.path.join(os.getcwd(), 'data', 'test', 'pkg')
+		return project_symbol_table.buildProjectSymbolTable([
+			os.path.join(packageDirectoryPath, '__init__.py'),
+			os.path.join(packageDirectoryPath, 'mod.py')
+		])
+
+
+	def indexSourceCode(self, sourceCode, sysPath = None, verbose = False, parseCache = None, projectSymbolTable = None):
 		workingDirectory = os.getcwd()
 		astVisitorClient = TestAstVisitorClient()
 
@@ -383,7 +662,64 @@ class TestPythonIndexer(unittest.TestCase):
 			workingDirectory,
 			astVisitorClient,
 			verbose,
-			sysPath
+			sysPath,
+			parseCache,
+			projectSymbolTable
+		)
+
+		astVisitorClient.updateReadableOutput()
+		return astVisitorClient
+
+
+@unittest.skipIf(not shallow_ast_indexer.isAstBackendSupported(), 'the ast backend requires Python 3.8 or above')
+class TestPythonIndexerWithAstBackend(TestPythonIndexer):
+
+	# runs all tests of the parso based shallow indexer against the ast backend, which needs to record the same data
+
+	def test_ast_backend_falls_back_to_parso_for_invalid_source_code(self):
+		sourceCode = 'def foo():\n	return bar(\n'
+		self.assertEqual(shallow_ast_indexer.parseSourceCode(sourceCode, 'virtual_file.py'), None)
+		client = self.indexSourceCode(sourceCode)
+		self.assertTrue('FUNCTION: virtual_file.foo at [1:5|1:7] with scope [1:1|2:12]' in client.symbols)
+
+
+	def test_ast_backend_does_not_define_named_expression_used_as_argument(self):
+		client = self.indexSourceCode(
+			'def foo():\n'
+			'	a = [(b := 1)]\n'
+			'	print(c := 2)\n'
+		)
+		self.assertTrue('virtual_file.foo<b> at [2:8|2:8]' in client.localSymbols)
+		self.assertTrue('USAGE: virtual_file.foo -> unsolved symbol at [3:8|3:8]' in client.references)
+
+
+	@unittest.skip('the ast backend does not use the parse cache')
+	def test_indexer_records_same_data_for_source_code_loaded_from_parse_cache(self):
+		pass
+
+
+	@unittest.skip('the ast backend does not use the parse cache')
+	def test_indexer_records_changed_source_code_reparsed_by_diff_parse_cache(self):
+		pass
+
+
+	@unittest.skip('the ast backend does not use the parse cache')
+	def test_diff_parse_cache_counts_full_parse_after_eviction(self):
+		pass
+
+
+	def indexSourceCode(self, sourceCode, sysPath = None, verbose = False, parseCache = None, projectSymbolTable = None):
+		workingDirectory = os.getcwd()
+		astVisitorClient = TestAstVisitorClient()
+
+		shallow_ast_indexer.indexSourceCode(
+			sourceCode,
+			workingDirectory,
+			astVisitorClient,
+			verbose,
+			sysPath,
+			parseCache,
+			projectSymbolTable
 		)
 
 		astVisitorClient.updateReadableOutput()
@@ -0,0 +1,80 @@
+import os
+import shard_merge
+import shutil
+import sourcetraildb as srctrl
+import sqlite3
+import tempfile
+import unittest
+
+
+class TestShardMerge(unittest.TestCase):
+
+	def test_merge_unifies_symbols_and_remaps_references_and_locations(self):
+		directoryPath = tempfile.mkdtemp()
+		try:
+			firstShardPath = self.createShard(os.path.join(directoryPath, 'first.srctrldb'), 'a.py', 'a.foo', 'b.bar')
+			secondShardPath = self.createShard(os.path.join(directoryPath, 'second.srctrldb'), 'b.py', 'b.bar', 'a.foo')
+			mergedPath = os.path.join(directoryPath, 'merged.srctrldb')
+
+			self.assertEqual(shard_merge.mergeShardDatabases(mergedPath, [firstShardPath, secondShardPath]), 2)
+
+			connection = sqlite3.connect(mergedPath)
+			try:
+				nodeIds = dict((name, id) for id, name in connection.execute('SELECT id, serialized_name FROM node'))
+				self.assertEqual(sorted(nodeIds.keys()), ['a.foo', 'a.py', 'b.bar', 'b.py'])
+				self.assertEqual(
+					sorted(connection.execute('SELECT source_node_id, target_node_id FROM edge').fetchall()),
+					sorted([(nodeIds['a.foo'], nodeIds['b.bar']), (nodeIds['b.bar'], nodeIds['a.foo'])])
+				)
+				self.assertEqual(connection.execute('SELECT COUNT(*) FROM element').fetchone()[0], 6)
+				self.assertEqual(
+					sorted(connection.execute(
+						'SELECT n.serialized_name, f.serialized_name, l.start_line FROM occurrence o JOIN node n ON n.id = o.element_id '
+						'JOIN source_location l ON l.id = o.source_location_id JOIN node f ON f.id = l.file_node_id'
+					).fetchall()),
+					[('a.foo', 'a.py', 1), ('b.bar', 'b.py', 1)]
+				)
+				self.assertEqual(
+					connection.execute('SELECT definition_kind FROM symbol WHERE id = ?', (nodeIds['b.bar'],)).fetchone()[0],
+					srctrl.DEFINITION_EXPLICIT
+				)
+			finally:
+				connection.close()
+		finally:
+			shutil.rmtree(directoryPath)
+
+
+# Utility Functions
+
+	def createShard(self, shardPath, filePath, definedSymbolName, referencedSymbolName):
+		# creates a database with the tables of SourcetrailDB that holds one file defining a symbol that references another symbol
+		connection = sqlite3.connect(shardPath)
+		connection.executescript(
+			'CREATE TABLE meta(id INTEGER, key TEXT, value TEXT, PRIMARY KEY(id));'
+			'CREATE TABLE element(id INTEGER, PRIMARY KEY(id));'
+			'CREATE TABLE element_component(id INTEGER, element_id INTEGER, type INTEGER, data TEXT, PRIMARY KEY(id));'
+			'CREATE TABLE edge(id INTEGER NOT NULL, type INTEGER NOT NULL, source_node_id INTEGER NOT NULL, target_node_id INTEGER NOT NULL, PRIMARY KEY(id));'
+			'CREATE TABLE node(id INTEGER NOT NULL, type INTEGER NOT NULL, serialized_name TEXT, PRIMARY KEY(id));'
+			'CREATE TABLE symbol(id INTEGER NOT NULL, definition_kind INTEGER NOT NULL, PRIMARY KEY(id));'
+			'CREATE TABLE file(id INTEGER NOT NULL, path TEXT, language TEXT, modification_time TEXT, indexed INTEGER, complete INTEGER, line_count INTEGER, PRIMARY KEY(id));'
+			'CREATE TABLE filecontent(id INTEGER, content TEXT, PRIMARY KEY(id));'
+			'CREATE TABLE local_symbol(id INTEGER NOT NULL, name TEXT, PRIMARY KEY(id));'
+			'CREATE TABLE source_location(id INTEGER NOT NULL, file_node_id INTEGER, start_line INTEGER, start_column INTEGER, end_line INTEGER, end_column INTEGER, type INTEGER, PRIMARY KEY(id));'
+			'CREATE TABLE occurrence(element_id INTEGER NOT NULL, source_location_id INTEGER NOT NULL, PRIMARY KEY(element_id, source_location_id));'
+			'CREATE TABLE error(id INTEGER NOT NULL, message TEXT, fatal INTEGER NOT NULL, indexed INTEGER NOT NULL, translation_unit TEXT, PRIMARY KEY(id));'
+			'INSERT INTO meta VALUES (1, \'storage_version\', \'25\');'
+			'INSERT INTO element VALUES (1), (2), (3), (4);'
+		)
+		connection.execute('INSERT INTO node VALUES (1, 1, ?), (2, 1, ?), (3, 1, ?)', (filePath, definedSymbolName, referencedSymbolName))
+		connection.execute('INSERT INTO file VALUES (1, ?, \'python\', \'\', 1, 1, 1)', (filePath,))
+		connection.execute('INSERT INTO symbol VALUES (2, ?), (3, ?)', (srctrl.DEFINITION_EXPLICIT, srctrl.DEFINITION_IMPLICIT))
+		connection.execute('INSERT INTO edge VALUES (4, ?, 2, 3)', (srctrl.REFERENCE_CALL,))
+		connection.execute('INSERT INTO source_location VALUES (1, 1, 1, 1, 1, 3, 1)')
+		connection.execute('INSERT INTO occurrence VALUES (2, 1)')
+		connection.commit()
+		connection.close()
+		return shardPath
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
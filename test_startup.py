@@ -0,0 +1,63 @@
+import argparse
+import os
+import run
+import startup_report
+import unittest
+
+
+# Shared CI runners are much slower than a developer machine, so the budgets are only checked with a generous tolerance. The
+# check can be disabled altogether by setting the environment variable below.
+_budgetToleranceFactor = 3.0
+_skipBudgetCheckVariableName = 'SOURCETRAIL_INDEXER_SKIP_IMPORT_BUDGETS'
+
+
+class TestStartup(unittest.TestCase):
+
+	def test_running_without_command_does_not_import_jedi(self):
+		duration, importsJedi = startup_report.measureImportTimeInFreshInterpreter(['run'])
+		self.assertFalse(importsJedi)
+
+
+	def test_import_timer_records_imported_module(self):
+		importTimer = startup_report.ImportTimer()
+		importTimer.install()
+		try:
+			import file_watcher
+		finally:
+			importTimer.uninstall()
+		self.assertTrue('file_watcher' in [name for name, selfTime, cumulativeTime in importTimer.records])
+
+
+	def test_every_command_has_import_budget(self):
+		subparsersActions = [a for a in run.createArgumentParser()._actions if isinstance(a, argparse._SubParsersAction)]
+		commandNames = set(subparsersActions[0].choices.keys())
+		budgetedCommandNames = set(commandName.split(' ')[0] for commandName, moduleNames, requiresJedi, budget in run._commandImportBudgets)
+		self.assertEqual(commandNames - budgetedCommandNames, set())
+
+
+	def test_info_messages_are_only_logged_on_request_or_for_reporting_commands(self):
+		parser = run.createArgumentParser()
+		indexArguments = ['index', '--source-file-path', 'a.py', '--database-file-path', 'a.srctrldb']
+		self.assertEqual(run.getLogLevelName(parser.parse_args(indexArguments)), 'warning')
+		self.assertEqual(run.getLogLevelName(parser.parse_args(indexArguments + ['--verbose'])), 'info')
+		self.assertEqual(run.getLogLevelName(parser.parse_args(indexArguments + ['--verbose', '--log-level', 'error'])), 'error')
+		replayArguments = ['replay', '--record-stream-path', 'a.records', '--database-file-path', 'a.srctrldb']
+		self.assertEqual(run.getLogLevelName(parser.parse_args(replayArguments)), 'info')
+		self.assertEqual(run.getLogLevelName(parser.parse_args(replayArguments + ['--log-level', 'warning'])), 'warning')
+
+
+	def test_command_imports_match_jedi_requirements(self):
+		for commandName, moduleNames, requiresJedi, budget in run._commandImportBudgets:
+			duration, importsJedi = startup_report.measureImportTimeInFreshInterpreter(moduleNames)
+			self.assertEqual(importsJedi, requiresJedi, 'command "' + commandName + '"')
+
+
+	@unittest.skipIf(os.environ.get(_skipBudgetCheckVariableName), 'import budgets are disabled by ' + _skipBudgetCheckVariableName)
+	def test_command_imports_stay_within_time_budget(self):
+		for commandName, moduleNames, requiresJedi, budget in run._commandImportBudgets:
+			duration, importsJedi = startup_report.measureImportTimeInFreshInterpreter(moduleNames)
+			self.assertLessEqual(duration, budget * _budgetToleranceFactor, 'importing the modules of command "' + commandName + '" took ' + str(duration) + ' seconds')
+
+
+if __name__ == '__main__':
+    unittest.main(exit=True)